@@ -0,0 +1,187 @@
+# agregados.py
+"""
+Cubo de agregados das NFs para as perguntas mais comuns.
+
+Para cada mês são calculadas, uma única vez, as agregações por fornecedor,
+UF do emitente, dia de emissão e item. Todas as medidas são aditivas
+(contagem, soma, máximo), então os agregados de vários meses — ou de vários
+blocos do mesmo mês — são combinados somando grupos, em O(grupos), sem
+reler as tabelas completas.
+"""
+import os
+
+import pandas as pd
+
+# dimensão -> (tabela de origem, colunas-chave)
+DIMENSOES = {
+    "geral": ("cabecalho", []),
+    "fornecedor": ("cabecalho", ["CPF/CNPJ Emitente", "RAZÃO SOCIAL EMITENTE"]),
+    "uf": ("cabecalho", ["UF EMITENTE"]),
+    "dia": ("cabecalho", ["DIA"]),
+    "item": ("itens", ["DESCRIÇÃO DO PRODUTO/SERVIÇO"]),
+}
+
+# medida -> (coluna de origem, função de agregação; também usada para combinar)
+MEDIDAS = {
+    "cabecalho": {
+        "qtd_nfs": ("CHAVE DE ACESSO", "count"),
+        "valor_total": ("VALOR NOTA FISCAL", "sum"),
+        "valor_max": ("VALOR NOTA FISCAL", "max"),
+    },
+    "itens": {
+        "qtd_linhas": ("CHAVE DE ACESSO", "count"),
+        "quantidade": ("QUANTIDADE", "sum"),
+        "valor_total": ("VALOR TOTAL", "sum"),
+    },
+}
+
+# Ao combinar, contagens viram somas
+_COMBINACAO = {"count": "sum", "sum": "sum", "max": "max"}
+
+
+def _agregar(df, tabela, chaves):
+    medidas = {nome: pd.NamedAgg(col, func) for nome, (col, func) in MEDIDAS[tabela].items()}
+    if not chaves:
+        return df.groupby(lambda _: 0).agg(**medidas).reset_index(drop=True)
+    resultado = df.groupby(chaves, observed=True, dropna=False).agg(**medidas).reset_index()
+    for chave in chaves:
+        if chave != "DIA":
+            resultado[chave] = resultado[chave].astype("string")
+    return resultado
+
+
+def agregar(df_cabecalho=None, df_itens=None):
+    """
+    Calcula o cubo (dicionário dimensão -> DataFrame) de um conjunto de NFs.
+    Aceita um mês inteiro ou apenas um bloco dele; só as dimensões das tabelas
+    informadas são calculadas.
+    """
+    fontes = {}
+    if df_cabecalho is not None:
+        fontes["cabecalho"] = df_cabecalho.assign(DIA=df_cabecalho["DATA EMISSÃO"].dt.normalize())
+    if df_itens is not None:
+        fontes["itens"] = df_itens
+    return {
+        dimensao: _agregar(fontes[tabela], tabela, chaves)
+        for dimensao, (tabela, chaves) in DIMENSOES.items()
+        if tabela in fontes
+    }
+
+
+def combinar(cubos):
+    """Combina vários cubos (meses ou blocos) somando os grupos iguais."""
+    cubos = [c for c in cubos if c]
+    if not cubos:
+        return {}
+    if len(cubos) == 1:
+        return cubos[0]
+    resultado = {}
+    for dimensao, (tabela, chaves) in DIMENSOES.items():
+        partes = [c[dimensao] for c in cubos if dimensao in c]
+        if not partes:
+            continue
+        juntos = pd.concat(partes, ignore_index=True)
+        regras = {nome: _COMBINACAO[func] for nome, (_, func) in MEDIDAS[tabela].items()}
+        if chaves:
+            resultado[dimensao] = juntos.groupby(chaves, dropna=False).agg(regras).reset_index()
+        else:
+            resultado[dimensao] = juntos.groupby(lambda _: 0).agg(regras).reset_index(drop=True)
+    return resultado
+
+
+class CuboNF:
+    """Respostas prontas a partir do cubo, sem tocar nos DataFrames completos."""
+
+    def __init__(self, cubo):
+        self.cubo = cubo
+
+    def _geral(self, medida, vazio=0):
+        """Medida da dimensão geral; `vazio` se não há NFs (mês ou filtro sem dados)."""
+        geral = self.cubo.get("geral")
+        if geral is None or geral.empty:
+            return vazio
+        return geral[medida].iloc[0]
+
+    def total_nfs(self):
+        return int(self._geral("qtd_nfs"))
+
+    def valor_total(self):
+        return float(self._geral("valor_total"))
+
+    def valor_medio(self):
+        total = self.total_nfs()
+        return self.valor_total() / total if total else 0.0
+
+    def valor_max(self):
+        return float(self._geral("valor_max", float("nan")))
+
+    def top_fornecedores_valor(self, n=5):
+        """Série razão social -> valor total emitido, em ordem decrescente."""
+        df = self.cubo["fornecedor"].groupby("RAZÃO SOCIAL EMITENTE")["valor_total"].sum()
+        return df.sort_values(ascending=False).head(n)
+
+    def top_fornecedores_qtd(self, n=5):
+        """Série razão social -> quantidade de NFs, em ordem decrescente."""
+        df = self.cubo["fornecedor"].groupby("RAZÃO SOCIAL EMITENTE")["qtd_nfs"].sum()
+        return df.sort_values(ascending=False, kind="stable").head(n)
+
+    def fornecedor_mais_recorrente(self):
+        top = self.top_fornecedores_qtd(1)
+        return top.index[0] if len(top) else None
+
+    def fornecedor_maior_valor(self):
+        top = self.top_fornecedores_valor(1)
+        return top.index[0] if len(top) else None
+
+    def top_itens_quantidade(self, n=5):
+        df = self.cubo["item"].set_index("DESCRIÇÃO DO PRODUTO/SERVIÇO")["quantidade"]
+        return df.sort_values(ascending=False, kind="stable").head(n)
+
+    def item_mais_vendido(self):
+        top = self.top_itens_quantidade(1)
+        return top.index[0] if len(top) else None
+
+    def por_uf(self):
+        return self.cubo["uf"].set_index("UF EMITENTE").sort_values("valor_total", ascending=False)
+
+    def por_dia(self):
+        return self.cubo["dia"].set_index("DIA").sort_index()
+
+    def tabela(self, dimensao, n=20):
+        """Tabela de uma dimensão, ordenada pelo valor total (para a ferramenta do agente)."""
+        if dimensao not in self.cubo:
+            raise ValueError(f"Dimensão desconhecida: {dimensao}. Use uma de {list(self.cubo)}.")
+        df = self.cubo[dimensao]
+        if dimensao == "dia":
+            return df.sort_values("DIA").head(n)
+        return df.sort_values("valor_total", ascending=False).head(n)
+
+
+# --- Persistência por mês (atualização incremental junto com o dataset particionado) ---
+
+def _caminho_mes(destino, mes, dimensao):
+    return os.path.join(destino, "agregados", f"MES={mes}", f"{dimensao}.parquet")
+
+
+def gravar_cubo_mes(cubo, mes, destino):
+    """Grava o cubo de um mês; meses novos só acrescentam arquivos."""
+    for dimensao, df in cubo.items():
+        caminho = _caminho_mes(destino, mes, dimensao)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        df.to_parquet(caminho, index=False)
+
+
+def cubo_mes_existe(mes, destino):
+    return all(os.path.exists(_caminho_mes(destino, mes, d)) for d in DIMENSOES)
+
+
+def ler_cubo_mes(mes, destino):
+    """Lê o cubo gravado de um mês, ou None se ainda não existe."""
+    if not cubo_mes_existe(mes, destino):
+        return None
+    return {d: pd.read_parquet(_caminho_mes(destino, mes, d)) for d in DIMENSOES}
+
+
+def carregar_cubo(meses, destino):
+    """Combina os cubos gravados dos meses pedidos em um CuboNF."""
+    return CuboNF(combinar([ler_cubo_mes(m, destino) for m in meses]))
@@ -1,45 +1,109 @@
 # app.py
+import time
+import uuid
+
 import streamlit as st
-from main import perguntar_ao_agente # Importa a função do seu main.py
+import data_store
+# Executa o agente de main.py em segundo plano, sem bloquear o script.
+# Importar main inicia a carga dos dados em segundo plano (uma vez por processo).
+import execucao_agente
 
 st.set_page_config(page_title="Agente de Consulta de NFs")
 
 st.title("🤖 Agente de Consulta de Notas Fiscais")
 st.write("Pergunte sobre os dados dos arquivos CSV de Notas Fiscais.")
 
+saude = data_store.saude()
+if saude["pronto"]:
+    st.caption(f"Dados carregados: mês {saude['mes']} · versão {saude['versao']}")
+elif saude["estado"] == "carregando":
+    st.info("⏳ Carregando os dados em segundo plano. Perguntas enviadas agora são respondidas assim que os dados ficarem prontos.")
+else:
+    st.error(data_store.mensagem_indisponivel())
+
+# Identifica a sessão para a fila de perguntas de cada usuário
+if "usuario" not in st.session_state:
+    st.session_state.usuario = uuid.uuid4().hex
+
+
+def _mostrar_passo(tipo, conteudo):
+    if tipo == "acao":
+        st.markdown(f"🔧 **{conteudo}**")
+    else:
+        st.text(conteudo[:1500])
+
+
+def acompanhar(execucao):
+    """Mostra os passos do agente enquanto ele trabalha e, no fim, a resposta."""
+    with st.status("Processando...", expanded=not execucao.concluida()) as status:
+        for tipo, conteudo in execucao.passos:
+            _mostrar_passo(tipo, conteudo)
+        while not execucao.concluida():
+            execucao.sinal_vida()
+            if execucao.estado == "na_fila":
+                status.update(label="Aguardando na fila...")
+            else:
+                status.update(label="Processando...")
+            for tipo, conteudo in execucao.novos_eventos():
+                _mostrar_passo(tipo, conteudo)
+            time.sleep(0.2)
+        for tipo, conteudo in execucao.novos_eventos():
+            _mostrar_passo(tipo, conteudo)
+        if execucao.estado == "cancelada":
+            status.update(label="Cancelada.", state="error", expanded=False)
+            return
+        status.update(label="Concluído!", state="complete", expanded=False)
+    st.write("---")
+    st.subheader("Resposta:")
+    st.write(execucao.aguardar())
+
+
 # Campo de entrada para a pergunta do usuário
 user_query = st.text_input("Sua pergunta:", placeholder="Ex: Qual é o fornecedor que teve maior montante recebido?")
 
 # Botão para enviar a pergunta
 if st.button("Perguntar"):
     if user_query:
-        with st.spinner("Processando..."):
-            # Chama a função do seu agente para obter a resposta
-            resposta = perguntar_ao_agente(user_query)
-            st.success("Concluído!")
-            st.write("---")
-            st.subheader("Resposta:")
-            st.write(resposta)
+        try:
+            st.session_state.execucao = execucao_agente.enviar(st.session_state.usuario, user_query)
+        except execucao_agente.FilaCheia as e:
+            st.warning(str(e))
     else:
         st.warning("Por favor, digite uma pergunta.")
 
+execucao = st.session_state.get("execucao")
+if execucao is not None:
+    if not execucao.concluida() and st.button("⛔ Cancelar pergunta"):
+        execucao.cancelar()
+    acompanhar(execucao)
+
 st.markdown("---")
 st.markdown("### Dicas:")
-st.markdown("- Para começar, digite: `Carregar os dados dos arquivos CSV.`")
-st.markdown("- Exemplos de perguntas após carregar os dados:")
+st.markdown("- Os dados são carregados automaticamente ao abrir o app.")
+st.markdown("- Exemplos de perguntas:")
 st.markdown("  - `Qual o valor total de todas as notas fiscais?`")
 st.markdown("  - `Qual fornecedor aparece mais vezes no cabeçalho?`")
 st.markdown("  - `Qual o item mais vendido em quantidade?`")
 st.markdown("### Se for investigar o fornecedor com o número do CNPJ:")
 st.markdown("  - `Investigue o fornecedor com CNPJ [número do cnpj]`")
 st.markdown("---")
+if st.button("🔄 Recarregar dados"):
+    with st.spinner("Verificando novos dados..."):
+        anterior = data_store.versao_atual()
+        snapshot = data_store.recarregar()
+        if snapshot is not None and snapshot.versao != anterior:
+            st.success(f"Dados atualizados para a versão {snapshot.versao}.")
+        else:
+            st.info("Os dados já estão na versão mais recente.")
 if st.button("📄 Gerar Relatório PDF"):
     with st.spinner("Gerando relatório..."):
-        from main import gerar_relatorio_pdf
-        path, msg = gerar_relatorio_pdf()
-        if path:
+        from relatorio_pdf import gerar_relatorio_pdf
+        conteudo, msg = gerar_relatorio_pdf()
+        if conteudo:
             st.success(msg)
-            with open(path, "rb") as f:
-                st.download_button("📥 Baixar PDF", f, file_name="relatorio_estatistico.pdf")
+            # Os bytes do PDF vão direto para o download, sem arquivo no servidor
+            st.download_button(
+                "📥 Baixar PDF", conteudo, file_name="relatorio_estatistico.pdf", mime="application/pdf"
+            )
         else:
             st.error(msg)
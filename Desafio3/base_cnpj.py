@@ -0,0 +1,306 @@
+# base_cnpj.py
+"""
+Base local de CNPJs a partir dos dados abertos da Receita Federal.
+
+Os arquivos públicos do CNPJ (Empresas, Estabelecimentos, Simples, Sócios e as
+tabelas de códigos: Municípios, Naturezas, CNAEs, Qualificações) são CSVs sem
+cabeçalho, separados por ';', em latin-1, normalmente dentro de .zip. O tipo de
+cada arquivo é reconhecido pelo nome (ex.: `Estabelecimentos0.zip` ou
+`K3241.K03200Y0.D40113.ESTABELE`), então tanto os .zip baixados quanto CSVs
+soltos (ex.: os arquivos sintéticos de verificar_base_cnpj.py) podem ser importados.
+
+`importar_base()` lê os arquivos em lotes e grava só as colunas usadas em um
+SQLite, com índices por CNPJ completo e por raiz (8 primeiros dígitos). A
+importação é feita em um arquivo temporário e trocada de uma vez no fim:
+quem estiver consultando continua vendo a base anterior, completa.
+
+`buscar_cnpj()` devolve o registro no mesmo formato do JSON do ReceitaWS, e o
+investigador.py consulta esta base antes de chamar a API.
+
+Uso: python base_cnpj.py [pasta com os arquivos da Receita]
+"""
+import os
+import sqlite3
+import sys
+import time
+import zipfile
+
+import pandas as pd
+
+from cache_respostas import CACHE_DIR
+
+ORIGEM_BASE_CNPJ = os.getenv("RECEITA_CNPJ_ORIGEM", "dados_receita")
+CAMINHO_BASE_CNPJ = os.getenv("RECEITA_CNPJ_BASE", os.path.join(CACHE_DIR, "receita_cnpj.sqlite"))
+LINHAS_POR_LOTE = 100_000
+ENCODING_RECEITA = "latin-1"
+
+# tabela -> (trechos do nome do arquivo, {posição da coluna no CSV: nome da coluna})
+LAYOUT = {
+    "empresas": (("EMPRECSV", "EMPRESAS"), {
+        0: "cnpj_basico", 1: "razao_social", 2: "natureza", 4: "capital_social", 5: "porte",
+    }),
+    "estabelecimentos": (("ESTABELE",), {
+        0: "cnpj_basico", 1: "cnpj_ordem", 2: "cnpj_dv", 3: "matriz_filial", 4: "nome_fantasia",
+        5: "situacao", 6: "data_situacao", 10: "data_inicio", 11: "cnae_principal", 12: "cnae_secundaria",
+        13: "tipo_logradouro", 14: "logradouro", 15: "numero", 16: "complemento", 17: "bairro",
+        18: "cep", 19: "uf", 20: "municipio", 21: "ddd1", 22: "telefone1", 27: "email",
+    }),
+    "simples": (("SIMPLES",), {
+        0: "cnpj_basico", 1: "opcao_simples", 2: "data_opcao_simples", 3: "data_exclusao_simples",
+        4: "opcao_mei", 5: "data_opcao_mei", 6: "data_exclusao_mei",
+    }),
+    "socios": (("SOCIOCSV", "SOCIOS"), {0: "cnpj_basico", 2: "nome", 4: "qualificacao"}),
+    "municipios": (("MUNICCSV", "MUNICIPIOS"), {0: "codigo", 1: "descricao"}),
+    "naturezas": (("NATJUCSV", "NATUREZAS"), {0: "codigo", 1: "descricao"}),
+    "cnaes": (("CNAECSV", "CNAES"), {0: "codigo", 1: "descricao"}),
+    "qualificacoes": (("QUALSCSV", "QUALIFICACOES"), {0: "codigo", 1: "descricao"}),
+}
+
+# Índices criados depois da carga (inserir sem índice é bem mais rápido).
+# Antes de um índice único, as chaves repetidas são descartadas mantendo a
+# última linha lida (arquivos da Receita às vezes repetem registros).
+INDICES = [
+    ("empresas", "cnpj_basico", True),
+    ("estabelecimentos", "cnpj", True),
+    ("estabelecimentos", "cnpj_basico", False),
+    ("simples", "cnpj_basico", True),
+    ("socios", "cnpj_basico", False),
+    ("municipios", "codigo", True),
+    ("naturezas", "codigo", True),
+    ("cnaes", "codigo", True),
+    ("qualificacoes", "codigo", True),
+]
+
+SITUACOES = {"1": "NULA", "2": "ATIVA", "3": "SUSPENSA", "4": "INAPTA", "8": "BAIXADA"}
+PORTES = {"1": "MICRO EMPRESA", "3": "EMPRESA DE PEQUENO PORTE", "5": "DEMAIS"}
+
+
+def identificar_tabela(nome_arquivo):
+    """Tabela do LAYOUT correspondente ao nome do arquivo da Receita, ou None."""
+    nome = os.path.basename(nome_arquivo).upper()
+    for tabela, (trechos, _) in LAYOUT.items():
+        if any(trecho in nome for trecho in trechos):
+            return tabela
+    return None
+
+
+def _colunas(tabela):
+    colunas = list(LAYOUT[tabela][1].values())
+    return ["cnpj", *colunas] if tabela == "estabelecimentos" else colunas
+
+
+def _abrir_arquivos(origem):
+    """Gera (tabela, nome, arquivo binário aberto) para cada arquivo reconhecido na pasta (ou arquivo) de origem."""
+    caminhos = [origem] if os.path.isfile(origem) else [
+        os.path.join(origem, nome) for nome in sorted(os.listdir(origem))
+    ]
+    for caminho in caminhos:
+        if zipfile.is_zipfile(caminho):
+            with zipfile.ZipFile(caminho) as arquivo_zip:
+                for membro in arquivo_zip.namelist():
+                    tabela = identificar_tabela(membro) or identificar_tabela(caminho)
+                    if tabela:
+                        with arquivo_zip.open(membro) as arquivo:
+                            yield tabela, f"{os.path.basename(caminho)}:{membro}", arquivo
+        else:
+            tabela = identificar_tabela(caminho)
+            if tabela:
+                with open(caminho, "rb") as arquivo:
+                    yield tabela, os.path.basename(caminho), arquivo
+
+
+def _ler_lotes(arquivo, tabela, linhas_por_lote):
+    posicoes = LAYOUT[tabela][1]
+    lotes = pd.read_csv(
+        arquivo, sep=";", header=None, dtype=str, encoding=ENCODING_RECEITA, keep_default_na=False,
+        usecols=list(posicoes), chunksize=linhas_por_lote,
+    )
+    for lote in lotes:
+        lote = lote.rename(columns=posicoes)
+        if tabela == "estabelecimentos":
+            lote.insert(0, "cnpj", lote["cnpj_basico"] + lote["cnpj_ordem"] + lote["cnpj_dv"])
+        yield lote[_colunas(tabela)]
+
+
+def importar_base(origem=ORIGEM_BASE_CNPJ, destino=CAMINHO_BASE_CNPJ, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Importa os arquivos da Receita encontrados em `origem` (pasta, .zip ou CSV)
+    para o SQLite `destino`, substituindo a base anterior ao terminar.
+    Retorna {tabela: linhas importadas}.
+    """
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    temporario = f"{destino}.importando"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+
+    inicio = time.perf_counter()
+    contagem = {}
+    con = sqlite3.connect(temporario)
+    try:
+        con.execute("PRAGMA journal_mode = OFF")
+        con.execute("PRAGMA synchronous = OFF")
+        for tabela in LAYOUT:
+            con.execute(f"CREATE TABLE {tabela} ({', '.join(f'{c} TEXT' for c in _colunas(tabela))})")
+        con.execute("CREATE TABLE importacao (arquivo TEXT, tabela TEXT, linhas INTEGER, importado_em REAL)")
+
+        for tabela, nome, arquivo in _abrir_arquivos(origem):
+            linhas = 0
+            marcadores = ", ".join("?" * len(_colunas(tabela)))
+            for lote in _ler_lotes(arquivo, tabela, linhas_por_lote):
+                with con:
+                    con.executemany(f"INSERT INTO {tabela} VALUES ({marcadores})", lote.itertuples(index=False, name=None))
+                linhas += len(lote)
+                print(f"[base CNPJ] {nome}: {linhas:,} linhas")
+            with con:
+                con.execute("INSERT INTO importacao VALUES (?, ?, ?, ?)", (nome, tabela, linhas, time.time()))
+            contagem[tabela] = contagem.get(tabela, 0) + linhas
+
+        for tabela, coluna, unico in INDICES:
+            if unico:
+                with con:
+                    repetidas = con.execute(
+                        f"DELETE FROM {tabela} WHERE rowid NOT IN "
+                        f"(SELECT MAX(rowid) FROM {tabela} GROUP BY {coluna})"
+                    ).rowcount
+                if repetidas:
+                    contagem[tabela] -= repetidas
+                    print(f"[base CNPJ] {tabela}: {repetidas:,} linhas com {coluna} repetido descartadas (mantida a última)")
+            con.execute(f"CREATE {'UNIQUE ' if unico else ''}INDEX idx_{tabela}_{coluna} ON {tabela} ({coluna})")
+        con.commit()
+    except Exception:
+        con.close()
+        os.remove(temporario)
+        raise
+    con.close()
+
+    os.replace(temporario, destino)
+    print(f"✔ Base de CNPJs importada em {time.perf_counter() - inicio:.1f}s para '{destino}': {contagem}")
+    return contagem
+
+
+def base_disponivel(caminho=CAMINHO_BASE_CNPJ):
+    return os.path.exists(caminho)
+
+
+def _conectar(caminho):
+    return sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, timeout=5)
+
+
+def _data(valor):
+    """AAAAMMDD da Receita -> DD/MM/AAAA (formato do ReceitaWS)."""
+    valor = (valor or "").strip()
+    return f"{valor[6:8]}/{valor[4:6]}/{valor[:4]}" if len(valor) == 8 and valor != "00000000" else ""
+
+
+def _data_iso(valor):
+    valor = (valor or "").strip()
+    return f"{valor[:4]}-{valor[4:6]}-{valor[6:8]}" if len(valor) == 8 and valor != "00000000" else None
+
+
+def _codigo_cnae(codigo):
+    codigo = (codigo or "").strip().zfill(7)
+    return f"{codigo[:2]}.{codigo[2:4]}-{codigo[4]}-{codigo[5:]}"
+
+
+def _descricao(con, tabela, codigo):
+    linha = con.execute(f"SELECT descricao FROM {tabela} WHERE codigo = ?", (codigo,)).fetchone()
+    return linha[0] if linha else None
+
+
+def _atividade(con, codigo):
+    return {"code": _codigo_cnae(codigo), "text": _descricao(con, "cnaes", codigo) or ""}
+
+
+def _montar(con, est):
+    basico = est["cnpj_basico"]
+    empresa = con.execute("SELECT * FROM empresas WHERE cnpj_basico = ?", (basico,)).fetchone()
+    simples = con.execute("SELECT * FROM simples WHERE cnpj_basico = ?", (basico,)).fetchone()
+    socios = con.execute("SELECT nome, qualificacao FROM socios WHERE cnpj_basico = ?", (basico,)).fetchall()
+
+    natureza = empresa["natureza"] if empresa else ""
+    descricao_natureza = _descricao(con, "naturezas", natureza) if natureza else None
+    if natureza and len(natureza) == 4:
+        natureza = f"{natureza[:3]}-{natureza[3]}"
+    cep = est["cep"] or ""
+    telefone = f"({est['ddd1']}) {est['telefone1']}" if est["telefone1"] else ""
+    secundarias = [c for c in (est["cnae_secundaria"] or "").split(",") if c.strip()]
+
+    return {
+        "status": "OK",
+        "fonte": "base_local",
+        "cnpj": est["cnpj"],
+        "nome": empresa["razao_social"] if empresa else None,
+        "fantasia": est["nome_fantasia"],
+        "situacao": SITUACOES.get((est["situacao"] or "").lstrip("0"), est["situacao"]),
+        "data_situacao": _data(est["data_situacao"]),
+        "tipo": "MATRIZ" if est["matriz_filial"] == "1" else "FILIAL",
+        "porte": PORTES.get((empresa["porte"] or "").lstrip("0"), "") if empresa else "",
+        "natureza_juridica": f"{natureza} - {descricao_natureza}" if descricao_natureza else natureza,
+        "abertura": _data(est["data_inicio"]),
+        "capital_social": (empresa["capital_social"] or "").replace(",", ".") if empresa else None,
+        "email": (est["email"] or "").lower(),
+        "telefone": telefone,
+        "logradouro": " ".join(p for p in (est["tipo_logradouro"], est["logradouro"]) if p),
+        "numero": est["numero"],
+        "complemento": est["complemento"],
+        "bairro": est["bairro"],
+        "municipio": _descricao(con, "municipios", est["municipio"]) or est["municipio"],
+        "uf": est["uf"],
+        "cep": f"{cep[:2]}.{cep[2:5]}-{cep[5:]}" if len(cep) == 8 else cep,
+        "atividade_principal": [_atividade(con, est["cnae_principal"])] if est["cnae_principal"] else [],
+        "atividades_secundarias": [_atividade(con, c) for c in secundarias],
+        "qsa": [{"nome": nome, "qual": _descricao(con, "qualificacoes", qual) or qual} for nome, qual in socios],
+        "simples": {
+            "optante": bool(simples and simples["opcao_simples"] == "S"),
+            "data_opcao": _data_iso(simples["data_opcao_simples"]) if simples else None,
+            "data_exclusao": _data_iso(simples["data_exclusao_simples"]) if simples else None,
+        },
+        "simei": {
+            "optante": bool(simples and simples["opcao_mei"] == "S"),
+            "data_opcao": _data_iso(simples["data_opcao_mei"]) if simples else None,
+            "data_exclusao": _data_iso(simples["data_exclusao_mei"]) if simples else None,
+        },
+    }
+
+
+def buscar_cnpj(cnpj, caminho=CAMINHO_BASE_CNPJ):
+    """
+    Registro do CNPJ (14 dígitos) na base local, no formato do JSON do ReceitaWS;
+    None se a base não existe ou o CNPJ não está nela.
+    """
+    if not base_disponivel(caminho):
+        return None
+    try:
+        con = _conectar(caminho)
+        try:
+            con.row_factory = sqlite3.Row
+            est = con.execute("SELECT * FROM estabelecimentos WHERE cnpj = ?", (cnpj,)).fetchone()
+            return _montar(con, est) if est is not None else None
+        finally:
+            con.close()
+    except sqlite3.Error as e:
+        print(f"Aviso: base local de CNPJs indisponível: {e}")
+        return None
+
+
+def buscar_raiz(raiz, caminho=CAMINHO_BASE_CNPJ):
+    """CNPJs (matriz e filiais) da empresa com a raiz informada (8 primeiros dígitos)."""
+    raiz = "".join(c for c in str(raiz) if c.isdigit())[:8]
+    if len(raiz) != 8 or not base_disponivel(caminho):
+        return []
+    try:
+        con = _conectar(caminho)
+        try:
+            linhas = con.execute(
+                "SELECT cnpj FROM estabelecimentos WHERE cnpj_basico = ? ORDER BY cnpj", (raiz,)
+            ).fetchall()
+        finally:
+            con.close()
+    except sqlite3.Error as e:
+        print(f"Aviso: base local de CNPJs indisponível: {e}")
+        return []
+    return [linha[0] for linha in linhas]
+
+
+if __name__ == "__main__":
+    importar_base(sys.argv[1] if len(sys.argv) > 1 else ORIGEM_BASE_CNPJ)
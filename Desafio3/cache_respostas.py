@@ -0,0 +1,171 @@
+# cache_respostas.py
+"""
+Cache de respostas do agente, por pergunta normalizada + versão dos dados.
+
+Perguntas repetidas ("qual o fornecedor com maior montante?", "item mais
+vendido") não precisam rodar o ciclo ReAct de novo. A chave é:
+  - a pergunta normalizada: minúsculas, sem acentos, sem pontuação e sem
+    palavras de ligação ("qual", "o", "de"...), então variações de escrita da
+    mesma pergunta caem na mesma entrada;
+  - a versão dos dados (snapshot + dataset, ver main._versao_dados()): ao
+    carregar dados novos a versão muda e as respostas antigas deixam de ser
+    usadas. Elas não são apagadas na hora (outro processo pode ainda estar na
+    versão anterior): saem pela expiração e pelo LRU, como qualquer entrada.
+
+Duas camadas: um LRU em memória (respostas em milissegundos) e um SQLite em
+disco (sobrevive a reinícios e é compartilhado entre processos). As entradas
+expiram após `TTL_SEGUNDOS`. `metricas()` traz acertos, falhas e gravações.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+
+CACHE_DIR = "cache"
+CAMINHO_BANCO = os.path.join(CACHE_DIR, "respostas.sqlite")
+TTL_SEGUNDOS = 24 * 60 * 60
+MAX_MEMORIA = 256
+MAX_DISCO = 5_000
+
+# Palavras que não mudam o sentido da pergunta
+_PALAVRAS_IGNORADAS = {
+    "a", "o", "as", "os", "um", "uma", "de", "do", "da", "dos", "das", "no", "na", "nos", "nas",
+    "e", "que", "qual", "quais", "me", "diga", "informe", "mostre", "por", "favor", "pf",
+    "voce", "pode", "poderia", "sabe", "saber", "gostaria", "quero", "ai", "ae",
+}
+
+_memoria = OrderedDict()  # chave -> (resposta, criado_em)
+_trava = threading.Lock()
+_metricas = {"acertos_memoria": 0, "acertos_disco": 0, "falhas": 0, "gravacoes": 0, "expiradas": 0}
+
+
+def normalizar_pergunta(pergunta):
+    """Forma canônica da pergunta, usada na chave do cache."""
+    texto = unicodedata.normalize("NFKD", pergunta.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    palavras = re.findall(r"[a-z0-9]+", texto)
+    return " ".join(p for p in palavras if p not in _PALAVRAS_IGNORADAS)
+
+
+def _chave(pergunta, versao):
+    return hashlib.sha1(f"{versao}|{normalizar_pergunta(pergunta)}".encode()).hexdigest()
+
+
+@contextmanager
+def _conectar():
+    """Conexão curta ao SQLite: uma transação por uso, fechada no fim."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    con = sqlite3.connect(CAMINHO_BANCO, timeout=5)
+    try:
+        with con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS respostas ("
+                " chave TEXT PRIMARY KEY, versao TEXT, pergunta TEXT, resposta TEXT,"
+                " criado_em REAL, acessado_em REAL)"
+            )
+            yield con
+    finally:
+        con.close()
+
+
+def obter(pergunta, versao):
+    """Resposta em cache para a pergunta nessa versão dos dados, ou None."""
+    if versao is None:
+        return None
+    chave = _chave(pergunta, versao)
+    agora = time.time()
+    with _trava:
+        entrada = _memoria.get(chave)
+        if entrada is not None:
+            resposta, criado_em = entrada
+            if agora - criado_em <= TTL_SEGUNDOS:
+                _memoria.move_to_end(chave)
+                _metricas["acertos_memoria"] += 1
+                return resposta
+            del _memoria[chave]
+            _metricas["expiradas"] += 1
+
+    try:
+        with _conectar() as con:
+            linha = con.execute(
+                "SELECT resposta, criado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is not None and agora - linha[1] > TTL_SEGUNDOS:
+                con.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                linha = None
+                with _trava:
+                    _metricas["expiradas"] += 1
+            elif linha is not None:
+                con.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+    except sqlite3.Error as e:
+        print(f"Aviso: cache de respostas em disco indisponível: {e}")
+        linha = None
+
+    with _trava:
+        if linha is None:
+            _metricas["falhas"] += 1
+            return None
+        _metricas["acertos_disco"] += 1
+        _guardar_memoria(chave, linha[0], linha[1])
+    return linha[0]
+
+
+def _guardar_memoria(chave, resposta, criado_em):
+    _memoria[chave] = (resposta, criado_em)
+    _memoria.move_to_end(chave)
+    while len(_memoria) > MAX_MEMORIA:
+        _memoria.popitem(last=False)
+
+
+def guardar(pergunta, versao, resposta):
+    """Guarda a resposta nas duas camadas, respeitando os limites de tamanho."""
+    if versao is None:
+        return
+    chave = _chave(pergunta, versao)
+    agora = time.time()
+    with _trava:
+        _guardar_memoria(chave, resposta, agora)
+        _metricas["gravacoes"] += 1
+    try:
+        with _conectar() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?)",
+                (chave, versao, pergunta, resposta, agora, agora),
+            )
+            # Expiração + LRU em disco: remove as vencidas (inclusive de versões antigas)
+            # e mantém só as MAX_DISCO entradas acessadas mais recentemente
+            con.execute("DELETE FROM respostas WHERE criado_em < ?", (agora - TTL_SEGUNDOS,))
+            con.execute(
+                "DELETE FROM respostas WHERE chave NOT IN "
+                "(SELECT chave FROM respostas ORDER BY acessado_em DESC LIMIT ?)",
+                (MAX_DISCO,),
+            )
+    except sqlite3.Error as e:
+        print(f"Aviso: não foi possível gravar no cache de respostas: {e}")
+
+
+def limpar():
+    """Apaga todas as respostas (memória e disco)."""
+    with _trava:
+        _memoria.clear()
+    try:
+        with _conectar() as con:
+            con.execute("DELETE FROM respostas")
+    except sqlite3.Error as e:
+        print(f"Aviso: não foi possível limpar o cache de respostas: {e}")
+
+
+def metricas():
+    """Acertos (memória/disco), falhas, gravações, expiradas e taxa de acerto."""
+    with _trava:
+        resultado = dict(_metricas)
+        resultado["itens_memoria"] = len(_memoria)
+    consultas = resultado["acertos_memoria"] + resultado["acertos_disco"] + resultado["falhas"]
+    acertos = resultado["acertos_memoria"] + resultado["acertos_disco"]
+    resultado["taxa_acerto"] = acertos / consultas if consultas else 0.0
+    return resultado
@@ -0,0 +1,406 @@
+# consulta_segura.py
+"""
+Motor de consultas seguro para as expressões Pandas geradas pelo LLM.
+
+Substitui o eval() livre das ferramentas de consulta:
+  - a expressão é analisada (AST) e só nós, nomes e atributos permitidos passam;
+    nada de lambdas, compreensões, atributos "_", IO (nem pelo nome do método em
+    texto, como em agg('to_csv', ...)), eval/query, apply linha a linha, format
+    de strings (que acessa atributos pelo texto), merge/join nem potências e
+    repetições sem limite;
+  - a versão compilada é guardada em cache pelo texto normalizado da query,
+    então a mesma pergunta não paga parse/compile de novo;
+  - a execução roda em processos de consulta separados, criados uma vez e
+    reutilizados, com limite de tempo e de memória: ao estourar o tempo o
+    processo é morto (e outro é criado na próxima consulta), então nem código C
+    do pandas nem uma conta Python gigante seguram o servidor;
+  - os DataFrames são enviados a cada processo só quando mudam (novo snapshot ou
+    partições lidas para a consulta); cada processo guarda a sua cópia;
+  - o processo de consulta devolve no máximo LINHAS_MAX_RESULTADO linhas, que
+    resultado_ferramenta.py resume (prévia, estatísticas e paginação);
+  - erros saem como ErroConsulta, com um código estável para o agente.
+"""
+import ast
+import multiprocessing
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from resultado_ferramenta import formatar
+
+# Limites padrão por consulta
+TEMPO_MAX_SEGUNDOS = 10.0
+MEMORIA_MAX_MB = 1024  # memória que a consulta pode alocar além da já usada pelo processo
+CONSULTAS_SIMULTANEAS = 4
+LINHAS_MAX_RESULTADO = 1_000  # linhas devolvidas pelo processo de consulta
+EXPOENTE_MAX = 16
+TAMANHO_CACHE_COMPILACAO = 512
+
+# Nós de AST aceitos em uma expressão de consulta
+_NOS_PERMITIDOS = (
+    ast.Expression, ast.Call, ast.Attribute, ast.Subscript, ast.Slice, ast.Name, ast.Load,
+    ast.Constant, ast.Tuple, ast.List, ast.Dict, ast.keyword, ast.Compare, ast.BoolOp,
+    ast.BinOp, ast.UnaryOp, ast.IfExp, ast.Starred,
+    ast.And, ast.Or, ast.Not, ast.Invert, ast.USub, ast.UAdd,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.BitAnd, ast.BitOr, ast.BitXor,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+)
+
+# Funções embutidas disponíveis. Só os tipos podem ser passados como valor
+# (ex.: .astype(str)); as demais só podem ser chamadas
+_BUILTINS = {
+    "len": len, "round": round, "abs": abs, "min": min, "max": max, "sum": sum, "sorted": sorted,
+    "list": list, "dict": dict, "tuple": tuple, "set": set, "str": str, "int": int, "float": float,
+    "bool": bool,
+}
+_TIPOS_COMO_VALOR = {"str", "int", "float", "bool"}
+_CONSTANTES = {"True": True, "False": False, "None": None}
+
+# Atributos de `pd` liberados
+_ATRIBUTOS_PD = {
+    "to_datetime", "to_numeric", "Timestamp", "Timedelta", "DateOffset", "NA", "NaT", "isna", "notna",
+    "concat", "cut", "qcut", "Grouper", "Series", "DataFrame", "IndexSlice",
+}
+
+# Métodos barrados: execução Python por linha, avaliação de strings, IO e escrita
+_ATRIBUTOS_BLOQUEADOS = {
+    "apply", "applymap", "map", "pipe", "iterrows", "itertuples", "items", "iteritems",
+    "eval", "query", "plot", "hist", "boxplot", "tofile", "dump", "dumps",
+    "to_pickle", "to_csv", "to_excel", "to_parquet", "to_feather", "to_gbq",
+    "to_sql", "to_hdf", "to_json", "to_clipboard", "to_html", "to_latex", "to_stata", "to_orc",
+    "to_xml", "to_markdown", "read_csv", "read_pickle", "read_parquet", "read_excel", "read_sql",
+    "read_json", "read_html", "read_fwf", "read_table", "read_feather", "read_orc", "read_xml",
+    "read_clipboard", "read_hdf", "read_stata", "read_sas", "read_spss",
+    # str.format/format_map acessam atributos pelo texto ('{0.__init__.__globals__}'); o
+    # Styler formata valores com strings de formato do mesmo jeito
+    "format", "format_map", "style",
+    # Junções podem multiplicar linhas (chaves repetidas); use indice_nf.juntar_cabecalho
+    "merge", "join",
+}
+
+# Métodos que executam uma função por linha quando chamados com axis=1
+_METODOS_POR_LINHA = {"agg", "aggregate", "transform"}
+
+# Métodos liberados só sem argumentos posicionais: o primeiro (to_string) ou o
+# segundo (info) é o arquivo de saída
+_METODOS_ESCRITA = {"to_string", "info"}
+
+# Argumentos nomeados que fariam a consulta gravar em arquivo (ex.: to_string(buf=...))
+_ARGUMENTOS_BLOQUEADOS = {"buf", "path", "path_or_buf", "excel_writer"}
+
+# agg/transform aceitam o nome do método como texto (df.agg('to_csv', 0, 'arq')):
+# textos com nome de método barrado ou privado também são barrados
+_NOMES_BLOQUEADOS = _ATRIBUTOS_BLOQUEADOS | _METODOS_ESCRITA
+_NOME_PRIVADO = re.compile(r"_+[A-Za-z]\w*")
+
+
+class ErroConsulta(Exception):
+    """Erro de consulta com código estável: sintaxe, nao_permitido, tempo_excedido, memoria_excedida ou execucao."""
+
+    def __init__(self, codigo, mensagem):
+        super().__init__(mensagem)
+        self.codigo = codigo
+        self.mensagem = mensagem
+
+    def __str__(self):
+        return f"[{self.codigo}] {self.mensagem}"
+
+
+def _expoente_limitado(no):
+    """True se o expoente é uma constante numérica pequena (ex.: 2, 0.5, -1)."""
+    try:
+        valor = ast.literal_eval(no)
+    except ValueError:
+        return False
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and abs(valor) <= EXPOENTE_MAX
+
+
+def _sequencia_literal(no):
+    return isinstance(no, (ast.List, ast.Tuple, ast.Dict)) or (
+        isinstance(no, ast.Constant) and isinstance(no.value, (str, bytes)))
+
+
+def _validar(arvore, nomes_dados):
+    """Percorre a AST e levanta ErroConsulta na primeira construção não permitida."""
+    permitidos = set(nomes_dados) | set(_BUILTINS) | set(_CONSTANTES) | {"pd"}
+    chamados = {id(n.func) for n in ast.walk(arvore) if isinstance(n, ast.Call)}
+
+    for no in ast.walk(arvore):
+        if not isinstance(no, _NOS_PERMITIDOS):
+            raise ErroConsulta("nao_permitido", f"Construção não permitida na consulta: {type(no).__name__}.")
+        if isinstance(no, ast.Name):
+            if no.id not in permitidos:
+                raise ErroConsulta("nao_permitido", f"Nome desconhecido: '{no.id}'. Use {sorted(nomes_dados)}.")
+            if no.id in _BUILTINS and no.id not in _TIPOS_COMO_VALOR and id(no) not in chamados:
+                raise ErroConsulta(
+                    "nao_permitido",
+                    f"Não passe '{no.id}' como função: isso executa Python linha a linha. Use operações vetorizadas.",
+                )
+            if no.id == "pd" and id(no) in chamados:
+                raise ErroConsulta("nao_permitido", "Use uma função de 'pd', por exemplo pd.to_datetime(...).")
+        elif isinstance(no, ast.Attribute):
+            if isinstance(no.value, ast.Constant):
+                raise ErroConsulta("nao_permitido", f"Métodos de constantes não são permitidos: '.{no.attr}'.")
+            if no.attr.startswith("_"):
+                raise ErroConsulta("nao_permitido", f"Atributo não permitido: '{no.attr}'.")
+            if no.attr in _ATRIBUTOS_BLOQUEADOS:
+                if no.attr in ("apply", "applymap", "map", "iterrows", "itertuples"):
+                    dica = " Use operações vetorizadas (groupby/agg, .str, .dt, .where)."
+                elif no.attr in ("merge", "join"):
+                    dica = " Para juntar itens e cabeçalho use indice_nf.juntar_cabecalho([...colunas])."
+                else:
+                    dica = ""
+                raise ErroConsulta("nao_permitido", f"Método não permitido: '{no.attr}'.{dica}")
+            if no.attr in _METODOS_ESCRITA and id(no) not in chamados:
+                raise ErroConsulta("nao_permitido", f"Não passe '.{no.attr}' como valor; chame o método.")
+            if isinstance(no.value, ast.Name) and no.value.id == "pd" and no.attr not in _ATRIBUTOS_PD:
+                raise ErroConsulta("nao_permitido", f"Função 'pd.{no.attr}' não permitida.")
+            if id(no) not in chamados and isinstance(no.value, ast.Name) and no.value.id == "pd" \
+                    and no.attr not in ("NA", "NaT", "IndexSlice"):
+                raise ErroConsulta("nao_permitido", f"Não passe 'pd.{no.attr}' como valor; chame a função.")
+        elif isinstance(no, ast.BinOp) and isinstance(no.op, ast.Pow):
+            if not _expoente_limitado(no.right) or any(
+                    isinstance(n, ast.BinOp) and isinstance(n.op, ast.Pow) for n in ast.walk(no.left)):
+                raise ErroConsulta(
+                    "nao_permitido", f"Potência só com expoente constante de até {EXPOENTE_MAX} e sem potências aninhadas.")
+        elif isinstance(no, ast.BinOp) and isinstance(no.op, ast.Mult) \
+                and (_sequencia_literal(no.left) or _sequencia_literal(no.right)):
+            raise ErroConsulta("nao_permitido", "Repetição de strings ou listas com '*' não é permitida.")
+        elif isinstance(no, ast.Constant) and isinstance(no.value, str):
+            if no.value in _NOMES_BLOQUEADOS or _NOME_PRIVADO.fullmatch(no.value):
+                raise ErroConsulta("nao_permitido", f"Nome de método não permitido no texto: '{no.value}'.")
+        elif isinstance(no, ast.keyword):
+            if no.arg is None:
+                raise ErroConsulta("nao_permitido", "Argumentos com '**' não são permitidos; use argumentos nomeados.")
+            if no.arg in _ARGUMENTOS_BLOQUEADOS:
+                raise ErroConsulta("nao_permitido", f"Argumento não permitido: '{no.arg}'.")
+        elif isinstance(no, ast.Call) and isinstance(no.func, ast.Attribute) and no.func.attr in _METODOS_ESCRITA:
+            if no.args:
+                raise ErroConsulta(
+                    "nao_permitido", f"'{no.func.attr}' só aceita argumentos nomeados (o posicional seria um arquivo de saída).")
+        elif isinstance(no, ast.Call) and isinstance(no.func, ast.Attribute) and no.func.attr in _METODOS_POR_LINHA:
+            for kw in no.keywords:
+                if kw.arg == "axis" and isinstance(kw.value, ast.Constant) and kw.value.value in (1, "columns"):
+                    raise ErroConsulta("nao_permitido", f"'{no.func.attr}' com axis=1 executa por linha; use operações vetorizadas.")
+
+
+def normalizar(query):
+    """Texto canônico da query (espaços, aspas e parênteses redundantes não importam)."""
+    try:
+        return ast.unparse(ast.parse(query.strip(), mode="eval"))
+    except SyntaxError as e:
+        raise ErroConsulta("sintaxe", f"Consulta inválida: {e.msg}.") from None
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_COMPILACAO)
+def _compilar_normalizada(texto, nomes_dados):
+    arvore = ast.parse(texto, mode="eval")
+    _validar(arvore, nomes_dados)
+    return compile(arvore, "<consulta>", "eval")
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_COMPILACAO)
+def compilar(query, nomes_dados):
+    """
+    Valida e compila a query. `nomes_dados` é a tupla de nomes de dados aceitos.
+    Dois níveis de cache: pelo texto recebido e pelo texto normalizado.
+    """
+    return _compilar_normalizada(normalizar(query), nomes_dados)
+
+
+# Processos de consulta: criados sob demanda a partir de um servidor limpo
+# (forkserver; spawn onde não houver) e reutilizados entre consultas. O processo
+# principal nunca é copiado por fork: ele tem várias threads (Streamlit, carga do
+# snapshot, pools do Arrow e do DuckDB) e um fork poderia herdar travas presas.
+_METODO_INICIO = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+if _METODO_INICIO == "forkserver":
+    # O servidor importa pandas uma vez; cada processo novo já nasce com ele carregado
+    multiprocessing.get_context("forkserver").set_forkserver_preload([__name__])
+_ociosos = []  # processos livres, com os dados da última consulta
+_trava_processos = threading.Lock()
+_vagas = threading.BoundedSemaphore(CONSULTAS_SIMULTANEAS)
+
+
+def _avaliar(codigo, nomes):
+    inicio = time.thread_time()
+    resultado = eval(codigo, {"__builtins__": {}, "pd": pd, **_BUILTINS, **_CONSTANTES}, nomes)
+    return resultado, time.thread_time() - inicio
+
+
+def _limitar_memoria(megabytes):
+    """
+    Limita o espaço de endereçamento do processo ao atual + `megabytes` (só Linux).
+    Com `megabytes=None` volta ao limite máximo (para receber dados novos).
+    """
+    try:
+        import resource
+
+        _, maximo = resource.getrlimit(resource.RLIMIT_AS)
+        if megabytes is None:
+            resource.setrlimit(resource.RLIMIT_AS, (maximo, maximo))
+            return
+        with open("/proc/self/statm") as arquivo:
+            atual = int(arquivo.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        limite = atual + megabytes * 2**20
+        if maximo != resource.RLIM_INFINITY:
+            limite = min(limite, maximo)
+        resource.setrlimit(resource.RLIMIT_AS, (limite, maximo))
+    except (ImportError, OSError, ValueError):
+        pass
+
+
+def _limitar_resultado(resultado):
+    """Corta tabelas e arrays em LINHAS_MAX_RESULTADO linhas antes de enviá-los ao processo principal."""
+    if isinstance(resultado, (pd.DataFrame, pd.Series)) and len(resultado) > LINHAS_MAX_RESULTADO:
+        cortado = resultado.iloc[:LINHAS_MAX_RESULTADO]
+    elif isinstance(resultado, (pd.Index, np.ndarray)) and resultado.ndim and len(resultado) > LINHAS_MAX_RESULTADO:
+        cortado = resultado[:LINHAS_MAX_RESULTADO]
+    else:
+        return resultado, None
+    aviso = (f"(Resultado limitado às primeiras {LINHAS_MAX_RESULTADO} de {len(resultado)} linhas; "
+             "filtre ou agregue mais.)")
+    return cortado, aviso
+
+
+def _laco_do_processo(conexao):
+    """
+    Laço do processo de consulta. Mensagens:
+      ("dados",) seguida dos DataFrames -> responde ("pronto",);
+      ("consulta", query, nomes_dados)  -> responde ("ok", resultado, cpu, aviso)
+                                           ou ("erro", código, mensagem).
+    """
+    nomes = {}
+    while True:
+        try:
+            mensagem = conexao.recv()
+        except EOFError:
+            return
+        if mensagem[0] == "dados":
+            nomes = None  # libera os dados anteriores antes de receber os novos
+            _limitar_memoria(None)
+            nomes = conexao.recv()
+            conexao.send(("pronto",))
+            continue
+
+        _, query, nomes_dados = mensagem
+        _limitar_memoria(MEMORIA_MAX_MB)
+        try:
+            resultado, cpu = _avaliar(compilar(query, nomes_dados), nomes)
+            resultado, aviso = _limitar_resultado(resultado)
+            try:
+                conexao.send(("ok", resultado, cpu, aviso))
+            except Exception:
+                # Resultado que não pode ser serializado (ex.: um GroupBy) volta como texto
+                conexao.send(("ok", str(resultado), cpu, aviso))
+        except MemoryError:
+            conexao.send(("erro", "memoria_excedida",
+                          f"A consulta passou de {MEMORIA_MAX_MB} MB. Filtre antes de agrupar e selecione só as colunas necessárias."))
+        except ErroConsulta as e:
+            conexao.send(("erro", e.codigo, e.mensagem))
+        except Exception as e:
+            conexao.send(("erro", "execucao", f"{type(e).__name__}: {e}"))
+        finally:
+            resultado = None
+
+
+class _ProcessoConsulta:
+    """
+    Processo de consulta reutilizável. Os DataFrames são enviados uma vez e
+    ficam no processo até chegar uma consulta com outros dados.
+    """
+
+    def __init__(self):
+        contexto = multiprocessing.get_context(_METODO_INICIO)
+        self.conexao, filho = contexto.Pipe()
+        self.processo = contexto.Process(target=_laco_do_processo, args=(filho,), name="consulta", daemon=True)
+        self.processo.start()
+        filho.close()
+        self.nomes = None  # dados já enviados; a referência mantém a comparação por identidade válida
+        self.encerrado = False
+
+    def tem_dados(self, nomes):
+        return self.nomes is not None and self.nomes.keys() == nomes.keys() and all(
+            self.nomes[nome] is valor for nome, valor in nomes.items())
+
+    def executar(self, query, nomes, tempo_max):
+        """Retorna (resultado, cpu, aviso). Levanta TimeoutError se passar de `tempo_max`."""
+        try:
+            if not self.tem_dados(nomes):
+                self.nomes = None
+                self.conexao.send(("dados",))
+                self.conexao.send(nomes)
+                self.conexao.recv()
+                self.nomes = dict(nomes)
+            self.conexao.send(("consulta", query, tuple(sorted(nomes))))
+            if not self.conexao.poll(tempo_max):
+                raise TimeoutError
+            resposta = self.conexao.recv()
+        except TimeoutError:
+            raise
+        except (EOFError, OSError):
+            # O processo morreu sem responder (ex.: morto pelo sistema por falta de memória)
+            self.encerrar()
+            raise ErroConsulta(
+                "execucao", f"A consulta foi interrompida (código de saída {self.processo.exitcode}).") from None
+        if resposta[0] == "erro":
+            raise ErroConsulta(resposta[1], resposta[2])
+        return resposta[1], resposta[2], resposta[3]
+
+    def encerrar(self):
+        self.encerrado = True
+        if self.processo.is_alive():
+            self.processo.kill()
+        self.processo.join()
+        self.conexao.close()
+
+
+def _obter_processo(nomes):
+    """Processo livre, de preferência um que já tenha esses dados; senão cria um novo."""
+    with _trava_processos:
+        for i, processo in enumerate(_ociosos):
+            if processo.tem_dados(nomes):
+                return _ociosos.pop(i)
+        if _ociosos:
+            return _ociosos.pop()
+    return _ProcessoConsulta()
+
+
+def executar(query, nomes, tempo_max=TEMPO_MAX_SEGUNDOS):
+    """
+    Executa a query com os DataFrames em `nomes` (ex.: {"global_df_itens": df}).
+    Retorna o resultado já em texto (resumido se for grande, ver resultado_ferramenta.py).
+    Levanta ErroConsulta em caso de query inválida, tempo ou memória excedidos ou erro na execução.
+    """
+    # Valida aqui também: consultas barradas nem chegam ao processo de consulta
+    compilar(query, tuple(sorted(nomes)))
+    if not _vagas.acquire(timeout=tempo_max):
+        raise ErroConsulta("tempo_excedido", "Muitas consultas em andamento; tente de novo em instantes.")
+    processo = None
+    try:
+        processo = _obter_processo(nomes)
+        resultado, cpu, aviso = processo.executar(query, nomes, tempo_max)
+    except TimeoutError:
+        processo.encerrar()
+        raise ErroConsulta(
+            "tempo_excedido",
+            f"A consulta passou de {tempo_max:.0f}s e foi interrompida. Simplifique-a (filtre antes de agrupar).",
+        ) from None
+    except ErroConsulta:
+        raise
+    except Exception as e:
+        if processo is not None:
+            processo.encerrar()
+        raise ErroConsulta("execucao", f"{type(e).__name__}: {e}") from None
+    finally:
+        if processo is not None and not processo.encerrado:
+            with _trava_processos:
+                _ociosos.append(processo)
+        _vagas.release()
+    if cpu > tempo_max / 2:
+        print(f"Aviso: consulta lenta ({cpu:.2f}s de CPU): {query}")
+    return formatar(resultado, observacao=aviso)
@@ -0,0 +1,159 @@
+# consulta_sql.py
+"""
+Backend SQL (DuckDB, em processo) para as consultas do agente.
+
+As NFs ficam expostas como tabelas SQL, sem cópia pelo caminho Python:
+  - `cabecalho` e `itens`: o mês carregado no snapshot (data_store.py),
+    convertidos uma única vez por versão para tabelas Arrow;
+  - `cabecalho_todos` e `itens_todos`: o dataset Parquet particionado
+    (dataset_nf.py) com as colunas MES e UF, lido sob demanda; filtros em
+    MES/UF só abrem as partições necessárias.
+
+O DuckDB executa agrupamentos e junções vetorizados e em várias threads.
+Cada consulta:
+  - precisa ser um único SELECT (ou WITH ... SELECT);
+  - roda sem acesso a arquivos (enable_external_access=false);
+  - é interrompida de verdade (interrupt) ao passar do limite de tempo;
+  - traz no máximo `linhas_max` linhas do DuckDB, e o texto devolvido ao agente
+    é limitado por resultado_ferramenta.py (prévia, estatísticas e paginação).
+"""
+import os
+import threading
+
+import data_store
+from dataset_nf import DATASET_DIR, TABELAS, abrir_dataset
+from resultado_ferramenta import formatar
+
+TEMPO_MAX_SEGUNDOS = 15.0
+LINHAS_MAX_RESULTADO = 1_000
+THREADS = os.cpu_count() or 1
+MEMORIA_MAX = "1GB"
+
+_conexao = None  # (versão do snapshot, conexão, {nome: objeto Arrow})
+_trava = threading.Lock()
+
+
+class ErroSQL(Exception):
+    """Erro de consulta SQL com código estável: sintaxe, nao_permitido, tempo_excedido ou execucao."""
+
+    def __init__(self, codigo, mensagem):
+        super().__init__(mensagem)
+        self.codigo = codigo
+        self.mensagem = mensagem
+
+    def __str__(self):
+        return f"[{self.codigo}] {self.mensagem}"
+
+
+def _tabelas_dataset(destino=DATASET_DIR):
+    """Datasets Arrow (lazy) de cada tabela do Parquet particionado, se já gerado."""
+    tabelas = {}
+    for tabela in TABELAS:
+        try:
+            tabelas[f"{tabela}_todos"] = abrir_dataset(tabela, destino)
+        except FileNotFoundError:
+            pass
+    return tabelas
+
+
+def _montar_conexao(snapshot):
+    import duckdb
+    import pyarrow as pa
+
+    tabelas = {}
+    if snapshot is not None:
+        tabelas["cabecalho"] = pa.Table.from_pandas(snapshot.df_cabecalho, preserve_index=False)
+        tabelas["itens"] = pa.Table.from_pandas(snapshot.df_itens, preserve_index=False)
+    tabelas.update(_tabelas_dataset())
+
+    con = duckdb.connect(config={"threads": THREADS, "memory_limit": MEMORIA_MAX})
+    con.execute("SET enable_external_access = false")
+    con.execute("SET lock_configuration = true")
+    return con, tabelas
+
+
+def _obter_conexao():
+    """Conexão e tabelas da versão atual dos dados; remontadas só quando a versão muda."""
+    global _conexao
+    snapshot = data_store.obter_snapshot()
+    versao = snapshot.versao if snapshot is not None else None
+    with _trava:
+        if _conexao is None or _conexao[0] != versao:
+            _conexao = (versao, *_montar_conexao(snapshot))
+        return _conexao[1], _conexao[2]
+
+
+def invalidar():
+    """Descarta a conexão atual (ex.: depois de regerar o dataset particionado)."""
+    global _conexao
+    with _trava:
+        _conexao = None
+
+
+def tabelas_disponiveis():
+    """Nome -> lista de colunas de cada tabela SQL disponível."""
+    _, tabelas = _obter_conexao()
+    return {nome: list(tabela.schema.names) for nome, tabela in tabelas.items()}
+
+
+def _validar(con, sql):
+    from duckdb import StatementType
+
+    try:
+        comandos = con.extract_statements(sql)
+    except Exception as e:
+        raise ErroSQL("sintaxe", f"SQL inválido: {e}") from None
+    if len(comandos) != 1:
+        raise ErroSQL("nao_permitido", "Envie um único comando SQL por consulta.")
+    if comandos[0].type != StatementType.SELECT:
+        raise ErroSQL("nao_permitido", "Somente consultas de leitura (SELECT/WITH) são permitidas.")
+
+
+def executar_sql(sql, tempo_max=TEMPO_MAX_SEGUNDOS, linhas_max=LINHAS_MAX_RESULTADO):
+    """
+    Executa o SELECT e retorna um DataFrame com no máximo `linhas_max` linhas,
+    mais um indicador de que o resultado foi cortado.
+    Levanta ErroSQL se a consulta não for permitida, passar do tempo ou falhar.
+    """
+    sql = sql.strip().rstrip(";").strip()
+    con, tabelas = _obter_conexao()
+    _validar(con, sql)
+
+    cursor = con.cursor()
+    for nome, tabela in tabelas.items():
+        cursor.register(nome, tabela)
+
+    resultado = {}
+
+    def _rodar():
+        try:
+            resultado["df"] = cursor.sql(sql).limit(linhas_max + 1).df()
+        except Exception as e:
+            resultado["erro"] = e
+
+    worker = threading.Thread(target=_rodar, name="consulta-sql", daemon=True)
+    worker.start()
+    worker.join(tempo_max)
+    if worker.is_alive():
+        cursor.interrupt()
+        worker.join()
+        cursor.close()
+        raise ErroSQL(
+            "tempo_excedido",
+            f"A consulta passou de {tempo_max:.0f}s e foi interrompida. Filtre antes de agrupar ou juntar.",
+        )
+    cursor.close()
+    if "erro" in resultado:
+        raise ErroSQL("execucao", str(resultado["erro"]).strip()) from None
+
+    df = resultado["df"]
+    return df.head(linhas_max), len(df) > linhas_max
+
+
+def consultar(sql, tempo_max=TEMPO_MAX_SEGUNDOS, linhas_max=LINHAS_MAX_RESULTADO):
+    """Executa o SELECT e devolve o resultado já em texto (para o agente)."""
+    df, cortado = executar_sql(sql, tempo_max, linhas_max)
+    if len(df) == 1 and len(df.columns) == 1:
+        return str(df.iat[0, 0])
+    aviso = f"(Resultado limitado às primeiras {linhas_max} linhas; use LIMIT ou agregue mais.)" if cortado else None
+    return formatar(df, observacao=aviso)
@@ -1,36 +1,196 @@
 # data_loader.py
 import pandas as pd
 import os
+import re
+import json
+import hashlib
 
-# Caminhos dos arquivos CSV
+from schema import SCHEMA_CABECALHO, SCHEMA_ITENS, SCHEMA_VERSAO, aplicar_schema, dtypes_leitura, uso_memoria
+
+# Diretório dos arquivos CSV. Cada mês tem um par YYYYMM_NFs_Cabecalho.csv / YYYYMM_NFs_Itens.csv
 CSV_DIR = "csv"
-NF_CABECALHO_CSV = os.path.join(CSV_DIR, "202401_NFs_Cabecalho.csv")
-NF_ITENS_CSV = os.path.join(CSV_DIR, "202401_NFs_Itens.csv")
+PADRAO_CSV_NF = re.compile(r"^(\d{6})_NFs_(Cabecalho|Itens)\.csv$")
+
+# Chave usada nos metadados do arquivo Arrow para guardar a assinatura do CSV de origem
+_CHAVE_ASSINATURA = b"nf_fonte_csv"
+
+
+def _hash_arquivo(caminho, bloco=1 << 20):
+    """Calcula o SHA-256 do arquivo lendo em blocos de 1 MiB."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for parte in iter(lambda: f.read(bloco), b""):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def assinatura_csv(caminho, calcular_hash=True):
+    """Retorna a assinatura (versão do schema, mtime, tamanho e hash) do CSV de origem."""
+    st = os.stat(caminho)
+    assinatura = {"schema_versao": SCHEMA_VERSAO, "mtime_ns": st.st_mtime_ns, "tamanho": st.st_size}
+    if calcular_hash:
+        assinatura["sha256"] = _hash_arquivo(caminho)
+    return assinatura
+
+
+def caminho_cache(caminho_csv):
+    """Caminho do arquivo Arrow (IPC) gravado ao lado do CSV."""
+    return os.path.splitext(caminho_csv)[0] + ".arrow"
+
+
+def _ler_assinatura_cache(caminho_arrow):
+    """Lê apenas o schema do arquivo Arrow e devolve a assinatura guardada nele."""
+    import pyarrow as pa
+
+    with pa.memory_map(caminho_arrow, "r") as fonte:
+        metadados = pa.ipc.open_file(fonte).schema.metadata or {}
+    bruto = metadados.get(_CHAVE_ASSINATURA)
+    return json.loads(bruto) if bruto else None
+
+
+def _cache_valido(caminho_csv, caminho_arrow):
+    """
+    Verifica se o cache Arrow corresponde ao CSV atual.
+    Compara mtime e tamanho (barato); se só o mtime mudou, confirma pelo hash.
+    """
+    if not os.path.exists(caminho_arrow):
+        return False
+    try:
+        guardada = _ler_assinatura_cache(caminho_arrow)
+    except Exception:
+        return False
+    if not guardada:
+        return False
+
+    atual = assinatura_csv(caminho_csv, calcular_hash=False)
+    if atual["schema_versao"] != guardada.get("schema_versao"):
+        return False
+    if atual["tamanho"] != guardada.get("tamanho"):
+        return False
+    if atual["mtime_ns"] == guardada.get("mtime_ns"):
+        return True
+    # Arquivo "tocado" (cópia, checkout) mas com o mesmo tamanho: decide pelo conteúdo
+    return _hash_arquivo(caminho_csv) == guardada.get("sha256")
+
+
+def _gravar_cache(df, caminho_csv, caminho_arrow):
+    """Grava o DataFrame tipado como Arrow IPC, de forma atômica, com a assinatura do CSV."""
+    import pyarrow as pa
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[_CHAVE_ASSINATURA] = json.dumps(assinatura_csv(caminho_csv)).encode()
+    tabela = tabela.replace_schema_metadata(metadados)
+
+    temporario = caminho_arrow + ".tmp"
+    with pa.OSFile(temporario, "wb") as destino:
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(temporario, caminho_arrow)
+
+
+def _ler_cache(caminho_arrow):
+    """Lê o arquivo Arrow via memory-map, sem reparsear texto."""
+    import pyarrow as pa
+
+    with pa.memory_map(caminho_arrow, "r") as fonte:
+        tabela = pa.ipc.open_file(fonte).read_all()
+    # Mantém as colunas de texto como string Arrow (sem materializar objetos Python)
+    tipo_string = pd.StringDtype("pyarrow")
+    return tabela.to_pandas(
+        types_mapper=lambda t: tipo_string if t in (pa.string(), pa.large_string()) else None
+    )
+
+
+def ler_csv_com_cache(caminho_csv, schema=None, usar_cache=True, **kwargs_read_csv):
+    """
+    Lê um CSV usando o cache Arrow gravado ao lado dele.
+    Na primeira leitura (ou quando o CSV ou o schema mudam) faz o parse, aplica
+    o schema declarado (ver schema.py) e regrava o cache já tipado.
+    Falhas no cache nunca impedem a leitura: caem para o pd.read_csv normal.
+    """
+    caminho_arrow = caminho_cache(caminho_csv)
+    if usar_cache and _cache_valido(caminho_csv, caminho_arrow):
+        try:
+            return _ler_cache(caminho_arrow)
+        except Exception as e:
+            print(f"Aviso: cache '{caminho_arrow}' ilegível ({e}); relendo o CSV.")
+
+    if schema is not None:
+        kwargs_read_csv.setdefault("dtype", dtypes_leitura(schema))
+    df = pd.read_csv(caminho_csv, **kwargs_read_csv)
+    if schema is not None:
+        df = aplicar_schema(df, schema)
+    if usar_cache:
+        try:
+            _gravar_cache(df, caminho_csv, caminho_arrow)
+        except Exception as e:
+            print(f"Aviso: não foi possível gravar o cache '{caminho_arrow}': {e}")
+    return df
+
+
+def descobrir_meses(csv_dir=CSV_DIR):
+    """
+    Procura os arquivos YYYYMM_NFs_Cabecalho.csv / YYYYMM_NFs_Itens.csv em `csv_dir`.
+    Retorna um dicionário ordenado por mês: {"202401": {"cabecalho": caminho, "itens": caminho}}.
+    Meses sem um dos dois arquivos são ignorados.
+    """
+    encontrados = {}
+    for nome in os.listdir(csv_dir):
+        m = PADRAO_CSV_NF.match(nome)
+        if m:
+            mes, tipo = m.groups()
+            encontrados.setdefault(mes, {})[tipo.lower()] = os.path.join(csv_dir, nome)
+    return {
+        mes: arquivos for mes, arquivos in sorted(encontrados.items())
+        if "cabecalho" in arquivos and "itens" in arquivos
+    }
+
+
+def relatorio_memoria(df_cabecalho, df_itens):
+    """Imprime o uso de memória por coluna dos dois DataFrames de NFs."""
+    for nome, df in (("CABEÇALHO", df_cabecalho), ("ITENS", df_itens)):
+        print(f"\nUso de memória por coluna - {nome}:")
+        print(uso_memoria(df).to_string())
+
 
-def carregar_csvs():
+def carregar_csvs(mes=None, usar_cache=True, mostrar_memoria=False):
     """
-    Carrega os arquivos CSV de cabeçalho e itens em DataFrames Pandas.
+    Carrega os arquivos CSV de cabeçalho e itens de um mês em DataFrames Pandas,
+    tipados conforme os schemas declarados em schema.py.
+    Sem `mes` (formato YYYYMM), carrega o mês mais recente encontrado em CSV_DIR.
+    Para consultar vários meses sem carregar tudo na memória, use dataset_nf.py.
+    Usa o cache Arrow (.arrow ao lado de cada CSV) quando o CSV não mudou.
     Retorna uma tupla (df_cabecalho, df_itens) ou (None, None) em caso de erro.
     """
     try:
-        df_cabecalho = pd.read_csv(NF_CABECALHO_CSV, decimal='.', sep=',')
-        df_itens = pd.read_csv(NF_ITENS_CSV, decimal='.', sep=',')
+        meses = descobrir_meses()
+        if not meses:
+            raise FileNotFoundError(CSV_DIR)
+        mes = mes or list(meses)[-1]
+        if mes not in meses:
+            raise FileNotFoundError(mes)
+        arquivos = meses[mes]
+        df_cabecalho = ler_csv_com_cache(arquivos["cabecalho"], SCHEMA_CABECALHO, usar_cache, decimal='.', sep=',')
+        df_itens = ler_csv_com_cache(arquivos["itens"], SCHEMA_ITENS, usar_cache, decimal='.', sep=',')
 
-        print(f"Arquivos CSV carregados com sucesso de '{CSV_DIR}/'.")
+        print(f"Arquivos CSV do mês {mes} carregados com sucesso de '{CSV_DIR}/'.")
+        if mostrar_memoria:
+            relatorio_memoria(df_cabecalho, df_itens)
         # Retornamos os DataFrames
         return df_cabecalho, df_itens
     except FileNotFoundError:
-        print(f"Erro: Certifique-se de que '{NF_CABECALHO_CSV}' e '{NF_ITENS_CSV}' estão no diretório '{CSV_DIR}'.")
+        print(f"Erro: Certifique-se de que os arquivos 'YYYYMM_NFs_Cabecalho.csv' e 'YYYYMM_NFs_Itens.csv'{f' do mês {mes}' if mes else ''} estão no diretório '{CSV_DIR}'.")
         return None, None
     except Exception as e:
         print(f"Erro ao carregar os CSVs: {e}")
         return None, None
 
 if __name__ == "__main__":
-    df_c, df_i = carregar_csvs()
+    df_c, df_i = carregar_csvs(mostrar_memoria=True)
     if df_c is not None:
         print("\nPrimeiras 5 linhas do Cabeçalho:")
         print(df_c.head())
     if df_i is not None:
         print("\nPrimeiras 5 linhas dos Itens:")
-        print(df_i.head())
\ No newline at end of file
+        print(df_i.head())
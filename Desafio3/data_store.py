@@ -0,0 +1,255 @@
+# data_store.py
+"""
+Armazém único, somente leitura, dos DataFrames de NFs para todo o processo.
+
+Os dados ficam em um `SnapshotNF` imutável. Todas as sessões (Streamlit, CLI,
+ferramentas do agente) leem o mesmo snapshot, carregado uma única vez por
+processo. Uma recarga monta um snapshot novo por completo e só então troca a
+referência, então quem já pegou o snapshot antigo continua vendo dados
+consistentes até terminar.
+
+Entre processos (vários workers), o compartilhamento vem do cache Arrow
+memory-mapped gravado por data_loader.py: as páginas do arquivo ficam no
+cache do sistema operacional e não são parseadas de novo em cada worker.
+
+A carga é iniciada em segundo plano na partida do processo
+(`iniciar_carga()`); a interface e as ferramentas consultam `saude()` ou
+esperam com `aguardar_pronto()`, sem precisar de um passo "carregar os dados".
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pandas as pd
+
+from agregados import CuboNF, agregar
+from indice_nf import IndiceNF
+from data_loader import assinatura_csv, carregar_csvs, descobrir_meses
+from schema import SCHEMA_VERSAO
+
+
+@dataclass(frozen=True)
+class SnapshotNF:
+    """Versão imutável dos dados carregados. Trate os DataFrames como somente leitura."""
+    versao: str
+    mes: str
+    df_cabecalho: pd.DataFrame = field(repr=False)
+    df_itens: pd.DataFrame = field(repr=False)
+    carregado_em: datetime
+    # Agregados do mês (agregados.py), calculados uma vez na carga
+    cubo: CuboNF = field(default=None, repr=False)
+    # Índice cabeçalho ↔ itens por CHAVE DE ACESSO (indice_nf.py); df_itens já vem ordenado por ele
+    indice: IndiceNF = field(default=None, repr=False)
+
+
+# Tempo máximo que uma consulta espera a carga em segundo plano terminar
+TEMPO_ESPERA_PRONTO = 60.0
+# Snapshots de outros meses (ex.: diligência de um mês anterior) mantidos em memória
+MESES_EM_MEMORIA = 2
+
+_snapshot = None
+_trava = threading.Lock()
+_outros_meses = OrderedDict()  # mês -> SnapshotNF (LRU), separados do snapshot compartilhado
+_trava_meses = threading.Lock()
+
+# Carga em segundo plano: estado, erro e duração, para a interface e as ferramentas
+_carga = {"estado": "nao_iniciada", "erro": None, "inicio": None, "fim": None, "tarefas_pendentes": 0}
+_carga_thread = None
+_carga_terminada = threading.Event()
+_trava_carga = threading.Lock()
+
+
+def calcular_versao(mes):
+    """
+    Versão dos dados de um mês: resumo da versão do schema e do mtime/tamanho dos
+    dois CSVs. Muda sempre que um dos arquivos muda, e é a mesma em todos os processos.
+    """
+    arquivos = descobrir_meses()[mes]
+    partes = [str(SCHEMA_VERSAO), mes]
+    for tabela in ("cabecalho", "itens"):
+        assinatura = assinatura_csv(arquivos[tabela], calcular_hash=False)
+        partes.append(f"{assinatura['mtime_ns']}:{assinatura['tamanho']}")
+    return f"{mes}-{hashlib.sha1('|'.join(partes).encode()).hexdigest()[:12]}"
+
+
+def _montar_snapshot(mes=None):
+    meses = descobrir_meses()
+    if not meses:
+        return None
+    mes = mes or list(meses)[-1]
+    if mes not in meses:
+        return None
+    versao = calcular_versao(mes)
+    df_c, df_i = carregar_csvs(mes)
+    if df_c is None or df_i is None:
+        return None
+    indice = IndiceNF(df_c, df_i)
+    return SnapshotNF(versao, mes, df_c, indice.itens, datetime.now(), CuboNF(agregar(df_c, df_i)), indice)
+
+
+def obter_snapshot():
+    """Retorna o snapshot atual, ou None se os dados ainda não foram carregados."""
+    return _snapshot
+
+
+def versao_atual():
+    """Versão dos dados carregados, ou None."""
+    snapshot = _snapshot
+    return snapshot.versao if snapshot is not None else None
+
+
+def snapshot_do_mes(mes):
+    """
+    Snapshot de um mês sem trocar o compartilhado: é o próprio compartilhado se
+    for o mesmo mês; senão vem de um cache pequeno (`MESES_EM_MEMORIA`), validado
+    pela versão dos arquivos. Retorna None se o mês não existe em csv/.
+    """
+    atual = _snapshot
+    if atual is not None and atual.mes == mes:
+        return atual
+    with _trava_meses:
+        snapshot = _outros_meses.get(mes)
+        try:
+            if snapshot is not None and snapshot.versao == calcular_versao(mes):
+                _outros_meses.move_to_end(mes)
+                return snapshot
+        except KeyError:
+            pass
+        _outros_meses.pop(mes, None)
+        novo = _montar_snapshot(mes)
+        if novo is not None:
+            _outros_meses[mes] = novo
+            while len(_outros_meses) > MESES_EM_MEMORIA:
+                _outros_meses.popitem(last=False)
+        return novo
+
+
+def carregar(mes=None):
+    """
+    Garante que os dados estejam carregados e retorna o snapshot.
+    Só a primeira chamada do processo lê os arquivos (e define o snapshot
+    compartilhado); chamadas concorrentes esperam essa leitura em vez de carregar
+    uma segunda cópia. Um `mes` diferente do compartilhado devolve um snapshot à
+    parte (snapshot_do_mes): só recarregar() troca o que todas as sessões veem.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is None:
+        with _trava:
+            if _snapshot is None:
+                novo = _montar_snapshot(mes)
+                if novo is not None:
+                    _snapshot = novo
+            snapshot = _snapshot
+    if snapshot is not None and mes is not None and snapshot.mes != mes:
+        return snapshot_do_mes(mes)
+    return snapshot
+
+
+def recarregar(mes=None, somente_se_mudou=True):
+    """
+    Recarrega os dados e troca o snapshot de forma atômica. Sem `mes`, usa o mês
+    mais recente (um mês novo em csv/ passa a ser o carregado). Com
+    `somente_se_mudou`, não faz nada se a versão não mudou.
+    Retorna o snapshot em uso após a chamada.
+    """
+    global _snapshot
+    with _trava:
+        atual = _snapshot
+        if somente_se_mudou and atual is not None:
+            try:
+                alvo = mes or list(descobrir_meses())[-1]
+                if calcular_versao(alvo) == atual.versao:
+                    return atual
+            except (IndexError, KeyError, FileNotFoundError):
+                pass
+        novo = _montar_snapshot(mes)
+        if novo is not None:
+            _snapshot = novo
+        return _snapshot
+
+
+def _carregar_em_segundo_plano(mes, tarefas_extras):
+    try:
+        snapshot = carregar(mes)
+        if snapshot is None:
+            _carga.update(estado="sem_dados", erro="Nenhum par de CSVs de NFs encontrado em 'csv/'.")
+        else:
+            _carga.update(estado="pronto", tarefas_pendentes=len(tarefas_extras))
+    except Exception as e:
+        _carga.update(estado="erro", erro=str(e))
+        snapshot = None
+    finally:
+        _carga["fim"] = time.time()
+        _carga_terminada.set()
+
+    # Tarefas que dependem dos dados (ex.: dataset particionado) não atrasam as consultas
+    if snapshot is not None:
+        for tarefa in tarefas_extras:
+            try:
+                tarefa()
+            except Exception as e:
+                print(f"Aviso: tarefa após a carga falhou: {e}")
+            _carga["tarefas_pendentes"] -= 1
+
+
+def iniciar_carga(mes=None, tarefas_extras=()):
+    """
+    Inicia a carga dos dados em uma thread de fundo e retorna na hora.
+    Chamadas repetidas não iniciam uma segunda carga; depois de um erro, tentam de novo.
+    `tarefas_extras` são funções executadas depois que o snapshot fica pronto.
+    """
+    global _carga_thread
+    with _trava_carga:
+        if _carga_thread is not None and _carga["estado"] in ("carregando", "pronto"):
+            return _carga_thread
+        _carga_terminada.clear()
+        _carga.update(estado="carregando", erro=None, inicio=time.time(), fim=None, tarefas_pendentes=0)
+        _carga_thread = threading.Thread(
+            target=_carregar_em_segundo_plano, args=(mes, tuple(tarefas_extras)), name="carga-nf", daemon=True
+        )
+        _carga_thread.start()
+        return _carga_thread
+
+
+def aguardar_pronto(timeout=TEMPO_ESPERA_PRONTO):
+    """
+    Snapshot atual, esperando até `timeout` segundos se a carga ainda está em
+    andamento. Inicia a carga se ninguém a iniciou. Retorna None se não ficou pronto.
+    """
+    snapshot = _snapshot
+    if snapshot is not None:
+        return snapshot
+    if _carga["estado"] == "nao_iniciada":
+        iniciar_carga()
+    _carga_terminada.wait(timeout)
+    return _snapshot
+
+
+def saude():
+    """Estado da carga para a interface e as ferramentas (pronto, carregando, erro...)."""
+    snapshot = _snapshot
+    agora = time.time()
+    inicio, fim = _carga["inicio"], _carga["fim"]
+    return {
+        "estado": "pronto" if snapshot is not None else _carga["estado"],
+        "pronto": snapshot is not None,
+        "mes": snapshot.mes if snapshot is not None else None,
+        "versao": snapshot.versao if snapshot is not None else None,
+        "erro": _carga["erro"],
+        "segundos_carga": round((fim or agora) - inicio, 2) if inicio else None,
+        "tarefas_pendentes": _carga["tarefas_pendentes"],
+    }
+
+
+def mensagem_indisponivel():
+    """Texto para quando os dados ainda não estão disponíveis, conforme o estado da carga."""
+    estado = saude()
+    if estado["estado"] == "carregando":
+        return f"Os dados ainda estão sendo carregados ({estado['segundos_carga']}s até agora). Tente novamente em instantes."
+    if estado["estado"] in ("erro", "sem_dados"):
+        return f"Os dados não puderam ser carregados: {estado['erro']}"
+    return "Os dados ainda não foram carregados."
@@ -0,0 +1,358 @@
+# dataset_nf.py
+"""
+Dataset particionado (Parquet, estilo Hive) com todos os meses de NFs.
+
+Cada mês encontrado em csv/ (YYYYMM_NFs_Cabecalho.csv / YYYYMM_NFs_Itens.csv)
+é gravado em:
+
+    csv/dataset/cabecalho/MES=202401/UF=SP/202401-0.parquet
+    csv/dataset/itens/MES=202401/UF=SP/202401-0.parquet
+
+onde UF é a `UF EMITENTE`. As leituras filtradas por mês e/ou UF só abrem os
+arquivos das partições envolvidas, então um ano inteiro de dados pode ser
+consultado sem carregar tudo em um único DataFrame.
+"""
+import os
+import re
+import json
+import time
+import shutil
+
+import pandas as pd
+
+from agregados import agregar, combinar, cubo_mes_existe, gravar_cubo_mes, carregar_cubo
+from data_loader import CSV_DIR, assinatura_csv, descobrir_meses, ler_csv_com_cache
+from schema import SCHEMA_CABECALHO, SCHEMA_ITENS, SCHEMA_VERSAO, aplicar_schema, dtypes_leitura, esquema_arrow
+
+DATASET_DIR = os.path.join(CSV_DIR, "dataset")
+MANIFESTO = "_manifesto.json"
+
+TABELAS = {
+    "cabecalho": SCHEMA_CABECALHO,
+    "itens": SCHEMA_ITENS,
+}
+
+# Colunas de partição (derivadas; não fazem parte do schema dos CSVs)
+COLUNA_MES = "MES"
+COLUNA_UF = "UF"
+
+# CSVs maiores que isso são ingeridos em blocos (ingerir_csv_em_blocos) em vez de lidos de uma vez
+LIMITE_LEITURA_DIRETA_MB = 256
+# Orçamento padrão de memória para a ingestão em blocos
+MEMORIA_MAX_MB = 256
+# Razão aproximada entre o pico de memória de um bloco (texto lido + colunas
+# convertidas + tabela Arrow) e o tamanho do bloco já convertido
+_FATOR_PICO_BLOCO = 3
+
+
+def _esquema_particao():
+    import pyarrow as pa
+
+    return pa.schema([(COLUNA_MES, pa.string()), (COLUNA_UF, pa.string())])
+
+
+def _ler_manifesto(destino):
+    caminho = os.path.join(destino, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_manifesto(destino, manifesto):
+    caminho = os.path.join(destino, MANIFESTO)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _mes_atualizado(manifesto, mes, arquivos, destino):
+    """
+    Um mês está atualizado se os CSVs de origem têm a mesma assinatura do
+    manifesto e o cubo de agregados do mês já foi gravado.
+    """
+    registrado = manifesto.get(mes)
+    if not registrado or registrado.get("schema_versao") != SCHEMA_VERSAO:
+        return False
+    if not cubo_mes_existe(mes, destino):
+        return False
+    for tabela, caminho in arquivos.items():
+        atual = assinatura_csv(caminho, calcular_hash=False)
+        anterior = registrado.get(tabela, {})
+        if (atual["mtime_ns"], atual["tamanho"]) != (anterior.get("mtime_ns"), anterior.get("tamanho")):
+            return False
+    return True
+
+
+def _limpar_mes(tabela, mes, destino):
+    """Remove as partições antigas do mês, para não sobrar UF obsoleta."""
+    dir_mes = os.path.join(destino, tabela, f"{COLUNA_MES}={mes}")
+    if os.path.exists(dir_mes):
+        shutil.rmtree(dir_mes)
+
+
+def gravar_particoes(df, tabela, mes, destino=DATASET_DIR, bloco=None):
+    """
+    Grava o DataFrame de um mês na tabela `tabela` do dataset, particionado por UF.
+    Sem `bloco`, as partições antigas do mês são removidas antes. Com `bloco`
+    (número do bloco na ingestão em blocos), os arquivos são acrescentados.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    if bloco is None:
+        _limpar_mes(tabela, mes, destino)
+        nome_base = f"{mes}-{{i}}.parquet"
+    else:
+        nome_base = f"{mes}-b{bloco:05d}-{{i}}.parquet"
+
+    esquema = esquema_arrow(TABELAS[tabela])
+    for campo in _esquema_particao():
+        esquema = esquema.append(campo)
+    df = df.assign(**{
+        COLUNA_MES: mes,
+        COLUNA_UF: df["UF EMITENTE"].astype("string"),
+    })
+    ds.write_dataset(
+        pa.Table.from_pandas(df, schema=esquema, preserve_index=False),
+        os.path.join(destino, tabela),
+        format="parquet",
+        partitioning=ds.partitioning(_esquema_particao(), flavor="hive"),
+        basename_template=nome_base,
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def _validar_bloco(bruto, tabela):
+    """
+    Converte um bloco lido do CSV para o schema da tabela e descarta linhas sem
+    CHAVE DE ACESSO. Retorna (df, linhas_descartadas, valores_invalidos), onde
+    valores_invalidos conta células preenchidas que viraram nulas na conversão.
+    """
+    schema = TABELAS[tabela]
+    faltando = [c for c in schema if c not in bruto.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes no CSV de {tabela}: {faltando}")
+
+    convertidas = [c for c, t in schema.items() if t in ("inteiro", "inteiro64", "decimal", "data")]
+    preenchidas = bruto[convertidas].notna()
+    df = aplicar_schema(bruto, schema)
+    valores_invalidos = int((preenchidas & df[convertidas].isna()).to_numpy().sum())
+
+    sem_chave = df["CHAVE DE ACESSO"].isna()
+    linhas_descartadas = int(sem_chave.sum())
+    if linhas_descartadas:
+        df = df[~sem_chave]
+    return df, linhas_descartadas, valores_invalidos
+
+
+def ingerir_csv_em_blocos(caminho_csv, tabela, mes, destino=DATASET_DIR, memoria_max_mb=MEMORIA_MAX_MB,
+                          linhas_primeiro_bloco=1_000):
+    """
+    Ingestão em blocos de um CSV muito grande (ex.: itens de um mês inteiro).
+    Lê o arquivo em blocos de linhas, valida/converte cada bloco para o schema e
+    acrescenta as partições Parquet do mês, sem nunca ter o arquivo inteiro na memória.
+    O tamanho do bloco é recalculado a cada bloco para que o pico estimado de
+    memória fique dentro de `memoria_max_mb`; o primeiro bloco, de
+    `linhas_primeiro_bloco` linhas, serve de amostra. Imprime o progresso em linhas/s.
+    Retorna um dicionário com as estatísticas da ingestão; a chave "agregados"
+    traz o cubo (agregados.py) da tabela, acumulado bloco a bloco.
+    """
+    orcamento = memoria_max_mb * 1024 * 1024
+    _limpar_mes(tabela, mes, destino)
+
+    leitor = pd.read_csv(
+        caminho_csv, decimal='.', sep=',', dtype=dtypes_leitura(TABELAS[tabela]), iterator=True,
+    )
+    linhas_por_bloco = linhas_primeiro_bloco
+    stats = {"linhas": 0, "blocos": 0, "linhas_descartadas": 0, "valores_invalidos": 0, "pico_bloco_mb": 0.0}
+    cubo = {}
+    inicio = time.perf_counter()
+    print(f"Ingerindo '{caminho_csv}' em blocos (orçamento de {memoria_max_mb} MB)...")
+
+    with leitor:
+        while True:
+            try:
+                bruto = leitor.get_chunk(linhas_por_bloco)
+            except StopIteration:
+                break
+            df, descartadas, invalidos = _validar_bloco(bruto, tabela)
+            del bruto
+            bytes_bloco = int(df.memory_usage(deep=True).sum())
+            gravar_particoes(df, tabela, mes, destino, bloco=stats["blocos"])
+            cubo = combinar([cubo, agregar(**{f"df_{tabela}": df})])
+
+            stats["blocos"] += 1
+            stats["linhas"] += len(df)
+            stats["linhas_descartadas"] += descartadas
+            stats["valores_invalidos"] += invalidos
+            stats["pico_bloco_mb"] = max(stats["pico_bloco_mb"], bytes_bloco * _FATOR_PICO_BLOCO / 1024 / 1024)
+
+            # Ajusta o próximo bloco ao orçamento, com base no custo real por linha
+            if len(df):
+                bytes_por_linha = bytes_bloco / len(df)
+                linhas_por_bloco = max(100, int(orcamento / (bytes_por_linha * _FATOR_PICO_BLOCO)))
+            decorrido = time.perf_counter() - inicio
+            print(f"  bloco {stats['blocos']}: {stats['linhas']:,} linhas "
+                  f"({stats['linhas'] / max(decorrido, 1e-9):,.0f} linhas/s)")
+            del df
+
+    stats["segundos"] = round(time.perf_counter() - inicio, 3)
+    stats["agregados"] = cubo
+    print(f"✔ {stats['linhas']:,} linhas de {tabela} ({mes}) ingeridas em {stats['segundos']}s; "
+          f"{stats['linhas_descartadas']} linhas sem chave descartadas, "
+          f"{stats['valores_invalidos']} valores inválidos anulados.")
+    return stats
+
+
+def construir_dataset(csv_dir=CSV_DIR, destino=DATASET_DIR, forcar=False, memoria_max_mb=MEMORIA_MAX_MB):
+    """
+    Converte todos os meses encontrados em `csv_dir` para o dataset particionado.
+    Meses cujos CSVs não mudaram desde a última execução são pulados.
+    CSVs acima de LIMITE_LEITURA_DIRETA_MB são ingeridos em blocos.
+    O cubo de agregados de cada mês convertido é gravado junto (agregados.py),
+    então meses antigos não são reagregados.
+    Retorna a lista de meses disponíveis no dataset.
+    """
+    os.makedirs(destino, exist_ok=True)
+    manifesto = _ler_manifesto(destino)
+
+    for mes, arquivos in descobrir_meses(csv_dir).items():
+        if not forcar and _mes_atualizado(manifesto, mes, arquivos, destino):
+            continue
+        print(f"Gravando partições do mês {mes}...")
+        cubos = []
+        for tabela, schema in TABELAS.items():
+            if os.path.getsize(arquivos[tabela]) > LIMITE_LEITURA_DIRETA_MB * 1024 * 1024:
+                stats = ingerir_csv_em_blocos(arquivos[tabela], tabela, mes, destino, memoria_max_mb)
+                cubos.append(stats["agregados"])
+                continue
+            df = ler_csv_com_cache(arquivos[tabela], schema, decimal='.', sep=',')
+            gravar_particoes(df, tabela, mes, destino)
+            cubos.append(agregar(**{f"df_{tabela}": df}))
+        gravar_cubo_mes(combinar(cubos), mes, destino)
+        manifesto[mes] = {"schema_versao": SCHEMA_VERSAO}
+        manifesto[mes].update({t: assinatura_csv(c, calcular_hash=False) for t, c in arquivos.items()})
+        _gravar_manifesto(destino, manifesto)
+
+    print(f"✔ Dataset particionado atualizado em '{destino}/' ({len(manifesto)} mês(es)).")
+    return sorted(manifesto)
+
+
+def versao_dataset(destino=DATASET_DIR):
+    """
+    Identificador da versão atual do dataset (muda a cada construir_dataset() que
+    grava algo), ou None se ainda não foi gerado.
+    """
+    caminho = os.path.join(destino, MANIFESTO)
+    try:
+        return str(os.stat(caminho).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+
+def meses_disponiveis(destino=DATASET_DIR):
+    """Lista os meses já gravados no dataset."""
+    return sorted(_ler_manifesto(destino))
+
+
+def ler_agregados(meses=None, destino=DATASET_DIR):
+    """CuboNF com os agregados combinados dos meses pedidos (None = todos)."""
+    meses = [str(m) for m in meses] if meses else meses_disponiveis(destino)
+    return carregar_cubo(meses, destino)
+
+
+def abrir_dataset(tabela, destino=DATASET_DIR):
+    """
+    Dataset Arrow (leitura sob demanda) de uma tabela, com as colunas de partição
+    MES e UF. Levanta FileNotFoundError se o dataset ainda não foi gerado.
+    """
+    import pyarrow.dataset as ds
+
+    if tabela not in TABELAS:
+        raise ValueError(f"Tabela desconhecida: {tabela}. Use uma de {list(TABELAS)}.")
+
+    dir_tabela = os.path.join(destino, tabela)
+    if not os.path.isdir(dir_tabela):
+        raise FileNotFoundError(
+            f"O dataset particionado ainda não foi gerado em '{destino}/'. Carregue os dados primeiro."
+        )
+    return ds.dataset(
+        dir_tabela,
+        format="parquet",
+        partitioning=ds.partitioning(_esquema_particao(), flavor="hive"),
+    )
+
+
+def ler_dataset(tabela, meses=None, ufs=None, colunas=None, destino=DATASET_DIR):
+    """
+    Lê a tabela ("cabecalho" ou "itens") do dataset, abrindo apenas as partições
+    dos `meses` (YYYYMM) e `ufs` (UF EMITENTE) pedidos. `None` significa todos.
+    `colunas` restringe as colunas lidas (projeção feita no próprio Parquet).
+    As colunas de partição não são devolvidas; use `DATA EMISSÃO`/`UF EMITENTE`.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = abrir_dataset(tabela, destino)
+    filtro = None
+    if meses:
+        filtro = ds.field(COLUNA_MES).isin([str(m) for m in meses])
+    if ufs:
+        filtro_uf = ds.field(COLUNA_UF).isin([str(u).upper() for u in ufs])
+        filtro = filtro_uf if filtro is None else filtro & filtro_uf
+
+    if colunas is None:
+        colunas = [c for c in dataset.schema.names if c not in (COLUNA_MES, COLUNA_UF)]
+    resultado = dataset.to_table(columns=list(colunas), filter=filtro)
+
+    tipo_string = pd.StringDtype("pyarrow")
+    return resultado.to_pandas(
+        types_mapper=lambda t: tipo_string if t in (pa.string(), pa.large_string()) else None
+    )
+
+
+# --- Prefixo de filtros usado pelas ferramentas de consulta do agente ---
+# Ex.: "[MES=202401,202402 UF=SP,RJ] global_df_cabecalho['VALOR NOTA FISCAL'].sum()"
+#      "[MES=*] global_df_itens['QUANTIDADE'].sum()"  (todos os meses)
+_PREFIXO_FILTRO = re.compile(r"^\s*\[([^\]]*)\]\s*(.*)$", re.DOTALL)
+
+
+def separar_filtros(query):
+    """
+    Separa o prefixo opcional de filtros de partição da expressão Pandas.
+    Retorna (filtros, expressao); `filtros` é None quando não há prefixo,
+    senão um dicionário {"meses": [...] | None, "ufs": [...] | None}.
+    """
+    m = _PREFIXO_FILTRO.match(query)
+    if not m:
+        return None, query
+    filtros = {"meses": None, "ufs": None}
+    for parte in m.group(1).replace(";", " ").split():
+        chave, _, valores = parte.partition("=")
+        lista = [v.strip() for v in valores.split(",") if v.strip() and v.strip() != "*"]
+        chave = chave.strip().upper()
+        if chave == COLUNA_MES:
+            filtros["meses"] = lista or None
+        elif chave == COLUNA_UF:
+            filtros["ufs"] = lista or None
+        else:
+            raise ValueError(f"Filtro desconhecido '{chave}'. Use MES=YYYYMM,... e/ou UF=SP,...")
+    return filtros, m.group(2)
+
+
+def colunas_referenciadas(expressao, schema):
+    """
+    Colunas do schema citadas entre aspas na expressão. Permite ler do Parquet
+    apenas as colunas usadas; devolve None (todas) se nenhuma for citada.
+    """
+    usadas = [c for c in schema if f"'{c}'" in expressao or f'"{c}"' in expressao]
+    return usadas or None
+
+
+if __name__ == "__main__":
+    construir_dataset()
+    for mes in meses_disponiveis():
+        df = ler_dataset("cabecalho", meses=[mes], colunas=["VALOR NOTA FISCAL"])
+        print(f"{mes}: {len(df)} NFs, total R$ {df['VALOR NOTA FISCAL'].sum():,.2f}")
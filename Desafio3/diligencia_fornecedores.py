@@ -0,0 +1,221 @@
+# diligencia_fornecedores.py
+"""
+Diligência em lote dos fornecedores (emitentes) das NFs de um mês.
+
+Cada CNPJ distinto de `CPF/CNPJ Emitente` no cabeçalho é consultado uma única
+vez, em paralelo, pelo lote do investigador.py (`consultar_cnpjs`: base local
+da Receita, cache SQLite e, por último, o ReceitaWS dentro da cota): rodar de novo, ou continuar depois de uma
+interrupção, só consulta na API os CNPJs que ainda não estão na base nem no
+cache. Emitentes pessoa física (CPF) são ignorados.
+
+Alertas por fornecedor:
+  - situacao_irregular: situação cadastral em `SITUACOES_IRREGULARES`
+    (INAPTA, BAIXADA...);
+  - mei_valor_alto: optante do MEI com NFs no mês acima de `LIMITE_MENSAL_MEI`
+    (o teto anual de faturamento do MEI dividido por 12);
+  - abertura_recente: empresa aberta menos de `DIAS_ABERTURA_RECENTE` dias
+    antes da primeira NF do mês.
+
+O resultado volta para o cabeçalho (uma coluna por campo, por CNPJ emitente) e
+os fornecedores sinalizados, com as NFs deles, são gravados em CSV em
+`RELATORIOS_DIR`. Durante a consulta o progresso é impresso com a vazão
+(CNPJs/s), a estimativa de término e quantos vieram da base local, do cache
+ou da API.
+
+Uso: python diligencia_fornecedores.py [YYYYMM]
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_store
+from data_loader import descobrir_meses
+from investigador import MAX_CONCORRENCIA, consultar_cnpjs, estatisticas_cnpj
+
+COLUNA_EMITENTE = "CPF/CNPJ Emitente"
+RELATORIOS_DIR = "relatorios"
+SITUACOES_IRREGULARES = ("INAPTA", "BAIXADA", "SUSPENSA", "NULA")
+LIMITE_FATURAMENTO_MEI = 81_000.0
+LIMITE_MENSAL_MEI = LIMITE_FATURAMENTO_MEI / 12
+DIAS_ABERTURA_RECENTE = 180
+INTERVALO_PROGRESSO = 5.0  # segundos entre duas linhas de progresso
+
+# Colunas acrescentadas ao cabeçalho por anexar_diligencia()
+COLUNAS_DILIGENCIA = [
+    "SITUAÇÃO CADASTRAL", "PORTE", "MEI", "DATA ABERTURA", "ALERTAS FORNECEDOR", "ERRO CONSULTA",
+]
+
+
+def somente_digitos(serie):
+    """CPF/CNPJ só com os dígitos (a coluna pode vir com pontuação)."""
+    return serie.astype("string").str.replace(r"\D", "", regex=True)
+
+
+def resumir_emitentes(df_cabecalho):
+    """Um registro por CNPJ emitente: razão social, quantidade, soma e maior valor das NFs, primeira emissão."""
+    df = pd.DataFrame({
+        "CNPJ": somente_digitos(df_cabecalho[COLUNA_EMITENTE]),
+        "RAZÃO SOCIAL EMITENTE": df_cabecalho["RAZÃO SOCIAL EMITENTE"].astype("string"),
+        "VALOR NOTA FISCAL": df_cabecalho["VALOR NOTA FISCAL"],
+        "DATA EMISSÃO": df_cabecalho["DATA EMISSÃO"],
+    })
+    df = df[df["CNPJ"].str.len() == 14]
+    return df.groupby("CNPJ", sort=False).agg(
+        razao_social=("RAZÃO SOCIAL EMITENTE", "first"),
+        qtd_nfs=("VALOR NOTA FISCAL", "size"),
+        valor_total=("VALOR NOTA FISCAL", "sum"),
+        valor_max=("VALOR NOTA FISCAL", "max"),
+        primeira_emissao=("DATA EMISSÃO", "min"),
+    )
+
+
+def imprimir_progresso(progresso):
+    print(
+        f"[diligência] {progresso['feitos']}/{progresso['total']} CNPJs"
+        f" ({progresso['feitos'] / max(progresso['total'], 1):.0%})"
+        f" | {progresso['por_segundo']:.2f} CNPJs/s"
+        f" | base local {progresso['base_local']}, cache {progresso['cache']}, API {progresso['api']}, erros {progresso['erros']}"
+        f" | faltam ~{progresso['eta_segundos'] / 60:.1f} min"
+    )
+
+
+def consultar_em_lote(cnpjs, max_concorrencia=MAX_CONCORRENCIA, ao_progredir=imprimir_progresso):
+    """
+    Consulta os CNPJs (sem repetição) pelo investigador.consultar_cnpjs, que
+    cuida do paralelismo, da cota da API e do cache.
+    `ao_progredir(progresso)` é chamada a cada `INTERVALO_PROGRESSO` segundos e
+    no fim, com feitos, total, CNPJs/s, estimativa de término (eta_segundos) e
+    as contagens de base local, cache, API e erros deste lote.
+    Retorna ({cnpj: dicionário do consultar_cnpj}, progresso final).
+    """
+    total = len(dict.fromkeys(cnpjs))
+    inicial = estatisticas_cnpj()
+    trava = threading.Lock()
+    situacao = {"feitos": 0, "ultimo_aviso": time.monotonic()}
+    inicio = time.monotonic()
+
+    def _progresso(feitos):
+        atual = estatisticas_cnpj()
+        decorrido = time.monotonic() - inicio
+        por_segundo = feitos / decorrido if decorrido > 0 else 0.0
+        return {
+            "feitos": feitos,
+            "total": total,
+            "segundos": decorrido,
+            "por_segundo": por_segundo,
+            "eta_segundos": (total - feitos) / por_segundo if por_segundo else 0.0,
+            "base_local": atual["base_local"] - inicial["base_local"],
+            "cache": atual["cache"] - inicial["cache"],
+            "api": atual["api"] - inicial["api"],
+            "erros": atual["erros"] - inicial["erros"],
+        }
+
+    def _ao_concluir(cnpj, dados):
+        # Chamada nas threads do investigador
+        with trava:
+            situacao["feitos"] += 1
+            if ao_progredir is None or time.monotonic() - situacao["ultimo_aviso"] < INTERVALO_PROGRESSO:
+                return
+            situacao["ultimo_aviso"] = time.monotonic()
+            progresso = _progresso(situacao["feitos"])
+        ao_progredir(progresso)
+
+    resultados = consultar_cnpjs(cnpjs, max_concorrencia, ao_concluir=_ao_concluir)
+    progresso = _progresso(len(resultados))
+    if ao_progredir:
+        ao_progredir(progresso)
+    return resultados, progresso
+
+
+def avaliar_fornecedores(emitentes, consultas):
+    """Junta o resumo dos emitentes às consultas e calcula os alertas de cada fornecedor."""
+    linhas = []
+    for cnpj, dados in consultas.items():
+        dados = dados or {}
+        linhas.append({
+            "CNPJ": cnpj,
+            "SITUAÇÃO CADASTRAL": dados.get("Situação"),
+            "PORTE": dados.get("Porte"),
+            "MEI": bool((dados.get("Simei") or {}).get("optante")),
+            "DATA ABERTURA": dados.get("Abertura"),
+            "ERRO CONSULTA": dados.get("erro"),
+        })
+    colunas = ["CNPJ", "SITUAÇÃO CADASTRAL", "PORTE", "MEI", "DATA ABERTURA", "ERRO CONSULTA"]
+    fornecedores = emitentes.join(pd.DataFrame(linhas, columns=colunas).set_index("CNPJ"), how="left")
+
+    abertura = pd.to_datetime(fornecedores["DATA ABERTURA"], format="%d/%m/%Y", errors="coerce")
+    fornecedores["dias_abertura"] = (fornecedores["primeira_emissao"] - abertura).dt.days
+
+    situacao = fornecedores["SITUAÇÃO CADASTRAL"].fillna("").str.upper()
+    alertas = pd.DataFrame({
+        "situacao_irregular": situacao.isin(SITUACOES_IRREGULARES),
+        "mei_valor_alto": fornecedores["MEI"].fillna(False).astype(bool)
+            & (fornecedores["valor_total"] > LIMITE_MENSAL_MEI),
+        "abertura_recente": fornecedores["dias_abertura"].lt(DIAS_ABERTURA_RECENTE).fillna(False).astype(bool),
+    })
+    # Texto dos alertas vetorizado: um rótulo (ou "") por alerta, somados e sem o separador final
+    texto = pd.Series("", index=alertas.index, dtype=object)
+    for nome, ativo in alertas.items():
+        texto = texto + np.where(ativo, f"{nome}, ", "")
+    fornecedores["ALERTAS FORNECEDOR"] = texto.str.rstrip(", ")
+    return fornecedores
+
+
+def anexar_diligencia(df, fornecedores):
+    """Acrescenta ao DataFrame de NFs (cabeçalho ou itens) as colunas da diligência do emitente."""
+    colunas = fornecedores[[c for c in COLUNAS_DILIGENCIA if c in fornecedores.columns]]
+    return df.join(colunas, on=somente_digitos(df[COLUNA_EMITENTE]).rename("CNPJ"))
+
+
+def gravar_relatorio(mes, fornecedores, df_cabecalho, destino=RELATORIOS_DIR):
+    """Grava os fornecedores sinalizados e as NFs deles. Retorna os caminhos gravados."""
+    os.makedirs(destino, exist_ok=True)
+    sinalizados = fornecedores[fornecedores["ALERTAS FORNECEDOR"].fillna("") != ""]
+    caminho_fornecedores = os.path.join(destino, f"diligencia_{mes}_fornecedores.csv")
+    caminho_nfs = os.path.join(destino, f"diligencia_{mes}_nfs.csv")
+    sinalizados.sort_values("valor_total", ascending=False).to_csv(caminho_fornecedores, index_label="CNPJ")
+    nfs = df_cabecalho[df_cabecalho["ALERTAS FORNECEDOR"].fillna("") != ""]
+    nfs.to_csv(caminho_nfs, index=False)
+    return caminho_fornecedores, caminho_nfs
+
+
+def executar_diligencia(mes=None, max_concorrencia=MAX_CONCORRENCIA, ao_progredir=imprimir_progresso,
+                        destino=RELATORIOS_DIR):
+    """
+    Roda a diligência completa de um mês (sem `mes`, o mais recente).
+    Retorna um dicionário com `fornecedores` (um por CNPJ, com os alertas),
+    `cabecalho` (as NFs com as colunas da diligência), `arquivos` gravados e
+    `metricas` da consulta; ou None se os dados do mês não puderem ser carregados.
+    """
+    # Lê o mês à parte: não troca o snapshot que as sessões e as ferramentas estão usando
+    meses = list(descobrir_meses())
+    snapshot = data_store.snapshot_do_mes(mes or meses[-1]) if meses else None
+    if snapshot is None:
+        print(f"Erro: não foi possível carregar as NFs{f' do mês {mes}' if mes else ''}.")
+        return None
+    df_cabecalho = snapshot.df_cabecalho
+
+    emitentes = resumir_emitentes(df_cabecalho)
+    total_emitentes = somente_digitos(df_cabecalho[COLUNA_EMITENTE]).nunique()
+    print(f"[diligência] mês {snapshot.mes}: {len(emitentes)} CNPJs distintos em {len(df_cabecalho)} NFs"
+          f" ({total_emitentes - len(emitentes)} emitentes CPF ignorados).")
+
+    consultas, metricas = consultar_em_lote(emitentes.index, max_concorrencia, ao_progredir)
+    fornecedores = avaliar_fornecedores(emitentes, consultas)
+    cabecalho = anexar_diligencia(df_cabecalho, fornecedores)
+    arquivos = gravar_relatorio(snapshot.mes, fornecedores, cabecalho, destino)
+
+    sinalizados = (fornecedores["ALERTAS FORNECEDOR"].fillna("") != "").sum()
+    metricas = {**metricas, "sinalizados": int(sinalizados),
+                "erros_consulta": int(fornecedores["ERRO CONSULTA"].notna().sum())}
+    print(f"✔ Diligência do mês {snapshot.mes}: {sinalizados} de {len(fornecedores)} fornecedores sinalizados"
+          f" em {metricas['segundos']:.1f}s. Relatórios: {', '.join(arquivos)}")
+    return {"fornecedores": fornecedores, "cabecalho": cabecalho, "arquivos": arquivos, "metricas": metricas}
+
+
+if __name__ == "__main__":
+    executar_diligencia(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,182 @@
+# execucao_agente.py
+"""
+Execução assíncrona e concorrente do agente para o front-end Streamlit.
+
+O script do Streamlit não fica mais bloqueado em `agent_executor.invoke`:
+  - um único laço asyncio por processo, em uma thread própria, roda os ciclos
+    ReAct com `astream` (main.perguntar_ao_agente_async);
+  - no máximo `MAX_AGENTES_SIMULTANEOS` perguntas rodam ao mesmo tempo; as
+    demais esperam (pool limitado);
+  - cada usuário tem a própria fila: as perguntas de um usuário rodam em ordem,
+    uma por vez, com até `MAX_PENDENTES_POR_USUARIO` esperando;
+  - os passos intermediários (ação escolhida, observação) chegam à interface
+    por `Execucao.novos_eventos()` enquanto o agente trabalha;
+  - a interface avisa que continua viva (`sinal_vida`) ao acompanhar a
+    execução; sem contato por `TEMPO_SEM_CONTATO` segundos (usuário fechou ou
+    saiu da página), a execução é cancelada. `cancelar()` cancela na hora.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError
+
+from main import perguntar_ao_agente_async
+
+MAX_AGENTES_SIMULTANEOS = 4
+MAX_PENDENTES_POR_USUARIO = 3
+TEMPO_SEM_CONTATO = 30.0
+INTERVALO_VIGIA = 5.0
+
+_loop = None
+_trava = threading.Lock()
+_ativas = {}  # usuario -> [Execucao, ...] (na fila ou executando)
+_semaforo = None
+_travas_usuario = {}
+
+
+class FilaCheia(Exception):
+    """O usuário já tem o máximo de perguntas esperando."""
+
+
+class Execucao:
+    """Uma pergunta enviada ao agente. Métodos seguros para chamar da thread do Streamlit."""
+
+    def __init__(self, usuario, pergunta):
+        self.usuario = usuario
+        self.pergunta = pergunta
+        self.estado = "na_fila"  # na_fila, executando, concluida, cancelada, erro
+        self.resposta = None
+        self.criada_em = time.monotonic()
+        self.iniciada_em = None
+        self.primeiro_passo_em = None
+        self.ultimo_contato = self.criada_em
+        self.passos = []  # todos os passos já entregues à interface, para redesenhar após um rerun
+        self._eventos = queue.Queue()
+        self._futuro = None
+
+    def _publicar(self, tipo, conteudo):
+        if self.primeiro_passo_em is None:
+            self.primeiro_passo_em = time.monotonic()
+        self._eventos.put((tipo, conteudo))
+
+    def novos_eventos(self):
+        """Passos publicados desde a última chamada: lista de (tipo, conteúdo)."""
+        eventos = []
+        while True:
+            try:
+                eventos.append(self._eventos.get_nowait())
+            except queue.Empty:
+                self.passos.extend(eventos)
+                return eventos
+
+    def sinal_vida(self):
+        """A interface ainda está acompanhando esta execução."""
+        self.ultimo_contato = time.monotonic()
+
+    def concluida(self):
+        return self._futuro is not None and self._futuro.done()
+
+    def cancelar(self):
+        if self._futuro is not None and not self._futuro.done():
+            self._futuro.cancel()
+            self.estado = "cancelada"
+
+    def aguardar(self, timeout=None):
+        """Espera a resposta (levanta TimeoutError se não terminar a tempo)."""
+        try:
+            return self._futuro.result(timeout)
+        except CancelledError:
+            return None
+
+
+def _obter_loop():
+    """Laço asyncio do processo, criado na primeira chamada em uma thread daemon."""
+    global _loop, _semaforo
+    with _trava:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="agente-async", daemon=True).start()
+            _semaforo = asyncio.Semaphore(MAX_AGENTES_SIMULTANEOS)
+            asyncio.run_coroutine_threadsafe(_vigiar(), loop)
+            _loop = loop
+        return _loop
+
+
+async def _vigiar():
+    """Cancela execuções que a interface deixou de acompanhar."""
+    while True:
+        await asyncio.sleep(INTERVALO_VIGIA)
+        agora = time.monotonic()
+        with _trava:
+            execucoes = [e for lista in _ativas.values() for e in lista]
+        for execucao in execucoes:
+            if agora - execucao.ultimo_contato > TEMPO_SEM_CONTATO:
+                print(f"Cancelando pergunta sem acompanhamento de '{execucao.usuario}': {execucao.pergunta}")
+                execucao.cancelar()
+
+
+async def _executar(execucao):
+    trava_usuario = _travas_usuario.setdefault(execucao.usuario, asyncio.Lock())
+    try:
+        async with trava_usuario, _semaforo:
+            execucao.estado = "executando"
+            execucao.iniciada_em = time.monotonic()
+            execucao.resposta = await perguntar_ao_agente_async(execucao.pergunta, execucao._publicar)
+            execucao.estado = "concluida"
+            return execucao.resposta
+    except asyncio.CancelledError:
+        execucao.estado = "cancelada"
+        raise
+    except Exception as e:
+        execucao.estado = "erro"
+        execucao.resposta = f"Ocorreu um erro ao processar sua pergunta: {e}"
+        return execucao.resposta
+
+
+def _remover(execucao):
+    """Tira a execução da fila do usuário ao terminar (inclusive se cancelada antes de começar)."""
+    with _trava:
+        pendentes = _ativas.get(execucao.usuario, [])
+        if execucao in pendentes:
+            pendentes.remove(execucao)
+        if not pendentes:
+            _ativas.pop(execucao.usuario, None)
+            _travas_usuario.pop(execucao.usuario, None)
+
+
+def enviar(usuario, pergunta):
+    """
+    Coloca a pergunta na fila do usuário e retorna a Execucao sem esperar.
+    Levanta FilaCheia se o usuário já tem MAX_PENDENTES_POR_USUARIO perguntas.
+    """
+    loop = _obter_loop()
+    execucao = Execucao(usuario, pergunta)
+    with _trava:
+        pendentes = _ativas.setdefault(usuario, [])
+        if len(pendentes) >= MAX_PENDENTES_POR_USUARIO:
+            raise FilaCheia(f"Você já tem {len(pendentes)} perguntas em andamento. Aguarde ou cancele uma delas.")
+        pendentes.append(execucao)
+    execucao._futuro = asyncio.run_coroutine_threadsafe(_executar(execucao), loop)
+    execucao._futuro.add_done_callback(lambda _: _remover(execucao))
+    return execucao
+
+
+def cancelar_usuario(usuario):
+    """Cancela todas as perguntas do usuário (na fila ou executando)."""
+    with _trava:
+        execucoes = list(_ativas.get(usuario, []))
+    for execucao in execucoes:
+        execucao.cancelar()
+
+
+def situacao():
+    """Perguntas por usuário e quantas estão executando agora."""
+    with _trava:
+        execucoes = [e for lista in _ativas.values() for e in lista]
+    return {
+        "usuarios": len({e.usuario for e in execucoes}),
+        "na_fila": sum(e.estado == "na_fila" for e in execucoes),
+        "executando": sum(e.estado == "executando" for e in execucoes),
+        "limite": MAX_AGENTES_SIMULTANEOS,
+    }
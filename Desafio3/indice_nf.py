@@ -0,0 +1,120 @@
+# indice_nf.py
+"""
+Índice de junção cabeçalho ↔ itens pela CHAVE DE ACESSO.
+
+Os itens são ordenados uma única vez pela chave (e pelo NÚMERO PRODUTO), de
+modo que os itens de cada nota ocupam um intervalo contíguo de linhas. O índice
+guarda, para cada chave, esse intervalo [início, fim) e a posição da nota no
+cabeçalho. Com isso:
+  - os itens de uma nota saem em O(1) + O(itens da nota), com um fatiamento;
+  - a junção cabeçalho → itens é feita por posição (take), sem merge por hash;
+  - somas por nota usam np.add.reduceat sobre os intervalos.
+
+Itens sem chave ficam no fim, fora de qualquer nota (na junção, sem cabeçalho).
+Se uma chave aparece mais de uma vez no cabeçalho, vale a primeira ocorrência.
+"""
+import numpy as np
+import pandas as pd
+
+CHAVE = "CHAVE DE ACESSO"
+
+
+class IndiceNF:
+    def __init__(self, df_cabecalho, df_itens):
+        ordenacao = [CHAVE] + (["NÚMERO PRODUTO"] if "NÚMERO PRODUTO" in df_itens.columns else [])
+        # Os itens ordenados substituem os originais no snapshot (não há segunda cópia).
+        # Itens sem chave ficam no fim (na_position="last") e fora dos intervalos
+        self.itens = df_itens.sort_values(ordenacao, kind="stable", na_position="last").reset_index(drop=True)
+        self.cabecalho = df_cabecalho
+
+        self._com_chave = int(self.itens[CHAVE].notna().sum())
+        chaves = self.itens[CHAVE].to_numpy()[:self._com_chave]
+        if len(chaves):
+            mudou = np.empty(len(chaves), dtype=bool)
+            mudou[0] = True
+            mudou[1:] = chaves[1:] != chaves[:-1]
+            self._inicios = np.flatnonzero(mudou)
+        else:
+            self._inicios = np.empty(0, dtype=np.int64)
+        self._fins = np.append(self._inicios[1:], len(chaves)).astype(np.int64)
+        self._chaves = pd.Index(chaves[self._inicios])
+        self._grupo = {chave: i for i, chave in enumerate(self._chaves)}
+
+        # Posição de cada nota no cabeçalho (-1 se a nota não tem cabeçalho). Chave
+        # repetida no cabeçalho usa a primeira ocorrência; chave vazia não casa com nada
+        chaves_cabecalho = df_cabecalho[CHAVE]
+        primeiras = (chaves_cabecalho.notna() & ~chaves_cabecalho.duplicated(keep="first")).to_numpy()
+        posicoes = np.flatnonzero(primeiras)
+        encontradas = pd.Index(chaves_cabecalho.to_numpy()[posicoes]).get_indexer(self._chaves)
+        self._pos_cabecalho = np.append(posicoes, -1)[encontradas]  # -1 (não encontrada) continua -1
+
+    def __len__(self):
+        return len(self._chaves)
+
+    def intervalo(self, chave):
+        """Intervalo [início, fim) dos itens da nota em `self.itens`, ou None."""
+        i = self._grupo.get(str(chave).strip())
+        if i is None:
+            return None
+        return int(self._inicios[i]), int(self._fins[i])
+
+    def itens_da_nota(self, chave):
+        """Itens de uma nota (lookup O(1) + fatiamento)."""
+        intervalo = self.intervalo(chave)
+        if intervalo is None:
+            return self.itens.iloc[0:0]
+        return self.itens.iloc[intervalo[0]:intervalo[1]]
+
+    def _linhas_dos_grupos(self, grupos):
+        """Posições de todas as linhas de itens dos grupos informados, em ordem."""
+        inicios = self._inicios[grupos]
+        tamanhos = self._fins[grupos] - inicios
+        total = int(tamanhos.sum())
+        deslocamentos = np.repeat(inicios - np.cumsum(tamanhos) + tamanhos, tamanhos)
+        return deslocamentos + np.arange(total)
+
+    def itens_das_notas(self, chaves):
+        """Itens de várias notas de uma vez (vetorizado)."""
+        grupos = self._chaves.get_indexer(pd.Index(chaves).astype(self._chaves.dtype))
+        grupos = grupos[grupos >= 0]
+        return self.itens.iloc[self._linhas_dos_grupos(grupos)]
+
+    def itens_do_fornecedor(self, cnpj):
+        """Itens de todas as notas emitidas por um CPF/CNPJ."""
+        cnpj = "".join(c for c in str(cnpj) if c.isdigit())
+        notas = self.cabecalho.loc[self.cabecalho["CPF/CNPJ Emitente"] == cnpj, CHAVE]
+        return self.itens_das_notas(notas)
+
+    def juntar_cabecalho(self, colunas=None):
+        """
+        Itens com colunas do cabeçalho anexadas por posição (sem merge).
+        Por padrão traz as colunas do cabeçalho que não existem nos itens.
+        """
+        if colunas is None:
+            colunas = [c for c in self.cabecalho.columns if c not in self.itens.columns]
+        por_linha = np.full(len(self.itens), -1, dtype=np.int64)
+        por_linha[:self._com_chave] = np.repeat(self._pos_cabecalho, self._fins - self._inicios)
+        valido = por_linha >= 0
+        anexas = self.cabecalho[list(colunas)].iloc[np.where(valido, por_linha, 0)].reset_index(drop=True)
+        anexas = anexas.where(pd.Series(valido), other=pd.NA) if not valido.all() else anexas
+        return pd.concat([self.itens, anexas], axis=1)
+
+    def totais_por_nota(self):
+        """
+        Compara, por nota, o VALOR NOTA FISCAL do cabeçalho com a soma do VALOR TOTAL dos itens.
+        Colunas: CHAVE DE ACESSO, qtd_itens, soma_itens, valor_nota, diferenca.
+        """
+        valores = self.itens["VALOR TOTAL"].to_numpy(dtype="float64", na_value=0.0)[:self._com_chave]
+        soma = np.add.reduceat(valores, self._inicios) if len(self._inicios) else np.empty(0)
+        valor_nota = np.full(len(self._chaves), np.nan)
+        tem_cabecalho = self._pos_cabecalho >= 0
+        valor_nota[tem_cabecalho] = (
+            self.cabecalho["VALOR NOTA FISCAL"].to_numpy(dtype="float64", na_value=np.nan)[self._pos_cabecalho[tem_cabecalho]]
+        )
+        return pd.DataFrame({
+            CHAVE: self._chaves,
+            "qtd_itens": self._fins - self._inicios,
+            "soma_itens": soma,
+            "valor_nota": valor_nota,
+            "diferenca": valor_nota - soma,
+        })
@@ -1,82 +1,270 @@
-# investigador.py
-import requests
-import time
-import os
-
-from dotenv import load_dotenv
-load_dotenv()
-
-RECEITAWS_TOKEN = os.getenv("RECEITAWS_TOKEN")
-
-def consultar_cnpj(cnpj):
-    url = f"https://www.receitaws.com.br/v1/cnpj/{cnpj}?token={RECEITAWS_TOKEN}"
-    headers = {"Accept": "application/json"}
-
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        data = response.json()
-
-        if response.status_code != 200 or data.get("status") != "OK":
-            return {"erro": f"Erro ao consultar: {data.get('message', 'desconhecido')}"}
-
-        return {
-            "CNPJ": cnpj,
-            "Razão Social": data.get("nome"),
-            "Nome Fantasia": data.get("fantasia"),
-            "Situação": data.get("situacao"),
-            "Tipo": data.get("tipo"),
-            "Porte": data.get("porte"),
-            "Natureza Jurídica": data.get("natureza_juridica"),
-            "Abertura": data.get("abertura"),
-            "Capital Social": data.get("capital_social"),
-            "Email": data.get("email"),
-            "Telefone": data.get("telefone"),
-            "Endereço": f"{data.get('logradouro', '')}, {data.get('numero', '')}, {data.get('bairro', '')} - {data.get('municipio', '')}/{data.get('uf', '')} - CEP {data.get('cep', '')}",
-            "Atividade Principal": data.get("atividade_principal", [{}])[0].get("text", "N/A"),
-            "Atividades Secundárias": data.get("atividades_secundarias", []),
-            "QSA": data.get("qsa", []),
-            "Simples": data.get("simples", {}),
-            "Simei": data.get("simei", {}),
-        }
-
-    except Exception as e:
-        return {"erro": str(e)}
-
-
-import re
-
-def tool_investigar_fornecedor(cnpj: str) -> str:
-    cnpj = re.sub(r'\D', '', cnpj)
-    dados = consultar_cnpj(cnpj)
-    if "erro" in dados:
-        return dados["erro"]
-
-    atividades_sec = "\n".join(
-        f"  - {a['code']}: {a['text']}" for a in dados.get("Atividades Secundárias", [])
-    ) or "  - Nenhuma"
-
-    socios = "\n".join(
-        f"  - {s['nome']} ({s['qual']})" for s in dados.get("QSA", [])
-    ) or "  - Não informado"
-
-    simples = dados.get("Simples", {})
-    simei = dados.get("Simei", {})
-
-    return (
-        f"🕵️‍♂️ **Investigação do CNPJ {cnpj}**\n"
-        f"- Razão Social: {dados['Razão Social']}\n"
-        f"- Nome Fantasia: {dados['Nome Fantasia'] or 'N/A'}\n"
-        f"- Situação: {dados['Situação']}\n"
-        f"- Tipo: {dados['Tipo']} | Porte: {dados['Porte']} | Natureza Jurídica: {dados['Natureza Jurídica']}\n"
-        f"- Abertura: {dados['Abertura']}\n"
-        f"- Capital Social: R$ {dados['Capital Social']}\n"
-        f"- Endereço: {dados['Endereço']}\n"
-        f"- Email: {dados['Email']} | Telefone: {dados['Telefone']}\n\n"
-
-        f"🏢 **Atividade Principal**:\n  - {dados['Atividade Principal']}\n\n"
-        f"📂 **Atividades Secundárias:**\n{atividades_sec}\n\n"
-        f"👥 **Quadro Societário:**\n{socios}\n\n"
-        f"💼 **Tributação:**\n"
-        f"  - Simples Nacional: {'Sim' if simples.get('optante') else 'Não'}\n"
-        f"  - MEI: {'Sim' if simei.get('optante') else 'Não'}"
-    )
+# investigador.py
+"""
+Consulta de CNPJs na API do ReceitaWS.
+
+  - Base local primeiro: se a base dos dados abertos da Receita foi importada
+    (base_cnpj.py), o CNPJ é lido dela e a API só é chamada para os que não
+    estão lá.
+  - Cache persistente em SQLite (cache/cnpj.sqlite): cada CNPJ consultado com
+    sucesso fica guardado por `TTL_CNPJ_SEGUNDOS`; investigar o mesmo
+    fornecedor de novo não chama a API.
+  - Uma única `requests.Session` com pool de conexões (keep-alive) para todas
+    as chamadas.
+  - Limitador de taxa (token bucket) com a cota do plano, `RECEITAWS_REQ_POR_MINUTO`
+    (3/min no plano gratuito); respostas 429 esperam o `Retry-After` e tentam de novo.
+  - `consultar_cnpjs()` consulta vários CNPJs em paralelo, dentro da cota.
+  - A URL base vem de `RECEITAWS_URL`, então os testes podem apontar para um
+    servidor local que imita a API (ver verificar_investigador.py).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from base_cnpj import buscar_cnpj
+from cache_respostas import CACHE_DIR
+
+RECEITAWS_TOKEN = os.getenv("RECEITAWS_TOKEN")
+RECEITAWS_URL = os.getenv("RECEITAWS_URL", "https://www.receitaws.com.br/v1")
+REQ_POR_MINUTO = float(os.getenv("RECEITAWS_REQ_POR_MINUTO", "3"))
+RAJADA_MAX = int(os.getenv("RECEITAWS_RAJADA", "3"))  # chamadas seguidas permitidas antes de esperar a cota
+TTL_CNPJ_SEGUNDOS = int(os.getenv("RECEITAWS_TTL_SEGUNDOS", str(7 * 24 * 60 * 60)))
+CAMINHO_CACHE_CNPJ = os.path.join(CACHE_DIR, "cnpj.sqlite")
+MAX_CONCORRENCIA = 4
+TIMEOUT_SEGUNDOS = 10
+MAX_TENTATIVAS_429 = 3
+
+
+class LimitadorTaxa:
+    """Token bucket: até `capacidade` chamadas seguidas, repostas a `por_segundo` fichas por segundo."""
+
+    def __init__(self, por_segundo, capacidade=1):
+        self.por_segundo = por_segundo
+        self.capacidade = capacidade
+        self._fichas = float(capacidade)
+        self._ultima = time.monotonic()
+        self._trava = threading.Lock()
+
+    def adquirir(self):
+        """Bloqueia até haver uma ficha e a consome. Retorna os segundos esperados."""
+        esperado = 0.0
+        while True:
+            with self._trava:
+                agora = time.monotonic()
+                self._fichas = min(self.capacidade, self._fichas + (agora - self._ultima) * self.por_segundo)
+                self._ultima = agora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return esperado
+                espera = (1 - self._fichas) / self.por_segundo
+            time.sleep(espera)
+            esperado += espera
+
+
+_limitador = LimitadorTaxa(REQ_POR_MINUTO / 60, capacidade=max(1, RAJADA_MAX))
+_sessao = None
+_trava_sessao = threading.Lock()
+_trava_estatisticas = threading.Lock()
+_estatisticas = {"base_local": 0, "cache": 0, "api": 0, "erros": 0, "limitadas_429": 0, "segundos_espera_cota": 0.0}
+
+
+def _contar(chave, valor=1):
+    with _trava_estatisticas:
+        _estatisticas[chave] += valor
+
+
+def _obter_sessao():
+    global _sessao
+    with _trava_sessao:
+        if _sessao is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=MAX_CONCORRENCIA, pool_maxsize=MAX_CONCORRENCIA)
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            sessao.headers.update({"Accept": "application/json"})
+            _sessao = sessao
+        return _sessao
+
+
+# --- Cache em SQLite ---
+
+def _conectar_cache():
+    os.makedirs(os.path.dirname(CAMINHO_CACHE_CNPJ) or ".", exist_ok=True)
+    con = sqlite3.connect(CAMINHO_CACHE_CNPJ, timeout=5)
+    con.execute("CREATE TABLE IF NOT EXISTS cnpj (cnpj TEXT PRIMARY KEY, dados TEXT, consultado_em REAL)")
+    return con
+
+
+def _ler_cache(cnpj):
+    try:
+        con = _conectar_cache()
+        try:
+            linha = con.execute("SELECT dados, consultado_em FROM cnpj WHERE cnpj = ?", (cnpj,)).fetchone()
+        finally:
+            con.close()
+    except sqlite3.Error as e:
+        print(f"Aviso: cache de CNPJ indisponível: {e}")
+        return None
+    if linha is None or time.time() - linha[1] > TTL_CNPJ_SEGUNDOS:
+        return None
+    return json.loads(linha[0])
+
+
+def _gravar_cache(cnpj, data):
+    try:
+        con = _conectar_cache()
+        try:
+            with con:
+                con.execute(
+                    "INSERT OR REPLACE INTO cnpj VALUES (?, ?, ?)",
+                    (cnpj, json.dumps(data, ensure_ascii=False), time.time()),
+                )
+        finally:
+            con.close()
+    except sqlite3.Error as e:
+        print(f"Aviso: não foi possível gravar o CNPJ no cache: {e}")
+
+
+# --- API ---
+
+def _buscar_api(cnpj):
+    """JSON do ReceitaWS para o CNPJ, respeitando a cota. Levanta RuntimeError em caso de erro."""
+    url = f"{RECEITAWS_URL}/cnpj/{cnpj}"
+    params = {"token": RECEITAWS_TOKEN} if RECEITAWS_TOKEN else None
+    for tentativa in range(MAX_TENTATIVAS_429 + 1):
+        _contar("segundos_espera_cota", _limitador.adquirir())
+        response = _obter_sessao().get(url, params=params, timeout=TIMEOUT_SEGUNDOS)
+        _contar("api")
+        if response.status_code == 429 and tentativa < MAX_TENTATIVAS_429:
+            _contar("limitadas_429")
+            try:
+                espera = float(response.headers.get("Retry-After", 60 / max(REQ_POR_MINUTO, 1)))
+            except ValueError:
+                espera = 60 / max(REQ_POR_MINUTO, 1)
+            time.sleep(espera)
+            continue
+        data = response.json()
+        if response.status_code != 200 or data.get("status") != "OK":
+            raise RuntimeError(f"Erro ao consultar: {data.get('message', 'desconhecido')}")
+        return data
+    raise RuntimeError("Erro ao consultar: limite de requisições do ReceitaWS excedido.")
+
+
+def _formatar(cnpj, data):
+    return {
+        "CNPJ": cnpj,
+        "Razão Social": data.get("nome"),
+        "Nome Fantasia": data.get("fantasia"),
+        "Situação": data.get("situacao"),
+        "Tipo": data.get("tipo"),
+        "Porte": data.get("porte"),
+        "Natureza Jurídica": data.get("natureza_juridica"),
+        "Abertura": data.get("abertura"),
+        "Capital Social": data.get("capital_social"),
+        "Email": data.get("email"),
+        "Telefone": data.get("telefone"),
+        "Endereço": f"{data.get('logradouro', '')}, {data.get('numero', '')}, {data.get('bairro', '')} - {data.get('municipio', '')}/{data.get('uf', '')} - CEP {data.get('cep', '')}",
+        "Atividade Principal": (data.get("atividade_principal") or [{}])[0].get("text", "N/A"),
+        "Atividades Secundárias": data.get("atividades_secundarias", []),
+        "QSA": data.get("qsa", []),
+        "Simples": data.get("simples", {}),
+        "Simei": data.get("simei", {}),
+    }
+
+
+def consultar_cnpj(cnpj, usar_cache=True):
+    cnpj = "".join(c for c in str(cnpj) if c.isdigit())
+    if len(cnpj) != 14:
+        return {"erro": f"CNPJ inválido: '{cnpj}' (são necessários 14 dígitos)."}
+
+    data = buscar_cnpj(cnpj)
+    if data is not None:
+        _contar("base_local")
+        return _formatar(cnpj, data)
+
+    data = _ler_cache(cnpj) if usar_cache else None
+    if data is not None:
+        _contar("cache")
+        return _formatar(cnpj, data)
+
+    try:
+        data = _buscar_api(cnpj)
+    except Exception as e:
+        _contar("erros")
+        return {"erro": str(e)}
+    _gravar_cache(cnpj, data)
+    return _formatar(cnpj, data)
+
+
+def consultar_cnpjs(cnpjs, max_concorrencia=MAX_CONCORRENCIA, usar_cache=True, ao_concluir=None):
+    """
+    Consulta vários CNPJs em paralelo (repetidos são consultados uma vez).
+    Os que estão no cache respondem na hora; os demais vão à API dentro da cota
+    do limitador. `ao_concluir(cnpj, dados)`, se informada, é chamada na thread
+    da consulta a cada CNPJ concluído (ex.: para exibir o progresso).
+    Retorna {cnpj: dicionário de consultar_cnpj}.
+    """
+    unicos = list(dict.fromkeys("".join(c for c in str(cnpj) if c.isdigit()) for cnpj in cnpjs))
+
+    def _consultar(cnpj):
+        dados = consultar_cnpj(cnpj, usar_cache)
+        if ao_concluir is not None:
+            ao_concluir(cnpj, dados)
+        return dados
+
+    with ThreadPoolExecutor(max_workers=max_concorrencia, thread_name_prefix="receitaws") as executor:
+        resultados = executor.map(_consultar, unicos)
+        return dict(zip(unicos, resultados))
+
+
+def estatisticas_cnpj():
+    """Consultas respondidas pela base local e pelo cache, chamadas à API, erros, 429 e espera pela cota."""
+    with _trava_estatisticas:
+        return dict(_estatisticas)
+
+
+import re
+
+def tool_investigar_fornecedor(cnpj: str) -> str:
+    cnpj = re.sub(r'\D', '', cnpj)
+    dados = consultar_cnpj(cnpj)
+    if "erro" in dados:
+        return dados["erro"]
+
+    atividades_sec = "\n".join(
+        f"  - {a['code']}: {a['text']}" for a in dados.get("Atividades Secundárias", [])
+    ) or "  - Nenhuma"
+
+    socios = "\n".join(
+        f"  - {s['nome']} ({s['qual']})" for s in dados.get("QSA", [])
+    ) or "  - Não informado"
+
+    simples = dados.get("Simples", {})
+    simei = dados.get("Simei", {})
+
+    return (
+        f"🕵️‍♂️ **Investigação do CNPJ {cnpj}**\n"
+        f"- Razão Social: {dados['Razão Social']}\n"
+        f"- Nome Fantasia: {dados['Nome Fantasia'] or 'N/A'}\n"
+        f"- Situação: {dados['Situação']}\n"
+        f"- Tipo: {dados['Tipo']} | Porte: {dados['Porte']} | Natureza Jurídica: {dados['Natureza Jurídica']}\n"
+        f"- Abertura: {dados['Abertura']}\n"
+        f"- Capital Social: R$ {dados['Capital Social']}\n"
+        f"- Endereço: {dados['Endereço']}\n"
+        f"- Email: {dados['Email']} | Telefone: {dados['Telefone']}\n\n"
+
+        f"🏢 **Atividade Principal**:\n  - {dados['Atividade Principal']}\n\n"
+        f"📂 **Atividades Secundárias:**\n{atividades_sec}\n\n"
+        f"👥 **Quadro Societário:**\n{socios}\n\n"
+        f"💼 **Tributação:**\n"
+        f"  - Simples Nacional: {'Sim' if simples.get('optante') else 'Não'}\n"
+        f"  - MEI: {'Sim' if simei.get('optante') else 'Não'}"
+    )
@@ -1,52 +1,84 @@
 # main.py
 import os
+import asyncio
+import threading
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain import hub
-from langchain.tools import Tool
-from langchain_community.chat_models import ChatOpenAI
 import pandas as pd
 from datetime import datetime
-import matplotlib.pyplot as plt
 
-# Importa SOMENTE a função de carregamento, não as variáveis globais
-from data_loader import carregar_csvs
+# Armazém dos DataFrames (snapshot compartilhado); a carga começa no fim do módulo
+import data_store
+from dataset_nf import (
+    construir_dataset, ler_dataset, ler_agregados, separar_filtros, colunas_referenciadas, versao_dataset,
+)
+from schema import SCHEMA_CABECALHO, SCHEMA_ITENS
+from consulta_segura import ErroConsulta, executar, normalizar
+import consulta_sql
+from resultado_ferramenta import medir_ferramenta, paginar, referencias_validas
+from memo_ferramentas import memoizar, normalizar_entrada
+import cache_respostas
+import roteador_intencoes
+from prompt_react import carregar_prompt
+
+# LangChain, o cliente do LLM e o requests (ReceitaWS) são importados só quando
+# o agente é criado (obter_agente) ou a ferramenta é usada: importar este módulo
+# fica rápido e não acessa a rede. Perfil da partida: perfil_inicializacao.py.
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# --- Variáveis globais para armazenar os DataFrames no ESCOPO GLOBAL de main.py ---
-# Elas serão preenchidas pela ferramenta de carregamento
-global_df_cabecalho = None
-global_df_itens = None
+# --- Dados das NFs ---
+# Os DataFrames ficam no armazém único do processo (data_store.py), compartilhado
+# por todas as sessões. As queries do LLM continuam usando os nomes
+# 'global_df_cabecalho' e 'global_df_itens', que apontam para o snapshot atual.
 
 # --- Funções Wrappers para as Ferramentas (agora em main.py) ---
-# Essas funções terão acesso às variáveis globais de main.py
+
+def _nomes_consulta(snapshot):
+    """Nomes disponíveis nas queries do agente para o snapshot atual."""
+    return {
+        "global_df_cabecalho": snapshot.df_cabecalho,
+        "global_df_itens": snapshot.df_itens,
+        # Índice de junção por CHAVE DE ACESSO (ver indice_nf.py)
+        "indice_nf": snapshot.indice,
+    }
+
+def _atualizar_dataset():
+    # Mantém o dataset particionado (todos os meses) atualizado para as consultas com [MES=... UF=...]
+    try:
+        construir_dataset()
+        consulta_sql.invalidar()
+    except Exception as e:
+        print(f"Aviso: não foi possível atualizar o dataset particionado: {e}")
+
+
+def _preparar_agente():
+    # Cria o agente em segundo plano, para a primeira pergunta não pagar os imports do LangChain
+    obter_agente()
+
 
 def tool_carregar_dados_csvs(arg: str = None) -> str: # <--- MUDANÇA AQUI: Adicionei 'arg: str = None'
     """
-    Esta ferramenta deve ser usada primeiro e apenas uma vez para carregar os dados
-    dos arquivos CSV de cabeçalho e itens em DataFrames Pandas na memória.
-    Chame-a antes de qualquer consulta aos dados.
+    Verifica o estado dos dados. Os CSVs de cabeçalho e itens são carregados
+    automaticamente em segundo plano na partida do processo; esta ferramenta
+    não carrega nada (só tenta de novo se a carga anterior falhou).
     """
-    global global_df_cabecalho, global_df_itens
-    if global_df_cabecalho is not None and global_df_itens is not None:
-        return "Arquivos CSV de cabeçalho e itens já estão carregados na memória."
-        
-    df_c, df_i = carregar_csvs()
-    if df_c is not None and df_i is not None:
-        global_df_cabecalho = df_c
-        global_df_itens = df_i
-        print(global_df_itens.columns) # <--- MUDANÇA AQUI: Adicionada impressão das colunas de global_df_itens
-        print("🧾 Colunas do CABECALHO:", df_c.columns.tolist())
-        print("📦 Colunas dos ITENS:", df_i.columns.tolist())
-
-        return "Arquivos CSV de cabeçalho e itens carregados com sucesso na memória."
-    else:
-        return "Erro ao carregar os arquivos CSV. Verifique os caminhos e permissões."
+    estado = data_store.saude()
+    if estado["estado"] in ("erro", "sem_dados"):
+        data_store.iniciar_carga(tarefas_extras=_TAREFAS_APOS_CARGA)
+    snapshot = data_store.aguardar_pronto()
+    if snapshot is None:
+        return data_store.mensagem_indisponivel()
+    return (
+        f"Os dados já estão carregados na memória (mês {snapshot.mes}, versão {snapshot.versao}): "
+        f"{len(snapshot.df_cabecalho)} notas no cabeçalho e {len(snapshot.df_itens)} itens. "
+        "Pode consultar diretamente."
+    )
 
-from investigador import tool_investigar_fornecedor
+def tool_investigar_fornecedor(cnpj: str) -> str:
+    # investigador.py (requests, cache e base de CNPJs) só é importado na primeira investigação
+    from investigador import tool_investigar_fornecedor as investigar
+    return investigar(cnpj)
 
 
 
@@ -57,6 +89,7 @@ from investigador import tool_investigar_fornecedor
 def tool_consultar_cabecalho(query: str) -> str:
     """
     Executa uma operação Pandas no DataFrame 'global_df_cabecalho' e retorna o resultado.
+    A query é validada e executada pelo motor seguro (consulta_segura.py), sem eval() livre.
     Útil para responder perguntas sobre o cabeçalho das notas fiscais, como fornecedores,
     valores totais, datas de emissão.
     A entrada DEVE ser uma ÚNICA LINHA de código Pandas que RETORNA UM VALOR.
@@ -65,26 +98,38 @@ def tool_consultar_cabecalho(query: str) -> str:
     "global_df_cabecalho['Fornecedor'].value_counts().idxmax()",
     "global_df_cabecalho[global_df_cabecalho['ValorTotal'] > 1000].shape[0]".
     Certifique-se de usar 'global_df_cabecalho' como o nome do DataFrame na sua query.
+    Prefixo opcional "[MES=202401,202402 UF=SP,RJ]" (ou "[MES=*]" para todos os meses):
+    a query roda sobre o dataset particionado, lendo apenas os meses/UFs pedidos.
     """
-    global global_df_cabecalho
-    if global_df_cabecalho is None:
-        return "Erro: O DataFrame de cabeçalho não está carregado. Por favor, solicite 'carregar os dados' primeiro."
     try:
         # Garante que a query é uma única linha e remove aspas/backticks
         clean_query = query.strip().strip('"').strip("'").strip("`").split('\n')[0] # Only take the first line
-        
+        filtros, clean_query = separar_filtros(clean_query)
+
         # Optionally, check if the query looks like a method call for extra safety
         # if not (clean_query.startswith("global_df_cabecalho.") or clean_query.startswith("pd.")):
         #     return "Consulta inválida: A query deve começar com 'global_df_cabecalho.' ou 'pd.' para ser segura."
-            
-        result = eval(clean_query)
-        return str(result)
+
+        if filtros is not None:
+            df_particoes = ler_dataset(
+                "cabecalho", filtros["meses"], filtros["ufs"],
+                colunas_referenciadas(clean_query, SCHEMA_CABECALHO),
+            )
+            return executar(clean_query, {"global_df_cabecalho": df_particoes})
+
+        snapshot = data_store.aguardar_pronto()
+        if snapshot is None:
+            return f"Erro: {data_store.mensagem_indisponivel()}"
+        return executar(clean_query, _nomes_consulta(snapshot))
+    except ErroConsulta as e:
+        return f"Erro na consulta ao cabeçalho {e}"
     except Exception as e:
         return f"Erro ao executar a consulta no cabeçalho: {e}. Certifique-se de que a query é válida e usa 'global_df_cabecalho'."
 
 def tool_consultar_itens(query: str) -> str:
     """
     Executa uma operação Pandas no DataFrame 'global_df_itens' e retorna o resultado.
+    A query é validada e executada pelo motor seguro (consulta_segura.py), sem eval() livre.
     Útil para responder perguntas sobre os itens das notas fiscais, como quantidades,
     descrições de itens, valores unitários.
     A entrada DEVE ser uma ÚNICA LINHA de código Pandas que RETORNA UM VALOR.
@@ -93,103 +138,307 @@ def tool_consultar_itens(query: str) -> str:
     "global_df_itens['ItemDescricao'].value_counts().idxmax()",
     "global_df_itens[global_df_itens['ValorUnitario'] < 5].shape[0]".
     Certifique-se de usar 'global_df_itens' como o nome do DataFrame na sua query.
+    Aceita o mesmo prefixo opcional "[MES=... UF=...]" de tool_consultar_cabecalho.
     """
-    global global_df_itens
-    if global_df_itens is None:
-        return "Erro: O DataFrame de itens não está carregado. Por favor, solicite 'carregar os dados' primeiro."
     try:
         # Garante que a query é uma única linha e remove aspas/backticks
         clean_query = query.strip().strip('"').strip("'").strip("`").split('\n')[0] # Only take the first line
-
-        result = eval(clean_query)
-        return str(result)
+        filtros, clean_query = separar_filtros(clean_query)
+
+        if filtros is not None:
+            df_particoes = ler_dataset(
+                "itens", filtros["meses"], filtros["ufs"],
+                colunas_referenciadas(clean_query, SCHEMA_ITENS),
+            )
+            return executar(clean_query, {"global_df_itens": df_particoes})
+
+        snapshot = data_store.aguardar_pronto()
+        if snapshot is None:
+            return f"Erro: {data_store.mensagem_indisponivel()}"
+        return executar(clean_query, _nomes_consulta(snapshot))
+    except ErroConsulta as e:
+        return f"Erro na consulta aos itens {e}"
     except Exception as e:
         return f"Erro ao executar a consulta nos itens: {e}. Certifique-se de que a query é válida e usa 'global_df_itens'."
 
 
 
-from langchain.tools import Tool
 # Listar Colunas
 def tool_listar_colunas(_: str = None) -> str:
-    global global_df_cabecalho, global_df_itens
-    if global_df_cabecalho is None or global_df_itens is None:
-        return "Os dados ainda não foram carregados."
+    snapshot = data_store.aguardar_pronto()
+    if snapshot is None:
+        return data_store.mensagem_indisponivel()
 
-    cab_cols = ", ".join(global_df_cabecalho.columns.tolist())
-    itens_cols = ", ".join(global_df_itens.columns.tolist())
+    cab_cols = ", ".join(snapshot.df_cabecalho.columns.tolist())
+    itens_cols = ", ".join(snapshot.df_itens.columns.tolist())
 
     return (
         f"📄 Colunas do cabeçalho: {cab_cols}\n\n"
         f"📦 Colunas dos itens: {itens_cols}"
     )
 
+# Consultar Agregados
+def tool_consultar_agregados(consulta: str) -> str:
+    """
+    Responde a partir do cubo de agregados (agregados.py), sem varrer as tabelas.
+    A entrada é o nome de uma dimensão: 'geral', 'fornecedor', 'uf', 'dia' ou 'item',
+    opcionalmente com o prefixo '[MES=...]' para usar outros meses do dataset.
+    """
+    try:
+        filtros, dimensao = separar_filtros(consulta.strip().strip('"').strip("'").strip("`"))
+        dimensao = dimensao.strip().lower()
+        if filtros is not None:
+            cubo = ler_agregados(filtros["meses"])
+        else:
+            snapshot = data_store.aguardar_pronto()
+            if snapshot is None:
+                return data_store.mensagem_indisponivel()
+            cubo = snapshot.cubo
+        return cubo.tabela(dimensao).to_string(index=False)
+    except Exception as e:
+        return f"Erro ao consultar os agregados: {e}"
+
+# Consultar SQL
+def tool_consultar_sql(sql: str) -> str:
+    """
+    Executa um SELECT (DuckDB) sobre as tabelas 'cabecalho' e 'itens' (mês carregado)
+    e 'cabecalho_todos' e 'itens_todos' (todos os meses, com as colunas MES e UF).
+    Indicado para agrupamentos e junções grandes; o resultado vem limitado em linhas.
+    """
+    if data_store.aguardar_pronto() is None:
+        return f"Erro: {data_store.mensagem_indisponivel()}"
+    sql = sql.strip().strip('"').strip("'").strip("`")
+    try:
+        return consulta_sql.consultar(sql)
+    except consulta_sql.ErroSQL as e:
+        return f"Erro na consulta SQL {e}"
+    except Exception as e:
+        return f"Erro ao executar a consulta SQL: {e}"
+
 # --- Configuração do LLM ---
-# Escolha um dos modelos validados:
-#llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0) # Ou gemini-1.5-flash etc.
-llm = ChatOpenAI(
-    model_name="gpt-3.5-turbo",  # ou gpt-3.5-turbo, gpt-4o
-    temperature=0
-)
+def _criar_llm():
+    # Escolha um dos modelos validados:
+    # from langchain_google_genai import ChatGoogleGenerativeAI
+    # return ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0) # Ou gemini-1.5-flash etc.
+    from langchain_community.chat_models import ChatOpenAI
+    return ChatOpenAI(
+        model_name="gpt-3.5-turbo",  # ou gpt-3.5-turbo, gpt-4o
+        temperature=0
+    )
+
+def _versao_dados():
+    """Versão do snapshot carregado + versão do dataset particionado (None se nada carregado)."""
+    versao = data_store.versao_atual()
+    return None if versao is None else f"{versao}|{versao_dataset()}"
+
+
+def _normalizar_consulta_pandas(entrada):
+    """Prefixo de filtros + expressão canônica (espaços e aspas da expressão não importam)."""
+    filtros, expressao = separar_filtros(normalizar_entrada(entrada).split("\n")[0])
+    return f"{filtros}|{normalizar(expressao)}"
+
+
+# Ferramentas cuja resposta depende só da entrada e dos dados carregados (memo_ferramentas.py)
+_NORMALIZADORES_MEMO = {
+    "Consultar Cabeçalho NFs": _normalizar_consulta_pandas,
+    "Consultar Itens NFs": _normalizar_consulta_pandas,
+    "Consultar Agregados NFs": lambda entrada: normalizar_entrada(entrada).lower(),
+    "Consultar SQL NFs": lambda entrada: " ".join(normalizar_entrada(entrada).split()),
+    "Listar Colunas": lambda entrada: "",
+}
+
 # --- Definição das Ferramentas para o Agente ---
-tools = [
-    Tool(
-        name="Carregar Dados CSVs",
-        func=tool_carregar_dados_csvs,
-        description="Esta ferramenta deve ser usada primeiro e apenas uma vez para carregar os dados dos arquivos CSV de cabeçalho e itens em DataFrames Pandas na memória. Chame-a antes de qualquer consulta aos dados."
-    ),
-    Tool(
-        name="Consultar Cabeçalho NFs",
-        func=tool_consultar_cabecalho,
-        description="Útil para responder perguntas sobre o cabeçalho das notas fiscais. Recebe uma string que é uma operação válida do Pandas no DataFrame 'global_df_cabecalho'. Por exemplo: 'global_df_cabecalho['VALOR NOTA FISCAL'].max()', 'global_df_cabecalho['RAZÃO SOCIAL EMITENTE'].value_counts().head(5)'. Lembre-se de usar 'global_df_cabecalho'. Lembre-se que o cnpj do fornecedor é do CNPJ emitente"
-    ),
-    Tool(
-        name="Consultar Itens NFs",
-        func=tool_consultar_itens,
+def criar_ferramentas():
+    """Ferramentas do agente, já memoizadas e medidas."""
+    from langchain.tools import Tool
+
+    tools = [
+        Tool(
+            name="Carregar Dados CSVs",
+            func=tool_carregar_dados_csvs,
+            description="Os dados dos CSVs de cabeçalho e itens já são carregados automaticamente; NÃO é preciso chamar esta ferramenta antes das consultas. Use-a apenas se o usuário pedir para carregar os dados ou quiser saber o estado deles (mês e versão carregados)."
+        ),
+        Tool(
+            name="Consultar Cabeçalho NFs",
+            func=tool_consultar_cabecalho,
+            description="Útil para responder perguntas sobre o cabeçalho das notas fiscais. Recebe uma string que é uma operação válida do Pandas no DataFrame 'global_df_cabecalho'. Por exemplo: 'global_df_cabecalho['VALOR NOTA FISCAL'].max()', 'global_df_cabecalho['RAZÃO SOCIAL EMITENTE'].value_counts().head(5)'. Lembre-se de usar 'global_df_cabecalho'. Lembre-se que o cnpj do fornecedor é do CNPJ emitente. Sem prefixo, a consulta usa apenas o mês carregado; para outros meses ou para filtrar por UF do emitente, comece a query com um prefixo como '[MES=202401,202402 UF=SP]' ou '[MES=*]' (todos os meses). Para cruzar cabeçalho e itens sem merge, use o índice 'indice_nf': indice_nf.itens_da_nota(chave), indice_nf.itens_do_fornecedor(cnpj), indice_nf.juntar_cabecalho(['VALOR NOTA FISCAL']) ou indice_nf.totais_por_nota() (valor da nota vs. soma dos itens)."
+        ),
+        Tool(
+            name="Consultar Itens NFs",
+            func=tool_consultar_itens,
+            description=(
+                "Útil para responder perguntas sobre os itens das notas fiscais. "
+                "Recebe uma string que é uma operação válida do Pandas no DataFrame 'global_df_itens'. "
+                "Por exemplo: "
+                "'global_df_itens[\"DESCRIÇÃO DO PRODUTO/SERVIÇO\"].value_counts().idxmax()', "
+                "'global_df_itens.groupby(\"DESCRIÇÃO DO PRODUTO/SERVIÇO\")[\"QUANTIDADE\"].sum().idxmax()', "
+                "'global_df_itens[global_df_itens[\"VALOR UNITÁRIO\"] < 5].shape[0]'. "
+                "Lembre-se de usar 'global_df_itens' e os nomes corretos das colunas: "
+                "'DESCRIÇÃO DO PRODUTO/SERVIÇO', 'QUANTIDADE', 'VALOR UNITÁRIO', etc. "
+                "Sem prefixo, a consulta usa apenas o mês carregado; para outros meses ou UFs do emitente, "
+                "comece a query com um prefixo como '[MES=202401,202402 UF=SP]' ou '[MES=*]' (todos os meses). "
+                "Para cruzar itens e cabeçalho sem merge, use 'indice_nf': indice_nf.itens_da_nota(chave), "
+                "indice_nf.itens_do_fornecedor(cnpj), indice_nf.juntar_cabecalho(['VALOR NOTA FISCAL']) "
+                "ou indice_nf.totais_por_nota()."
+            )
+        ),
+        Tool(
+        name="Investigar Fornecedor",
+        func=tool_investigar_fornecedor,
+        description="Consulta dados do CNPJ de um fornecedor. Deve ter como entrada o numero do CNPJ. Se não tiver entrada um número de CNPJ, então é outra ferramenta."
+        ),
+        Tool(
+        name="Consultar Agregados NFs",
+        func=tool_consultar_agregados,
         description=(
-            "Útil para responder perguntas sobre os itens das notas fiscais. "
-            "Recebe uma string que é uma operação válida do Pandas no DataFrame 'global_df_itens'. "
-            "Por exemplo: "
-            "'global_df_itens[\"DESCRIÇÃO DO PRODUTO/SERVIÇO\"].value_counts().idxmax()', "
-            "'global_df_itens.groupby(\"DESCRIÇÃO DO PRODUTO/SERVIÇO\")[\"QUANTIDADE\"].sum().idxmax()', "
-            "'global_df_itens[global_df_itens[\"VALOR UNITÁRIO\"] < 5].shape[0]'. "
-            "Lembre-se de usar 'global_df_itens' e os nomes corretos das colunas: "
-            "'DESCRIÇÃO DO PRODUTO/SERVIÇO', 'QUANTIDADE', 'VALOR UNITÁRIO', etc."
+            "Forma mais rápida de responder totais e rankings. Entrada: uma dimensão entre "
+            "'geral' (total de NFs, valor total, maior NF), 'fornecedor' (qtd_nfs e valor_total por emitente), "
+            "'uf' (por UF do emitente), 'dia' (por dia de emissão) ou 'item' (quantidade e valor_total por "
+            "DESCRIÇÃO DO PRODUTO/SERVIÇO). Retorna as 20 primeiras linhas por valor_total. "
+            "Para outros meses, use o prefixo '[MES=202401,202402]' ou '[MES=*]'."
         )
-    ),
-    Tool(
-    name="Investigar Fornecedor",
-    func=tool_investigar_fornecedor,
-    description="Consulta dados do CNPJ de um fornecedor. Deve ter como entrada o numero do CNPJ. Se não tiver entrada um número de CNPJ, então é outra ferramenta."
-    ),
-    Tool(
-    name="Listar Colunas",
-    func=tool_listar_colunas,
-    description="Mostra ao agente os nomes das colunas dos DataFrames global_df_cabecalho e global_df_itens para evitar erros de digitação ou nome incorreto."
-    )
+        ),
+        Tool(
+        name="Consultar SQL NFs",
+        func=tool_consultar_sql,
+        description=(
+            "Executa um único SELECT em SQL (DuckDB) sobre as NFs. Prefira esta ferramenta para agrupamentos, "
+            "rankings e junções entre cabeçalho e itens. Tabelas: 'cabecalho' e 'itens' (mês carregado); "
+            "'cabecalho_todos' e 'itens_todos' (todos os meses, com as colunas MES e UF do emitente). "
+            "Os nomes de colunas têm espaços e acentos: use aspas duplas, por exemplo "
+            "SELECT \"RAZÃO SOCIAL EMITENTE\", SUM(\"VALOR NOTA FISCAL\") AS total FROM cabecalho "
+            "GROUP BY 1 ORDER BY total DESC LIMIT 5. "
+            "Junte cabeçalho e itens por \"CHAVE DE ACESSO\". Resultados grandes vêm resumidos."
+        )
+        ),
+        Tool(
+        name="Paginar Resultado",
+        func=paginar,
+        description=(
+            "Mostra outra página de um resultado grande que veio resumido. Entrada: o identificador "
+            "informado no resumo e o número da página, por exemplo 'res-3 2'."
+        )
+        ),
+        Tool(
+        name="Listar Colunas",
+        func=tool_listar_colunas,
+        description="Mostra ao agente os nomes das colunas dos DataFrames global_df_cabecalho e global_df_itens para evitar erros de digitação ou nome incorreto."
+        )
+
+    ]
+
+    for tool in tools:
+        if tool.name in _NORMALIZADORES_MEMO:
+            tool.func = memoizar(
+                tool.name, tool.func, _versao_dados,
+                normalizar=_NORMALIZADORES_MEMO[tool.name], validar=referencias_validas,
+            )
+        # Mede e registra os tokens de cada observação devolvida ao LLM (inclusive as memoizadas)
+        tool.func = medir_ferramenta(tool.name, tool.func)
+    return tools
 
-]
 
 # --- Criação do Agente ---
-prompt = hub.pull("hwchase17/react")
-agent = create_react_agent(llm, tools, prompt)
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
+# Um único AgentExecutor por processo, criado na primeira pergunta (ou em segundo
+# plano após a carga dos dados). O prompt ReAct vem do repositório (prompt_react.py).
+_agent_executor = None
+_trava_agente = threading.Lock()
+
+
+def obter_agente():
+    """AgentExecutor do processo; a primeira chamada importa o LangChain e cria LLM, ferramentas e prompt."""
+    global _agent_executor
+    if _agent_executor is None:
+        with _trava_agente:
+            if _agent_executor is None:
+                from langchain.agents import AgentExecutor, create_react_agent
+                tools = criar_ferramentas()
+                agent = create_react_agent(_criar_llm(), tools, carregar_prompt())
+                _agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True, handle_parsing_errors=True)
+    return _agent_executor
+
+
+def _guardar_resposta(pergunta, versao, saida):
+    # Só guarda se os dados já estavam carregados, não mudaram durante a resposta
+    # e o agente chegou a uma resposta final
+    if versao is not None and _versao_dados() == versao and not saida.startswith("Agent stopped"):
+        cache_respostas.guardar(pergunta, versao, saida)
+
 
 def perguntar_ao_agente(pergunta: str) -> str:
     """
     Envia uma pergunta ao agente de IA e retorna a resposta.
+    Perguntas comuns são respondidas direto dos agregados, sem LLM (roteador_intencoes.py);
+    perguntas já respondidas para a mesma versão dos dados saem do cache (cache_respostas.py).
     """
+    resposta = roteador_intencoes.responder(pergunta, data_store.aguardar_pronto())
+    if resposta is not None:
+        return resposta
+    versao = _versao_dados()
+    resposta = cache_respostas.obter(pergunta, versao)
+    if resposta is not None:
+        return resposta
     try:
         # A lógica para "carregar os dados" pode ser mais sofisticada se necessário.
         # Aqui, estamos contando com o agente para chamar a ferramenta correta.
-        response = agent_executor.invoke({"input": pergunta})
+        response = obter_agente().invoke({"input": pergunta})
+        _guardar_resposta(pergunta, versao, response['output'])
         return response['output']
     except Exception as e:
         return f"Ocorreu um erro ao processar sua pergunta: {e}"
 
+
+async def perguntar_ao_agente_async(pergunta: str, ao_passo=None) -> str:
+    """
+    Versão assíncrona de perguntar_ao_agente (usada por execucao_agente.py).
+    Percorre o ciclo ReAct com `astream` e chama `ao_passo(tipo, conteudo)` a cada
+    passo intermediário: ("acao", "ferramenta: entrada") e ("observacao", texto).
+    As ferramentas síncronas rodam em threads do executor do LangChain, sem
+    bloquear o laço de eventos. Cancelar a tarefa interrompe o ciclo.
+    """
+    # Espera a carga em segundo plano (se ainda não terminou) sem bloquear o laço de eventos
+    snapshot = await asyncio.to_thread(data_store.aguardar_pronto)
+    resposta = roteador_intencoes.responder(pergunta, snapshot)
+    if resposta is not None:
+        if ao_passo is not None:
+            ao_passo("acao", "Resposta direta a partir dos agregados (sem LLM)")
+        return resposta
+    versao = _versao_dados()
+    resposta = cache_respostas.obter(pergunta, versao)
+    if resposta is not None:
+        return resposta
+    ao_passo = ao_passo or (lambda tipo, conteudo: None)
+    saida = None
+    try:
+        agent_executor = await asyncio.to_thread(obter_agente)
+        async for parte in agent_executor.astream({"input": pergunta}):
+            for acao in parte.get("actions", []):
+                ao_passo("acao", f"{acao.tool}: {acao.tool_input}")
+            for passo in parte.get("steps", []):
+                ao_passo("observacao", str(passo.observation))
+            if "output" in parte:
+                saida = parte["output"]
+    except Exception as e:
+        return f"Ocorreu um erro ao processar sua pergunta: {e}"
+    if saida is None:
+        return "O agente terminou sem uma resposta final."
+    _guardar_resposta(pergunta, versao, saida)
+    return saida
+
+# Os dados começam a carregar em segundo plano assim que o módulo é importado;
+# a primeira pergunta não depende mais de o agente chamar a ferramenta de carga.
+# Fica no fim do módulo: se o snapshot já estiver pronto, as tarefas rodam na
+# hora e precisam de obter_agente e das ferramentas já definidas. Não roda nos
+# processos de consulta, que reimportam o módulo principal como __mp_main__.
+_TAREFAS_APOS_CARGA = [_preparar_agente, _atualizar_dataset]
+if __name__ != "__mp_main__":
+    data_store.iniciar_carga(tarefas_extras=_TAREFAS_APOS_CARGA)
+
+
 if __name__ == "__main__":
     
     print("Bem-vindo ao Agente de Consulta de Notas Fiscais!")
-    print("Para começar, digite 'Carregar os dados'.")
+    print("Os dados são carregados automaticamente; faça sua pergunta.")
     print("Para sair, digite 'sair'.")
 
     while True:
@@ -200,103 +449,3 @@ if __name__ == "__main__":
         
         resposta = perguntar_ao_agente(user_input)
         print(f"Resposta do Agente: {resposta}")
-
-
-
-from fpdf import FPDF
-from datetime import datetime
-import os
-from fpdf import FPDF
-from datetime import datetime
-
-def gerar_relatorio_pdf():
-    global global_df_cabecalho, global_df_itens
-
-    if global_df_cabecalho is None or global_df_itens is None:
-        return None, "Erro: Os dados não estão carregados. Use primeiro o botão 'Carregar os dados'."
-
-    try:
-        total_nfs = global_df_cabecalho.shape[0]
-        valor_total = global_df_cabecalho["VALOR NOTA FISCAL"].sum()
-        valor_medio = global_df_cabecalho["VALOR NOTA FISCAL"].mean()
-        valor_max = global_df_cabecalho["VALOR NOTA FISCAL"].max()
-        fornecedor_top = global_df_cabecalho["RAZÃO SOCIAL EMITENTE"].value_counts().idxmax()
-        item_top = (
-            global_df_itens
-            .groupby("DESCRIÇÃO DO PRODUTO/SERVIÇO")["QUANTIDADE"]
-            .sum()
-            .idxmax()
-        )
-
-        # Top 5 fornecedores por valor emitido
-        top_fornecedores = (
-            global_df_cabecalho
-            .groupby("RAZÃO SOCIAL EMITENTE")["VALOR NOTA FISCAL"]
-            .sum()
-            .sort_values(ascending=False)
-            .head(5)
-        )
-
-        # ➕ Top 5 fornecedores mais recorrentes por número de NFs
-        top_recor = (
-            global_df_cabecalho["RAZÃO SOCIAL EMITENTE"]
-            .value_counts()
-            .head(5)
-        )
-
-        # 📈 Criar gráfico de barras com matplotlib
-        plt.figure(figsize=(10, 6))
-        top_recor.plot(kind='bar', color='skyblue')
-        plt.title("Top 5 Fornecedores Mais Recorrentes (Qtd. de NFs)")
-        plt.xlabel("Fornecedor")
-        plt.ylabel("Quantidade de Notas Fiscais")
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-
-        grafico_path = "grafico_top_fornecedores.png"
-        plt.savefig(grafico_path)
-        plt.close()
-
-
-        # Criar o PDF
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(0, 10, "Relatório Estatístico de Notas Fiscais", ln=True, align="C")
-
-        pdf.set_font("Arial", "", 12)
-        pdf.ln(10)
-        pdf.cell(0, 10, f"Data do Relatório: {datetime.now().strftime('%d/%m/%Y %H:%M')}", ln=True)
-        pdf.ln(10)
-
-        # Estatísticas gerais
-        pdf.cell(0, 10, f"- Total de Notas Fiscais: {total_nfs}", ln=True)
-        pdf.cell(0, 10, f"- Valor Total: R$ {valor_total:,.2f}", ln=True)
-        pdf.cell(0, 10, f"- Valor Médio por NF: R$ {valor_medio:,.2f}", ln=True)
-        pdf.cell(0, 10, f"- Maior NF: R$ {valor_max:,.2f}", ln=True)
-        pdf.cell(0, 10, f"- Fornecedor mais recorrente: {fornecedor_top}", ln=True)
-        pdf.cell(0, 10, f"- Item mais vendido: {item_top}", ln=True)
-
-        # Top 5 fornecedores
-        pdf.ln(10)
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(0, 10, "Top 5 Fornecedores por Valor Emitido:", ln=True)
-        pdf.set_font("Arial", "", 12)
-        for fornecedor, total in top_fornecedores.items():
-            pdf.cell(0, 10, f"{fornecedor}: R$ {total:,.2f}", ln=True)
-
-        # ➕ Nova página com gráfico de barras
-        pdf.add_page()
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(0, 10, "Gráfico: Fornecedores Mais Recorrentes", ln=True)
-        pdf.image(grafico_path, x=10, y=30, w=190)  # Insere imagem no PDF
-
-
-        # Finalizar
-        output_path = "relatorio_estatistico.pdf"
-        pdf.output(output_path)
-
-        return output_path, "Relatório gerado com sucesso!"
-    except Exception as e:
-        return None, f"Erro ao gerar o PDF: {e}"
-
@@ -0,0 +1,93 @@
+# memo_ferramentas.py
+"""
+Memoização das ferramentas determinísticas do agente.
+
+Dentro de um mesmo ciclo ReAct, e entre perguntas diferentes, o agente repete
+chamadas idênticas (`Listar Colunas` em quase toda pergunta, a mesma consulta
+ao cabeçalho etc.). Para essas ferramentas a resposta depende só da entrada e
+dos dados carregados, então ela é guardada em um LRU limitado com a chave:
+  (nome da ferramenta, entrada normalizada, versão dos dados).
+
+Com a versão na chave, carregar dados novos invalida tudo automaticamente.
+Respostas de erro não são guardadas (podem depender de estado passageiro,
+como tempo excedido). `estatisticas()` mostra, por ferramenta, chamadas,
+acertos e o tempo economizado.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+MAX_ENTRADAS = 512
+
+_entradas = OrderedDict()  # (ferramenta, entrada, versão) -> (texto, segundos gastos)
+_trava = threading.Lock()
+_estatisticas = {}  # ferramenta -> {"chamadas", "acertos", "segundos_economizados"}
+
+
+def normalizar_entrada(entrada):
+    """Tira espaços nas pontas e as aspas/crases que o LLM costuma colocar em volta."""
+    return str(entrada or "").strip().strip('"').strip("'").strip("`").strip()
+
+
+def _contar(ferramenta, acerto, economizado=0.0):
+    stats = _estatisticas.setdefault(ferramenta, {"chamadas": 0, "acertos": 0, "segundos_economizados": 0.0})
+    stats["chamadas"] += 1
+    if acerto:
+        stats["acertos"] += 1
+        stats["segundos_economizados"] += economizado
+
+
+def memoizar(ferramenta, func, versao, normalizar=normalizar_entrada, validar=None):
+    """
+    Envolve a função de uma ferramenta com o LRU.
+    `versao()` devolve a versão atual dos dados (None = não guardar nada);
+    `normalizar(entrada)` dá a forma canônica da entrada; `validar(texto)`,
+    se informado, diz se uma resposta guardada ainda pode ser reutilizada.
+    """
+    def _memoizada(entrada=None):
+        versao_dados = versao()
+        if versao_dados is None:
+            return func(entrada)
+        try:
+            chave = (ferramenta, normalizar(entrada), versao_dados)
+        except Exception:
+            chave = (ferramenta, normalizar_entrada(entrada), versao_dados)
+
+        with _trava:
+            guardado = _entradas.get(chave)
+            if guardado is not None and (validar is None or validar(guardado[0])):
+                _entradas.move_to_end(chave)
+                _contar(ferramenta, True, guardado[1])
+                return guardado[0]
+
+        inicio = time.perf_counter()
+        texto = func(entrada)
+        gasto = time.perf_counter() - inicio
+
+        with _trava:
+            _contar(ferramenta, False)
+            if isinstance(texto, str) and not texto.startswith("Erro") and versao() == versao_dados:
+                _entradas[chave] = (texto, gasto)
+                _entradas.move_to_end(chave)
+                while len(_entradas) > MAX_ENTRADAS:
+                    _entradas.popitem(last=False)
+        return texto
+
+    _memoizada.__name__ = getattr(func, "__name__", ferramenta)
+    _memoizada.__doc__ = func.__doc__
+    return _memoizada
+
+
+def limpar():
+    """Descarta todas as respostas guardadas."""
+    with _trava:
+        _entradas.clear()
+
+
+def estatisticas():
+    """Por ferramenta: chamadas, acertos, taxa de acerto e segundos economizados."""
+    with _trava:
+        return {
+            ferramenta: {**stats, "taxa_acerto": stats["acertos"] / stats["chamadas"]}
+            for ferramenta, stats in _estatisticas.items()
+        }
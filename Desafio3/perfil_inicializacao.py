@@ -0,0 +1,110 @@
+# perfil_inicializacao.py
+"""
+Perfil da partida do processo com `python -X importtime`.
+
+Importa o módulo pedido (padrão: main) em um processo novo e resume o log do
+importtime:
+  - tempo total do import (relógio);
+  - tempo gasto nos módulos do projeto (os .py desta pasta) e nas bibliotecas;
+  - as bibliotecas e os módulos mais lentos.
+
+Com `--agente`, mede também a criação do agente (main.obter_agente), que é
+onde o LangChain e o cliente do LLM passam a ser importados.
+
+Uso: python perfil_inicializacao.py [modulo] [--agente] [--top N]
+"""
+import os
+import re
+import subprocess
+import sys
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+TOP_PADRAO = 15
+# Os prints da carga em segundo plano podem se misturar aos tempos na mesma linha
+_TEMPO = re.compile(r"(IMPORT_SEGUNDOS|AGENTE_SEGUNDOS) ([0-9.eE+-]+)")
+
+_SCRIPT = """
+import time
+inicio = time.perf_counter()
+import {modulo}
+print(f"IMPORT_SEGUNDOS {{time.perf_counter() - inicio}}")
+if {agente}:
+    inicio = time.perf_counter()
+    {modulo}.obter_agente()
+    print(f"AGENTE_SEGUNDOS {{time.perf_counter() - inicio}}")
+"""
+
+
+def modulos_do_projeto(pasta=PASTA):
+    return {nome[:-3] for nome in os.listdir(pasta) if nome.endswith(".py")}
+
+
+def ler_importtime(texto):
+    """Linhas do -X importtime: lista de (módulo, self µs, acumulado µs)."""
+    linhas = []
+    for linha in texto.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        linhas.append((nome.strip(), int(proprio), int(acumulado)))
+    return linhas
+
+
+def medir(modulo="main", agente=False):
+    """Roda o import em um processo novo. Retorna (linhas do importtime, tempos medidos no processo)."""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT.format(modulo=modulo, agente=agente)],
+        cwd=PASTA, capture_output=True, text=True,
+    )
+    tempos = {chave: float(valor) for chave, valor in _TEMPO.findall(resultado.stdout)}
+    if resultado.returncode != 0:
+        erro = [l for l in resultado.stderr.splitlines() if not l.startswith("import time:")]
+        raise RuntimeError("\n".join(erro[-5:]))
+    return ler_importtime(resultado.stderr), tempos
+
+
+def resumir(linhas, projeto=None):
+    """Tempo próprio por pacote de topo e o total do projeto vs. bibliotecas (em ms)."""
+    projeto = projeto if projeto is not None else modulos_do_projeto()
+    por_pacote = {}
+    for nome, proprio, _ in linhas:
+        pacote = nome.split(".")[0]
+        por_pacote[pacote] = por_pacote.get(pacote, 0) + proprio
+    do_projeto = sum(us for pacote, us in por_pacote.items() if pacote in projeto)
+    return {
+        "projeto_ms": do_projeto / 1000,
+        "bibliotecas_ms": (sum(por_pacote.values()) - do_projeto) / 1000,
+        "por_pacote_ms": {p: us / 1000 for p, us in sorted(por_pacote.items(), key=lambda x: -x[1])},
+    }
+
+
+def imprimir_perfil(modulo="main", agente=False, top=TOP_PADRAO):
+    linhas, tempos = medir(modulo, agente)
+    resumo = resumir(linhas)
+    projeto = modulos_do_projeto()
+    print(f"Import de '{modulo}': {tempos.get('IMPORT_SEGUNDOS', 0) * 1000:.0f} ms (relógio)")
+    print(f"  - módulos do projeto: {resumo['projeto_ms']:.1f} ms")
+    print(f"  - bibliotecas:        {resumo['bibliotecas_ms']:.1f} ms")
+    if "AGENTE_SEGUNDOS" in tempos:
+        print(f"Criação do agente (obter_agente): {tempos['AGENTE_SEGUNDOS'] * 1000:.0f} ms")
+
+    print("\nPacotes mais lentos (tempo próprio):")
+    for pacote, ms in list(resumo["por_pacote_ms"].items())[:top]:
+        print(f"  {ms:8.1f} ms  {pacote}{'  (projeto)' if pacote in projeto else ''}")
+    print("\nMódulos do projeto:")
+    for nome, proprio, acumulado in sorted(linhas, key=lambda l: -l[1]):
+        if nome.split(".")[0] in projeto:
+            print(f"  {proprio / 1000:8.1f} ms próprio  {acumulado / 1000:8.1f} ms acumulado  {nome}")
+    return resumo
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    top = TOP_PADRAO
+    if "--top" in argumentos:
+        i = argumentos.index("--top")
+        top = int(argumentos[i + 1])
+        del argumentos[i:i + 2]
+    agente = "--agente" in argumentos
+    argumentos = [a for a in argumentos if a != "--agente"]
+    imprimir_perfil(argumentos[0] if argumentos else "main", agente, top)
@@ -0,0 +1,66 @@
+# prompt_react.py
+"""
+Prompt ReAct do agente, guardado no repositório.
+
+Antes o prompt vinha de `hub.pull("hwchase17/react")` a cada partida do
+processo: uma chamada de rede (LangSmith) que atrasava a partida em segundos
+e derrubava o agente quando a rede estava fora. `TEMPLATE_REACT` é uma cópia
+do mesmo template; `python prompt_react.py` busca a versão atual no hub e a
+grava em `cache/prompt_react.txt`, que passa a ter prioridade sobre a cópia.
+"""
+import os
+
+from cache_respostas import CACHE_DIR
+
+NOME_HUB = "hwchase17/react"
+CAMINHO_PROMPT = os.path.join(CACHE_DIR, "prompt_react.txt")
+
+TEMPLATE_REACT = """Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+
+def texto_prompt(caminho=CAMINHO_PROMPT):
+    """Template atualizado do hub, se já foi baixado; senão a cópia do repositório."""
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return arquivo.read()
+    except FileNotFoundError:
+        return TEMPLATE_REACT
+
+
+def carregar_prompt():
+    """PromptTemplate do ReAct, sem acessar a rede."""
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate.from_template(texto_prompt())
+
+
+def atualizar_do_hub(caminho=CAMINHO_PROMPT):
+    """Baixa o prompt atual do hub e grava em `caminho`. Retorna o texto gravado."""
+    from langchain import hub
+    template = hub.pull(NOME_HUB).template
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write(template)
+    print(f"✔ Prompt '{NOME_HUB}' atualizado em '{caminho}'.")
+    return template
+
+
+if __name__ == "__main__":
+    atualizar_do_hub()
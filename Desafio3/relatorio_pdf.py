@@ -0,0 +1,142 @@
+# relatorio_pdf.py
+"""
+Relatório estatístico das NFs em PDF, gerado em memória e guardado por versão dos dados.
+
+  - Os números vêm do cubo de agregados do snapshot (agregados.py), sem
+    reagrupar os DataFrames completos.
+  - O gráfico de barras é desenhado direto no PDF com retângulos do FPDF: não
+    há imagem intermediária nem arquivo temporário (o FPDF 1.7 só insere
+    imagens a partir de arquivos).
+  - O PDF sai como bytes (`pdf.output(dest="S")`) e vai direto para o
+    `st.download_button`; nada é gravado no diretório de trabalho, então
+    usuários simultâneos não sobrescrevem o arquivo uns dos outros.
+  - O PDF pronto fica guardado por versão dos dados: pedir o relatório de novo,
+    sem dados novos, devolve os mesmos bytes na hora.
+"""
+import threading
+from datetime import datetime
+
+from fpdf import FPDF
+
+import data_store
+
+MAX_VERSOES_GUARDADAS = 4
+TOP_N = 5
+_COR_BARRA = (135, 206, 235)  # skyblue, a mesma cor do gráfico anterior
+_LARGURA_ROTULO = 70  # mm reservados para o nome do fornecedor no gráfico
+_ALTURA_BARRA = 12
+
+_pdfs = {}  # versão dos dados -> (bytes do PDF, gerado em)
+_trava = threading.Lock()
+_estatisticas = {"gerados": 0, "reaproveitados": 0}
+
+
+def _texto(valor, limite=None):
+    """Texto seguro para as fontes padrão do FPDF (latin-1), opcionalmente cortado."""
+    texto = str(valor)
+    if limite and len(texto) > limite:
+        texto = texto[:limite - 3] + "..."
+    return texto.encode("latin-1", "replace").decode("latin-1")
+
+
+def _rotulo_cabe(pdf, rotulo, largura):
+    """Rótulo cortado com '...' até caber na largura (mm) com a fonte atual."""
+    texto = _texto(rotulo)
+    while len(texto) > 4 and pdf.get_string_width(texto) > largura:
+        texto = _texto(rotulo, len(texto) - 1)
+    return texto
+
+
+def _grafico_barras(pdf, serie, titulo):
+    """Barras horizontais (maior no topo) com o rótulo à esquerda e o valor ao fim de cada barra."""
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, _texto(titulo), ln=True)
+    pdf.ln(5)
+    pdf.set_font("Arial", "", 10)
+
+    x_barra = pdf.l_margin + _LARGURA_ROTULO
+    largura_max = pdf.w - pdf.r_margin - x_barra - 20
+    maior = max(float(serie.max()), 1.0) if len(serie) else 1.0
+    pdf.set_fill_color(*_COR_BARRA)
+    for rotulo, valor in serie.items():
+        y = pdf.get_y()
+        pdf.set_xy(pdf.l_margin, y)
+        pdf.cell(_LARGURA_ROTULO - 2, _ALTURA_BARRA, _rotulo_cabe(pdf, rotulo, _LARGURA_ROTULO - 4), align="R")
+        largura = largura_max * float(valor) / maior
+        pdf.rect(x_barra, y + 2, largura, _ALTURA_BARRA - 4, "F")
+        pdf.set_xy(x_barra + largura + 2, y)
+        pdf.cell(20, _ALTURA_BARRA, f"{valor:,.0f}")
+        pdf.set_xy(pdf.l_margin, y + _ALTURA_BARRA)
+
+
+def montar_pdf(snapshot):
+    """Bytes do relatório estatístico do snapshot."""
+    cubo = snapshot.cubo
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, "Relatório Estatístico de Notas Fiscais", ln=True, align="C")
+
+    pdf.set_font("Arial", "", 12)
+    pdf.ln(10)
+    pdf.cell(0, 10, f"Data do Relatório: {datetime.now().strftime('%d/%m/%Y %H:%M')}", ln=True)
+    pdf.cell(0, 10, f"Mês dos dados: {snapshot.mes} (versão {snapshot.versao})", ln=True)
+    pdf.ln(10)
+
+    # Estatísticas gerais
+    pdf.cell(0, 10, f"- Total de Notas Fiscais: {cubo.total_nfs()}", ln=True)
+    pdf.cell(0, 10, f"- Valor Total: R$ {cubo.valor_total():,.2f}", ln=True)
+    pdf.cell(0, 10, f"- Valor Médio por NF: R$ {cubo.valor_medio():,.2f}", ln=True)
+    pdf.cell(0, 10, f"- Maior NF: R$ {cubo.valor_max():,.2f}", ln=True)
+    pdf.cell(0, 10, _texto(f"- Fornecedor mais recorrente: {cubo.fornecedor_mais_recorrente()}"), ln=True)
+    pdf.cell(0, 10, _texto(f"- Item mais vendido: {cubo.item_mais_vendido()}", 90), ln=True)
+
+    # Top 5 fornecedores
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, f"Top {TOP_N} Fornecedores por Valor Emitido:", ln=True)
+    pdf.set_font("Arial", "", 12)
+    for fornecedor, total in cubo.top_fornecedores_valor(TOP_N).items():
+        pdf.cell(0, 10, _texto(f"{fornecedor}: R$ {total:,.2f}", 90), ln=True)
+
+    # Nova página com o gráfico de barras
+    pdf.add_page()
+    _grafico_barras(pdf, cubo.top_fornecedores_qtd(TOP_N), f"Gráfico: Top {TOP_N} Fornecedores Mais Recorrentes (Qtd. de NFs)")
+
+    saida = pdf.output(dest="S")
+    # FPDF 1.7 devolve str (latin-1); versões mais novas já devolvem bytes
+    return saida.encode("latin-1") if isinstance(saida, str) else bytes(saida)
+
+
+def gerar_relatorio_pdf():
+    """
+    Retorna (bytes do PDF, mensagem), ou (None, mensagem de erro).
+    O PDF de cada versão dos dados é gerado uma única vez e reaproveitado.
+    """
+    snapshot = data_store.aguardar_pronto()
+    if snapshot is None:
+        return None, f"Erro: {data_store.mensagem_indisponivel()}"
+
+    # A trava evita que usuários simultâneos gerem o mesmo PDF ao mesmo tempo
+    with _trava:
+        guardado = _pdfs.get(snapshot.versao)
+        if guardado is not None:
+            _estatisticas["reaproveitados"] += 1
+            conteudo, gerado_em = guardado
+            return conteudo, f"Relatório gerado em {gerado_em:%d/%m/%Y %H:%M} (dados sem alteração desde então)."
+        try:
+            conteudo = montar_pdf(snapshot)
+        except Exception as e:
+            return None, f"Erro ao gerar o PDF: {e}"
+        _pdfs[snapshot.versao] = (conteudo, datetime.now())
+        while len(_pdfs) > MAX_VERSOES_GUARDADAS:
+            _pdfs.pop(next(iter(_pdfs)))
+        _estatisticas["gerados"] += 1
+    return conteudo, "Relatório gerado com sucesso!"
+
+
+def estatisticas():
+    """PDFs gerados e pedidos atendidos com um PDF já pronto."""
+    with _trava:
+        return {**_estatisticas, "versoes_guardadas": len(_pdfs)}
@@ -0,0 +1,188 @@
+# resultado_ferramenta.py
+"""
+Formatação das respostas das ferramentas devolvidas ao LLM (observações do ReAct).
+
+Resultados pequenos saem como texto normal. Resultados grandes (muitas linhas
+ou muito texto) viram um resumo limitado:
+  - tipo e formato (linhas x colunas);
+  - as primeiras linhas (e colunas);
+  - estatísticas das colunas numéricas e, para texto, os valores mais frequentes;
+  - os tipos das colunas;
+  - um identificador ("res-N") para a ferramenta `Paginar Resultado`, que
+    devolve as páginas seguintes do resultado completo guardado em memória.
+
+Cada observação tem os tokens medidos (tiktoken, se instalado; senão uma
+estimativa por caracteres) e registrados com `print`, como o resto do projeto.
+"""
+import itertools
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+LINHAS_PREVIA = 10
+COLUNAS_PREVIA = 6
+LARGURA_MAX_VALOR = 40
+LINHAS_POR_PAGINA = 20
+CARACTERES_MAX = 2_000
+RESULTADOS_GUARDADOS = 32
+_CARACTERES_POR_TOKEN = 4  # estimativa quando o tiktoken não está disponível
+
+_resultados = OrderedDict()  # id -> Series/DataFrame completo (LRU)
+_contador = itertools.count(1)
+_IDENTIFICADOR = re.compile(r"\bres-\d+\b")
+_trava = threading.Lock()
+_estatisticas = {}  # ferramenta -> {"chamadas", "tokens", "max_tokens"}
+
+
+def contar_tokens(texto):
+    """Número de tokens do texto (exato com tiktoken; aproximado sem ele)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return max(1, len(texto) // _CARACTERES_POR_TOKEN) if texto else 0
+    return len(tiktoken.get_encoding("cl100k_base").encode(texto))
+
+
+def _guardar(resultado):
+    with _trava:
+        identificador = f"res-{next(_contador)}"
+        _resultados[identificador] = resultado
+        while len(_resultados) > RESULTADOS_GUARDADOS:
+            _resultados.popitem(last=False)
+        return identificador
+
+
+def _como_tabela(resultado):
+    if isinstance(resultado, pd.Index):
+        return resultado.to_series(index=range(len(resultado)))
+    return resultado
+
+
+def _estatisticas_colunas(df):
+    """describe() das colunas numéricas e os valores mais frequentes das de texto."""
+    partes = []
+    numericas = df.select_dtypes(include="number").iloc[:, :COLUNAS_PREVIA]
+    if not numericas.empty:
+        partes.append("Estatísticas (numéricas):\n" + numericas.describe().round(2).to_string())
+    textos = df.select_dtypes(include=["object", "string", "category"])
+    for coluna in list(textos.columns)[:3]:
+        frequentes = textos[coluna].value_counts().head(3)
+        valores = ", ".join(f"{str(valor)[:LARGURA_MAX_VALOR]} ({qtd})" for valor, qtd in frequentes.items())
+        partes.append(f"Mais frequentes em '{coluna}' ({textos[coluna].nunique()} distintos): {valores}")
+    return "\n".join(partes)
+
+
+def resumir(resultado, linhas_previa=LINHAS_PREVIA, observacao=None):
+    """Resumo limitado de uma Series/DataFrame grande, com o id para paginar."""
+    resultado = _como_tabela(resultado)
+    identificador = _guardar(resultado)
+    df = resultado.to_frame() if isinstance(resultado, pd.Series) else resultado
+
+    tipos = ", ".join(f"{col}: {tipo}" for col, tipo in df.dtypes.astype(str).items())
+    paginas = -(-len(resultado) // LINHAS_POR_PAGINA)
+    previa = df.iloc[:linhas_previa, :COLUNAS_PREVIA].to_string(max_colwidth=LARGURA_MAX_VALOR)
+    while len(previa) > CARACTERES_MAX // 2 and linhas_previa > 3:
+        # Linhas largas: menos linhas na prévia para sobrar espaço às estatísticas
+        linhas_previa //= 2
+        previa = df.iloc[:linhas_previa, :COLUNAS_PREVIA].to_string(max_colwidth=LARGURA_MAX_VALOR)
+    if df.shape[1] > COLUNAS_PREVIA:
+        previa += f"\n(mais {df.shape[1] - COLUNAS_PREVIA} colunas; selecione as colunas necessárias)"
+    partes = [
+        f"Resultado grande ({type(resultado).__name__} com {df.shape[0]} linhas x {df.shape[1]} colunas).",
+        f"Primeiras {min(linhas_previa, len(df))} linhas:\n{previa}",
+        _estatisticas_colunas(df.iloc[:, :COLUNAS_PREVIA * 3]),
+        f"Tipos: {tipos}",
+        f"Para ver o restante use a ferramenta 'Paginar Resultado' com '{identificador} 2' "
+        f"({paginas} páginas de {LINHAS_POR_PAGINA} linhas). Prefira refinar a consulta (filtrar, agregar, head).",
+    ]
+    if observacao:
+        partes.append(observacao)
+    texto = "\n".join(p for p in partes if p)
+    if len(texto) > CARACTERES_MAX:
+        # Muitas colunas: corta o fim do resumo (tipos), mantendo o id para paginar
+        texto = texto[:CARACTERES_MAX - len(partes[-1]) - 5] + "\n...\n" + partes[-1]
+    return texto
+
+
+def formatar(resultado, observacao=None):
+    """
+    Texto da resposta da ferramenta. Series/DataFrames/Index grandes são resumidos;
+    os demais resultados saem com str(), cortados em CARACTERES_MAX.
+    `observacao` é acrescentada ao final (ex.: aviso de que o resultado foi limitado).
+    """
+    if isinstance(resultado, (pd.DataFrame, pd.Series, pd.Index)):
+        texto = None
+        if len(resultado) <= LINHAS_PREVIA * 2:
+            texto = resultado.to_string() if not isinstance(resultado, pd.Index) else str(resultado)
+        if texto is None or len(texto) > CARACTERES_MAX:
+            return resumir(resultado, observacao=observacao)
+    else:
+        texto = str(resultado)
+        if len(texto) > CARACTERES_MAX:
+            texto = texto[:CARACTERES_MAX] + f"\n... ({len(texto) - CARACTERES_MAX} caracteres omitidos; refine a consulta.)"
+    return f"{texto}\n{observacao}" if observacao else texto
+
+
+def paginar(entrada):
+    """Entrada: '<id> <página>' (ex.: 'res-3 2'). Devolve aquela página do resultado guardado."""
+    partes = entrada.strip().strip('"').strip("'").split()
+    if not partes:
+        return "Informe o identificador do resultado, por exemplo 'res-3 2'."
+    identificador = partes[0]
+    try:
+        pagina = int(partes[1]) if len(partes) > 1 else 1
+    except ValueError:
+        return f"Página inválida: '{partes[1]}'. Use um número, por exemplo '{identificador} 2'."
+    with _trava:
+        resultado = _resultados.get(identificador)
+        if resultado is not None:
+            _resultados.move_to_end(identificador)
+    if resultado is None:
+        return f"Resultado '{identificador}' não encontrado (expirou ou não existe). Refaça a consulta."
+    paginas = max(1, -(-len(resultado) // LINHAS_POR_PAGINA))
+    if not 1 <= pagina <= paginas:
+        return f"Página {pagina} fora do intervalo: o resultado '{identificador}' tem {paginas} páginas."
+    inicio = (pagina - 1) * LINHAS_POR_PAGINA
+    trecho = resultado.iloc[inicio:inicio + LINHAS_POR_PAGINA].to_string(max_colwidth=LARGURA_MAX_VALOR)
+    return formatar(f"Página {pagina}/{paginas} de '{identificador}':\n{trecho}")
+
+
+def referencias_validas(texto):
+    """True se todos os identificadores 'res-N' citados no texto ainda estão guardados."""
+    with _trava:
+        return all(identificador in _resultados for identificador in _IDENTIFICADOR.findall(texto))
+
+
+def registrar_observacao(ferramenta, texto):
+    """Mede os tokens da observação, acumula por ferramenta e registra no console."""
+    tokens = contar_tokens(texto)
+    with _trava:
+        stats = _estatisticas.setdefault(ferramenta, {"chamadas": 0, "tokens": 0, "max_tokens": 0})
+        stats["chamadas"] += 1
+        stats["tokens"] += tokens
+        stats["max_tokens"] = max(stats["max_tokens"], tokens)
+    print(f"[observação] {ferramenta}: {tokens} tokens ({len(texto)} caracteres)")
+    return tokens
+
+
+def medir_ferramenta(ferramenta, func):
+    """Envolve a função de uma ferramenta para registrar os tokens de cada resposta."""
+    def _medida(*args, **kwargs):
+        texto = func(*args, **kwargs)
+        registrar_observacao(ferramenta, str(texto))
+        return texto
+
+    _medida.__name__ = getattr(func, "__name__", ferramenta)
+    _medida.__doc__ = func.__doc__
+    return _medida
+
+
+def estatisticas_observacoes():
+    """Tokens por ferramenta: chamadas, total, média e maior observação."""
+    with _trava:
+        return {
+            ferramenta: {**stats, "media_tokens": stats["tokens"] / stats["chamadas"]}
+            for ferramenta, stats in _estatisticas.items()
+        }
@@ -0,0 +1,108 @@
+# roteador_intencoes.py
+"""
+Atalho determinístico para as perguntas mais comuns, sem chamar o LLM.
+
+Perguntas como as das "Dicas" do app (valor total das NFs, fornecedor mais
+frequente, item mais vendido) são reconhecidas por expressões regulares sobre
+a pergunta normalizada e respondidas direto do cubo de agregados do snapshot
+(agregados.py), em milissegundos. A expressão precisa casar com a pergunta
+INTEIRA: qualquer detalhe a mais ("em SP", "em janeiro", "menor"...) faz a
+pergunta seguir para o agente ReAct, que sabe filtrar.
+"""
+import re
+import threading
+
+from cache_respostas import normalizar_pergunta
+
+# Palavras ignoradas além das do cache_respostas (não mudam a intenção)
+_PALAVRAS_EXTRAS = {"foi", "sao", "seria", "todas", "todos", "em", "ha", "existe", "existem", "tem", "dados"}
+
+_NF = r"(notas?|nfs?|nfes?)( fiscais?| fiscal)?"
+
+# intenção -> expressão sobre a pergunta normalizada
+INTENCOES = {
+    "valor_total": rf"(quanto )?(soma( valores?)?|valor total|montante total|valor somado|total valores?) {_NF}",
+    "total_nfs": rf"(quantas|numero|quantidade|total) {_NF}( emitidas| carregadas)?",
+    "valor_medio": rf"(valor medio|media valor|media valores|ticket medio)( por)?( {_NF})?",
+    "valor_max": rf"((maior|maximo) valor {_NF}|(maior|mais cara) {_NF}|{_NF} (com )?(maior valor|mais cara))",
+    "fornecedor_mais_recorrente": (
+        r"(fornecedor|emitente|empresa)( (aparece|apareceu|emitiu|emite))? mais"
+        rf"( (vezes|vez|recorrente|frequente|notas|nfs))( cabecalho| {_NF})?"
+    ),
+    "fornecedor_maior_valor": (
+        r"(fornecedor|emitente|empresa)( (teve|tem|com|recebeu|obteve|possui))? (maior|mais)"
+        r" (montante|valor|faturamento)( total)?( (recebido|emitido|notas|nfs|vendido))?"
+    ),
+    "item_mais_vendido": r"(item|produto) mais vendido( quantidade)?",
+}
+_PADROES = {intencao: re.compile(padrao) for intencao, padrao in INTENCOES.items()}
+
+_trava = threading.Lock()
+_estatisticas = {"respondidas": 0, "encaminhadas": 0, "por_intencao": {}}
+
+
+def normalizar(pergunta):
+    """Pergunta normalizada para o casamento com as intenções."""
+    return " ".join(p for p in normalizar_pergunta(pergunta).split() if p not in _PALAVRAS_EXTRAS)
+
+
+def identificar(pergunta):
+    """Nome da intenção reconhecida, ou None."""
+    texto = normalizar(pergunta)
+    for intencao, padrao in _PADROES.items():
+        if padrao.fullmatch(texto):
+            return intencao
+    return None
+
+
+def _responder(intencao, snapshot):
+    cubo = snapshot.cubo
+    mes = f"(mês {snapshot.mes})"
+    if cubo.total_nfs() == 0:
+        return f"Não há notas fiscais carregadas {mes}."
+    if intencao == "valor_total":
+        return f"O valor total de todas as notas fiscais {mes} é R$ {cubo.valor_total():,.2f}."
+    if intencao == "total_nfs":
+        return f"Há {cubo.total_nfs()} notas fiscais {mes}."
+    if intencao == "valor_medio":
+        return f"O valor médio por nota fiscal {mes} é R$ {cubo.valor_medio():,.2f}."
+    if intencao == "valor_max":
+        return f"A nota fiscal de maior valor {mes} é de R$ {cubo.valor_max():,.2f}."
+    if intencao == "fornecedor_mais_recorrente":
+        top = cubo.top_fornecedores_qtd(1)
+        if top.empty:
+            return None
+        return f"O fornecedor que aparece mais vezes {mes} é {top.index[0]}, com {int(top.iloc[0])} notas fiscais."
+    if intencao == "fornecedor_maior_valor":
+        top = cubo.top_fornecedores_valor(1)
+        if top.empty:
+            return None
+        return f"O fornecedor com maior montante recebido {mes} é {top.index[0]}, com R$ {top.iloc[0]:,.2f}."
+    if intencao == "item_mais_vendido":
+        top = cubo.top_itens_quantidade(1)
+        if top.empty:
+            return None
+        return f"O item mais vendido em quantidade {mes} é {top.index[0]}, com {top.iloc[0]:,.0f} unidades."
+    return None
+
+
+def responder(pergunta, snapshot):
+    """
+    Resposta direta se a pergunta é uma das intenções conhecidas e os dados
+    estão carregados; None para seguir para o agente.
+    """
+    intencao = identificar(pergunta) if snapshot is not None and snapshot.cubo is not None else None
+    resposta = _responder(intencao, snapshot) if intencao else None
+    with _trava:
+        if resposta is None:
+            _estatisticas["encaminhadas"] += 1
+        else:
+            _estatisticas["respondidas"] += 1
+            _estatisticas["por_intencao"][intencao] = _estatisticas["por_intencao"].get(intencao, 0) + 1
+    return resposta
+
+
+def estatisticas():
+    """Perguntas respondidas direto, encaminhadas ao agente e contagem por intenção."""
+    with _trava:
+        return {**_estatisticas, "por_intencao": dict(_estatisticas["por_intencao"])}
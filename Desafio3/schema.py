@@ -0,0 +1,136 @@
+# schema.py
+"""
+Schema declarado dos CSVs de Notas Fiscais (cabeçalho e itens).
+
+Cada coluna recebe um tipo lógico:
+  - "chave":     identificadores (chave de acesso, CNPJ/CPF, IE). Lidos como texto
+                 para não perder zeros à esquerda e guardados como string Arrow.
+  - "texto":     texto livre de alta cardinalidade, guardado como string Arrow.
+  - "categoria": texto repetido (UF, modelo, natureza da operação...), guardado
+                 como categórico: um código inteiro por linha + dicionário único.
+  - "inteiro":   inteiro anulável de 32 bits.
+  - "inteiro64": inteiro anulável de 64 bits.
+  - "decimal":   float64.
+  - "data":      datetime64[ns].
+"""
+import pandas as pd
+
+# Incrementar sempre que o schema mudar, para invalidar os caches gravados em disco
+SCHEMA_VERSAO = 1
+
+# Colunas comuns às duas tabelas (os itens repetem os dados do cabeçalho)
+_COLUNAS_COMUNS = {
+    "CHAVE DE ACESSO": "chave",
+    "MODELO": "categoria",
+    "SÉRIE": "inteiro",
+    "NÚMERO": "inteiro64",
+    "NATUREZA DA OPERAÇÃO": "categoria",
+    "DATA EMISSÃO": "data",
+    "CPF/CNPJ Emitente": "chave",
+    "RAZÃO SOCIAL EMITENTE": "categoria",
+    "INSCRIÇÃO ESTADUAL EMITENTE": "chave",
+    "UF EMITENTE": "categoria",
+    "MUNICÍPIO EMITENTE": "categoria",
+    "CNPJ DESTINATÁRIO": "chave",
+    "NOME DESTINATÁRIO": "categoria",
+    "UF DESTINATÁRIO": "categoria",
+    "INDICADOR IE DESTINATÁRIO": "categoria",
+    "DESTINO DA OPERAÇÃO": "categoria",
+    "CONSUMIDOR FINAL": "categoria",
+    "PRESENÇA DO COMPRADOR": "categoria",
+}
+
+SCHEMA_CABECALHO = {
+    **_COLUNAS_COMUNS,
+    "EVENTO MAIS RECENTE": "categoria",
+    "DATA/HORA EVENTO MAIS RECENTE": "data",
+    "VALOR NOTA FISCAL": "decimal",
+}
+
+SCHEMA_ITENS = {
+    **_COLUNAS_COMUNS,
+    "NÚMERO PRODUTO": "inteiro",
+    "DESCRIÇÃO DO PRODUTO/SERVIÇO": "texto",
+    "CÓDIGO NCM/SH": "categoria",
+    "NCM/SH (TIPO DE PRODUTO)": "categoria",
+    "CFOP": "inteiro",
+    "QUANTIDADE": "decimal",
+    "UNIDADE": "categoria",
+    "VALOR UNITÁRIO": "decimal",
+    "VALOR TOTAL": "decimal",
+}
+
+# Tipos usados diretamente no pd.read_csv (o resto é convertido depois)
+_TIPOS_LEITURA = {
+    "chave": str,
+    "texto": str,
+    "categoria": "category",
+    "decimal": "float64",
+}
+
+
+def dtypes_leitura(schema):
+    """Monta o parâmetro `dtype` do pd.read_csv a partir do schema."""
+    return {col: _TIPOS_LEITURA[tipo] for col, tipo in schema.items() if tipo in _TIPOS_LEITURA}
+
+
+def aplicar_schema(df, schema):
+    """
+    Converte as colunas do DataFrame para os tipos declarados no schema.
+    Colunas que não estão no schema são mantidas como vieram.
+    """
+    for col, tipo in schema.items():
+        if col not in df.columns:
+            continue
+        serie = df[col]
+        if tipo in ("chave", "texto"):
+            df[col] = serie.astype("string[pyarrow]")
+        elif tipo == "categoria":
+            if not isinstance(serie.dtype, pd.CategoricalDtype):
+                df[col] = serie.astype("category")
+        elif tipo == "inteiro":
+            df[col] = pd.to_numeric(serie, errors="coerce").astype("Int32")
+        elif tipo == "inteiro64":
+            df[col] = pd.to_numeric(serie, errors="coerce").astype("Int64")
+        elif tipo == "decimal":
+            df[col] = pd.to_numeric(serie, errors="coerce").astype("float64")
+        elif tipo == "data":
+            df[col] = pd.to_datetime(serie, errors="coerce")
+        else:
+            raise ValueError(f"Tipo desconhecido no schema para a coluna '{col}': {tipo}")
+    return df
+
+
+def esquema_arrow(schema):
+    """
+    Schema Arrow fixo correspondente ao schema declarado. Usado ao gravar Parquet
+    em blocos, para que todos os arquivos tenham exatamente os mesmos tipos
+    (o pandas escolhe o tamanho dos códigos categóricos conforme cada bloco).
+    """
+    import pyarrow as pa
+
+    tipos = {
+        "chave": pa.string(),
+        "texto": pa.string(),
+        "categoria": pa.dictionary(pa.int32(), pa.string()),
+        "inteiro": pa.int32(),
+        "inteiro64": pa.int64(),
+        "decimal": pa.float64(),
+        "data": pa.timestamp("ns"),
+    }
+    return pa.schema([(col, tipos[tipo]) for col, tipo in schema.items()])
+
+
+def uso_memoria(df):
+    """
+    Retorna um DataFrame com o tipo e a memória (em bytes e MiB) de cada coluna,
+    ordenado da coluna mais pesada para a mais leve, com uma linha de TOTAL.
+    """
+    memoria = df.memory_usage(deep=True, index=False)
+    relatorio = pd.DataFrame({
+        "tipo": df.dtypes.astype(str),
+        "bytes": memoria,
+    }).sort_values("bytes", ascending=False)
+    relatorio.loc["TOTAL"] = ["", int(memoria.sum())]
+    relatorio["MiB"] = (relatorio["bytes"] / (1024 * 1024)).round(3)
+    return relatorio
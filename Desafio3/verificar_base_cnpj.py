@@ -0,0 +1,126 @@
+# verificar_base_cnpj.py
+"""
+Verificação da importação da base de CNPJs (base_cnpj.py) com arquivos
+sintéticos no layout da Receita, sem baixar nada: `python verificar_base_cnpj.py`.
+
+Gera, em uma pasta temporária, um arquivo de cada tipo (Empresas,
+Estabelecimentos dentro de um .zip, Simples, Sócios e as tabelas de códigos),
+com chaves repetidas, e importa em lotes pequenos (as repetições caem em lotes
+diferentes). Confere que:
+  - a importação termina e descarta as chaves repetidas, mantendo a última linha;
+  - `buscar_cnpj()` devolve um dicionário no formato do JSON do ReceitaWS, com
+    os códigos traduzidos (situação, porte, natureza, município, CNAE, qualificação);
+  - CNPJs fora da base devolvem None e `buscar_raiz()` traz matriz e filiais.
+Levanta AssertionError na primeira verificação que falhar.
+"""
+import os
+import tempfile
+import zipfile
+
+from base_cnpj import ENCODING_RECEITA, buscar_cnpj, buscar_raiz, importar_base
+
+# Campos do JSON do ReceitaWS lidos pelo investigador.py
+CAMPOS_RECEITAWS = {
+    "status", "cnpj", "nome", "fantasia", "situacao", "tipo", "porte", "natureza_juridica", "abertura",
+    "capital_social", "email", "telefone", "logradouro", "numero", "bairro", "municipio", "uf", "cep",
+    "atividade_principal", "atividades_secundarias", "qsa", "simples", "simei",
+}
+
+
+def _estabelecimento(basico, ordem, dv, matriz_filial, fantasia, situacao):
+    campos = [""] * 30
+    campos[:7] = [basico, ordem, dv, matriz_filial, fantasia, situacao, "20200115"]
+    campos[10:23] = ["20200110", "4711302", "5611201,4721102", "RUA", "DAS FLORES", "100", "SALA 1",
+                     "CENTRO", "01001000", "SP", "7107", "11", "33334444"]
+    campos[27] = "CONTATO@EMPRESA.COM.BR"
+    return campos
+
+
+def _gravar(pasta, nome, linhas):
+    """CSV no formato da Receita: sem cabeçalho, ';', aspas e latin-1."""
+    texto = "".join(";".join(f'"{valor}"' for valor in linha) + "\n" for linha in linhas)
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, "w", encoding=ENCODING_RECEITA, newline="") as arquivo:
+        arquivo.write(texto)
+    return caminho
+
+
+def _gerar_arquivos(pasta):
+    _gravar(pasta, "K3241.K03200Y0.D40113.EMPRECSV", [
+        ["11111111", "EMPRESA ANTIGA LTDA", "2062", "49", "1000,00", "01", ""],
+        ["22222222", "OUTRA EMPRESA SA", "2054", "10", "50000,00", "05", ""],
+        ["11111111", "EMPRESA NOVA LTDA", "2062", "49", "2000,00", "03", ""],  # repetida: vale esta
+    ])
+    # Estabelecimentos dentro de um .zip, como no download da Receita
+    estabelecimentos = _gravar(pasta, "K3241.K03200Y1.D40113.ESTABELE", [
+        _estabelecimento("11111111", "0001", "91", "1", "FANTASIA ANTIGA", "02"),
+        _estabelecimento("11111111", "0002", "72", "2", "FILIAL", "02"),
+        _estabelecimento("22222222", "0001", "06", "1", "", "08"),
+        _estabelecimento("11111111", "0001", "91", "1", "FANTASIA NOVA", "02"),  # repetido: vale este
+    ])
+    with zipfile.ZipFile(os.path.join(pasta, "Estabelecimentos0.zip"), "w") as arquivo_zip:
+        arquivo_zip.write(estabelecimentos, os.path.basename(estabelecimentos))
+    os.remove(estabelecimentos)
+    _gravar(pasta, "F.K03200$W.SIMPLES.CSV.D40113", [
+        ["11111111", "N", "00000000", "00000000", "N", "00000000", "00000000"],
+        ["11111111", "S", "20210101", "00000000", "S", "20210101", "00000000"],  # repetido: vale este
+    ])
+    _gravar(pasta, "K3241.K03200Y0.D40113.SOCIOCSV", [
+        ["11111111", "2", "FULANO DE TAL", "***123456**", "49", "20200110", "", "", "", "", ""],
+        ["11111111", "2", "BELTRANA DE TAL", "***654321**", "22", "20200110", "", "", "", "", ""],
+    ])
+    _gravar(pasta, "F.K03200$Z.D40113.MUNICCSV", [["7107", "SAO PAULO"]])
+    _gravar(pasta, "F.K03200$Z.D40113.NATJUCSV", [["2062", "Sociedade Empresária Limitada"]])
+    _gravar(pasta, "F.K03200$Z.D40113.CNAECSV", [
+        ["4711302", "Comércio varejista - antigo"],
+        ["5611201", "Restaurantes e similares"],
+        ["4711302", "Comércio varejista de mercadorias em geral"],  # repetido: vale este
+    ])
+    _gravar(pasta, "F.K03200$Z.D40113.QUALSCSV", [["49", "Sócio-Administrador"], ["22", "Sócio"]])
+
+
+def verificar():
+    with tempfile.TemporaryDirectory() as pasta:
+        origem = os.path.join(pasta, "dados_receita")
+        os.makedirs(origem)
+        _gerar_arquivos(origem)
+        destino = os.path.join(pasta, "receita_cnpj.sqlite")
+
+        contagem = importar_base(origem, destino, linhas_por_lote=2)
+        esperado = {"empresas": 2, "estabelecimentos": 3, "simples": 1, "socios": 2,
+                    "municipios": 1, "naturezas": 1, "cnaes": 2, "qualificacoes": 2}
+        assert contagem == esperado, contagem
+        assert not os.path.exists(f"{destino}.importando")
+        print("✔ Importação concluída com as chaves repetidas descartadas (mantida a última linha)")
+
+        dados = buscar_cnpj("11111111000191", destino)
+        assert dados is not None
+        faltando = CAMPOS_RECEITAWS - set(dados)
+        assert not faltando, f"campos ausentes: {faltando}"
+        esperado = {
+            "status": "OK", "cnpj": "11111111000191", "nome": "EMPRESA NOVA LTDA", "fantasia": "FANTASIA NOVA",
+            "situacao": "ATIVA", "tipo": "MATRIZ", "porte": "EMPRESA DE PEQUENO PORTE",
+            "natureza_juridica": "206-2 - Sociedade Empresária Limitada", "abertura": "10/01/2020",
+            "capital_social": "2000.00", "email": "contato@empresa.com.br", "telefone": "(11) 33334444",
+            "logradouro": "RUA DAS FLORES", "municipio": "SAO PAULO", "uf": "SP", "cep": "01.001-000",
+        }
+        diferentes = {campo: (dados[campo], valor) for campo, valor in esperado.items() if dados[campo] != valor}
+        assert not diferentes, diferentes
+        assert dados["atividade_principal"] == [
+            {"code": "47.11-3-02", "text": "Comércio varejista de mercadorias em geral"}], dados["atividade_principal"]
+        assert [a["code"] for a in dados["atividades_secundarias"]] == ["56.11-2-01", "47.21-1-02"]
+        assert {(s["nome"], s["qual"]) for s in dados["qsa"]} == {
+            ("FULANO DE TAL", "Sócio-Administrador"), ("BELTRANA DE TAL", "Sócio")}, dados["qsa"]
+        assert dados["simples"] == {"optante": True, "data_opcao": "2021-01-01", "data_exclusao": None}
+        assert dados["simei"]["optante"] is True
+        print("✔ buscar_cnpj devolve o registro no formato do ReceitaWS")
+
+        assert buscar_cnpj("22222222000106", destino)["situacao"] == "BAIXADA"
+        assert buscar_cnpj("99999999000199", destino) is None
+        assert buscar_cnpj("11111111000191", os.path.join(pasta, "nao_existe.sqlite")) is None
+        assert buscar_raiz("11.111.111", destino) == ["11111111000191", "11111111000272"]
+        print("✔ CNPJ fora da base devolve None e buscar_raiz traz matriz e filial")
+
+
+if __name__ == "__main__":
+    verificar()
@@ -0,0 +1,122 @@
+# verificar_investigador.py
+"""
+Verificação do cliente do ReceitaWS (investigador.py) contra um servidor local
+que imita a API, sem rede nem cota real: `python verificar_investigador.py`.
+
+O servidor (http.server em uma thread) responde 429 com `Retry-After` na
+primeira chamada de cada CNPJ e o JSON no formato do ReceitaWS na seguinte.
+Confere que:
+  - o 429 é repetido depois do `Retry-After` e a consulta termina com sucesso;
+  - CNPJs repetidos no lote são consultados uma vez;
+  - uma segunda rodada sai do cache SQLite, sem nenhuma chamada ao servidor;
+  - o intervalo entre chamadas respeita a cota do limitador (token bucket).
+Levanta AssertionError na primeira verificação que falhar.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REQ_POR_MINUTO = 600  # 10 chamadas por segundo: a verificação roda em poucos segundos
+RETRY_AFTER_SEGUNDOS = 0.3
+CNPJS = [f"{i:08d}000199" for i in range(1, 6)]
+
+
+class _ServidorReceitaWS(BaseHTTPRequestHandler):
+    """Imita GET /v1/cnpj/<cnpj>: 429 na primeira chamada de cada CNPJ, 200 nas seguintes."""
+
+    chamadas = []  # (instante, cnpj, status)
+    trava = threading.Lock()
+
+    def do_GET(self):
+        encontrado = re.fullmatch(r"/v1/cnpj/(\d{14})", self.path.split("?")[0])
+        if encontrado is None:
+            self._responder(404, {"status": "ERROR", "message": "Não encontrado"})
+            return
+        cnpj = encontrado.group(1)
+        with self.trava:
+            primeira = not any(c == cnpj for _, c, _ in self.chamadas)
+            self.chamadas.append((time.monotonic(), cnpj, 429 if primeira else 200))
+        if primeira:
+            self._responder(429, {"status": "ERROR", "message": "Too many requests"},
+                            {"Retry-After": str(RETRY_AFTER_SEGUNDOS)})
+        else:
+            self._responder(200, {
+                "status": "OK", "cnpj": cnpj, "nome": f"EMPRESA {cnpj}", "fantasia": "", "situacao": "ATIVA",
+                "tipo": "MATRIZ", "porte": "ME", "natureza_juridica": "206-2 - Sociedade Empresária Limitada",
+                "abertura": "01/01/2020", "capital_social": "1000.00", "email": "", "telefone": "",
+                "logradouro": "RUA A", "numero": "1", "bairro": "CENTRO", "municipio": "SAO PAULO", "uf": "SP",
+                "cep": "01000-000", "atividade_principal": [{"code": "47.11-3-02", "text": "Comércio varejista"}],
+                "atividades_secundarias": [], "qsa": [], "simples": {"optante": True}, "simei": {"optante": False},
+            })
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+def verificar():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _ServidorReceitaWS)
+    threading.Thread(target=servidor.serve_forever, name="receitaws-local", daemon=True).start()
+    with tempfile.TemporaryDirectory() as pasta:
+        # Configuração lida pelo investigador na importação: servidor local, cota curta,
+        # sem rajada e sem base local de CNPJs
+        os.environ["RECEITAWS_URL"] = f"http://127.0.0.1:{servidor.server_address[1]}/v1"
+        os.environ["RECEITAWS_REQ_POR_MINUTO"] = str(REQ_POR_MINUTO)
+        os.environ["RECEITAWS_RAJADA"] = "1"
+        os.environ["RECEITA_CNPJ_BASE"] = os.path.join(pasta, "sem_base.sqlite")
+        import investigador
+
+        investigador.CAMINHO_CACHE_CNPJ = os.path.join(pasta, "cnpj.sqlite")
+        chamadas = _ServidorReceitaWS.chamadas
+
+        try:
+            resultados = investigador.consultar_cnpjs(CNPJS + CNPJS[:2])
+            assert set(resultados) == set(CNPJS), resultados.keys()
+            for cnpj, dados in resultados.items():
+                assert "erro" not in dados, f"{cnpj}: {dados}"
+                assert dados["Razão Social"] == f"EMPRESA {cnpj}", dados
+            print(f"✔ {len(CNPJS)} CNPJs consultados (repetidos no lote consultados uma vez)")
+
+            # 429: uma chamada limitada e uma repetição por CNPJ, depois do Retry-After
+            assert len(chamadas) == 2 * len(CNPJS), chamadas
+            for cnpj in CNPJS:
+                (t_429, _, s_429), (t_ok, _, s_ok) = [c for c in chamadas if c[1] == cnpj]
+                assert (s_429, s_ok) == (429, 200), (cnpj, s_429, s_ok)
+                assert t_ok - t_429 >= RETRY_AFTER_SEGUNDOS * 0.95, f"{cnpj}: repetiu {t_ok - t_429:.3f}s após o 429"
+            estatisticas = investigador.estatisticas_cnpj()
+            assert estatisticas["limitadas_429"] == len(CNPJS) and estatisticas["api"] == 2 * len(CNPJS), estatisticas
+            print(f"✔ 429 repetido após o Retry-After ({RETRY_AFTER_SEGUNDOS}s) para cada CNPJ")
+
+            # Cota: com rajada 1, duas chamadas nunca ficam mais próximas que 1/taxa
+            instantes = sorted(t for t, _, _ in chamadas)
+            menor = min(b - a for a, b in zip(instantes, instantes[1:]))
+            assert menor >= 60 / REQ_POR_MINUTO * 0.9, f"chamadas a {menor:.3f}s uma da outra"
+            print(f"✔ Cota respeitada: menor intervalo entre chamadas {menor:.3f}s (mínimo {60 / REQ_POR_MINUTO:.3f}s)")
+
+            # Cache: a segunda rodada não chega ao servidor
+            feitas = len(chamadas)
+            segunda = investigador.consultar_cnpjs(CNPJS)
+            assert len(chamadas) == feitas, f"{len(chamadas) - feitas} chamadas com os CNPJs em cache"
+            assert segunda == resultados
+            assert investigador.estatisticas_cnpj()["cache"] == len(CNPJS), investigador.estatisticas_cnpj()
+            print("✔ Segunda rodada respondida pelo cache SQLite, sem chamar a API")
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+
+if __name__ == "__main__":
+    verificar()
@@ -0,0 +1,46 @@
+# verificar_roteador.py
+"""
+Verificação das intenções do roteador (roteador_intencoes.py), sem dados nem
+LLM: `python verificar_roteador.py`.
+
+Confere que as perguntas comuns são reconhecidas e que perguntas parecidas,
+mas com outro sentido ou um filtro a mais, seguem para o agente (intenção None).
+Levanta AssertionError na primeira pergunta classificada errado.
+"""
+from roteador_intencoes import identificar
+
+# pergunta -> intenção esperada
+RECONHECIDAS = {
+    "Qual o valor total das notas fiscais?": "valor_total",
+    "Quantas notas fiscais emitidas?": "total_nfs",
+    "Qual o valor médio das NFs?": "valor_medio",
+    "Qual a nota mais cara?": "valor_max",
+    "Qual fornecedor aparece mais vezes?": "fornecedor_mais_recorrente",
+    "Qual fornecedor teve o maior montante recebido?": "fornecedor_maior_valor",
+    "Qual o item mais vendido?": "item_mais_vendido",
+    "Qual o produto mais vendido em quantidade?": "item_mais_vendido",
+}
+
+# Perguntas que o roteador NÃO pode responder sozinho
+ENCAMINHADAS = [
+    "Qual o item vendido?",  # sem "mais": não é o item mais vendido
+    "Qual o produto vendido em SP?",
+    "Qual o item menos vendido?",
+    "Qual o item mais vendido em janeiro?",
+    "Qual o valor total das notas de SP?",
+    "Qual fornecedor teve o menor montante?",
+    "Qual a nota mais barata?",
+]
+
+
+def verificar():
+    for pergunta, intencao in RECONHECIDAS.items():
+        assert identificar(pergunta) == intencao, f"{pergunta!r}: {identificar(pergunta)} (esperado {intencao})"
+    print(f"✔ {len(RECONHECIDAS)} perguntas comuns reconhecidas")
+    for pergunta in ENCAMINHADAS:
+        assert identificar(pergunta) is None, f"{pergunta!r} foi reconhecida como {identificar(pergunta)}"
+    print(f"✔ {len(ENCAMINHADAS)} perguntas parecidas encaminhadas ao agente")
+
+
+if __name__ == "__main__":
+    verificar()
@@ -101,20 +101,19 @@ def calcular_beneficios(df: pd.DataFrame, valores_va: dict) -> pd.DataFrame:
     df['DIAS A RECEBER'].fillna(0, inplace=True)
     df['VALOR DIÁRIO VR'].fillna(0, inplace=True)
 
-    # Aplica a regra de elegibilidade final
-    df.loc[df['DIAS A RECEBER'] <= 0, 'elegivel_beneficio'] = 'Não'
-
-    # Filtra os colaboradores que não são elegíveis, resultando na base para o cálculo final
+    # Filtra os colaboradores que não são elegíveis, resultando na base para o cálculo final.
+    # A elegibilidade (inclusive DIAS A RECEBER <= 0) e o rateio empresa/profissional
+    # vêm das regras avaliadas na consolidação (regras_beneficios.yaml)
     df_calculo = df[df['elegivel_beneficio'] == 'Sim'].copy()
 
     # Realiza os cálculos
     df_calculo['TOTAL VR'] = df_calculo['DIAS A RECEBER'] * df_calculo['VALOR DIÁRIO VR']
-    df_calculo['Custo empresa VR'] = df_calculo['TOTAL VR'] * 0.8
-    df_calculo['Desconto profissional VR'] = df_calculo['TOTAL VR'] * 0.2
+    df_calculo['Custo empresa VR'] = df_calculo['TOTAL VR'] * df_calculo['PERCENTUAL EMPRESA']
+    df_calculo['Desconto profissional VR'] = df_calculo['TOTAL VR'] * df_calculo['PERCENTUAL PROFISSIONAL']
 
     df_calculo['TOTAL VA'] = df_calculo['DIAS A RECEBER'] * df_calculo['VALOR DIÁRIO VA']
-    df_calculo['Custo empresa VA'] = df_calculo['TOTAL VA'] * 0.8
-    df_calculo['Desconto profissional VA'] = df_calculo['TOTAL VA'] * 0.2
+    df_calculo['Custo empresa VA'] = df_calculo['TOTAL VA'] * df_calculo['PERCENTUAL EMPRESA']
+    df_calculo['Desconto profissional VA'] = df_calculo['TOTAL VA'] * df_calculo['PERCENTUAL PROFISSIONAL']
     
     # Cria a coluna de observações
     df_calculo['OBS GERAL'] = ''
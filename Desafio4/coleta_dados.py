@@ -4,10 +4,33 @@ from langchain.agents import initialize_agent
 from langchain_google_genai import GoogleGenerativeAI
 import pandas as pd
 import os
+import sys
+from contextlib import nullcontext
 from datetime import datetime
 
+from leitura_xlsx import arquivos_faltando, ler_fontes_xlsx
+from medicao import iniciar_medicao, imprimir_etapas, medir_etapa
+from motor_regras import PlanoRegras, avaliar_regras, carregar_regras
+
 #Consolidação dos Dados dos Colaboradores
 
+DIRETORIO_DADOS = 'dados'
+# Arquivos .csv exportados das planilhas (formato='csv'); as planilhas estão em leitura_xlsx.PLANILHAS
+ARQUIVOS_ENTRADA = [
+    '1.ativos.csv', 
+    '2.ferias.csv', 
+    '3.desligados.csv', 
+    '4.admissao_abril.csv', 
+    '5.base_sindicato_x_valor.csv', 
+    '6.dias_uteis.csv',
+    'afastamentos.csv',
+    'aprendiz.csv',
+    'estagio.csv'
+]
+CAMINHO_BASE = os.path.join('saida', 'base_consolidada.csv')
+# Fontes com uma linha por colaborador (as demais são tabelas por sindicato)
+FONTES_POR_MATRICULA = ['ativos', 'ferias', 'desligados', 'admissao', 'afastamentos', 'aprendiz', 'estagio']
+
 # Define o LLM que o agente irá usar
 # Substitua pela sua chave de API
 llm = GoogleGenerativeAI(model="gemini-2.5-flash", api_key="put-your-api-key-here")
@@ -42,10 +65,33 @@ agent = initialize_agent(
     verbose=False
 )
 
+def indexar_por_matricula(df: pd.DataFrame, colunas: list, nome: str) -> pd.DataFrame:
+    """
+    Indexa uma fonte por matrícula, só com as colunas usadas na base.
+    
+    Args:
+        df (pd.DataFrame): A fonte, com a coluna 'matricula'.
+        colunas (list): As colunas que vão para a base.
+        nome (str): Nome da fonte (para o aviso de matrículas repetidas).
+
+    Returns:
+        pd.DataFrame: Uma linha por matrícula (a primeira, se houver repetidas).
+    """
+    indexado = df.set_index('matricula')[colunas]
+    repetidas = indexado.index.duplicated()
+    if repetidas.any():
+        print(f"Aviso: {int(repetidas.sum())} matrícula(s) repetida(s) em '{nome}'; mantida a primeira ocorrência.")
+        indexado = indexado[~repetidas]
+    return indexado
+
 def unificar_dados(dataframes: list) -> pd.DataFrame:
     """
     Função utilitária para unificar uma lista de DataFrames com base na matrícula.
     
+    Equivale a merges 'left' em sequência sobre o primeiro DataFrame, mas cada
+    fonte é indexada por matrícula uma vez e todas são alinhadas à base de uma
+    só vez, sem uma cópia da base por merge.
+    
     Args:
         dataframes (list): Uma lista de DataFrames do pandas.
 
@@ -54,218 +100,287 @@ def unificar_dados(dataframes: list) -> pd.DataFrame:
     """
     # Inicia com o primeiro DataFrame como base
     base_consolidada = dataframes[0]
+    matriculas = base_consolidada['matricula']
     
-    # Faz um merge com os demais DataFrames
-    for df in dataframes[1:]:
-        # O 'how' left garante que não perdemos nenhum colaborador da base principal
-        base_consolidada = pd.merge(base_consolidada, df, on='matricula', how='left')
+    # O reindex pela matrícula da base garante que não perdemos nenhum colaborador da base principal
+    alinhadas = [base_consolidada.reset_index(drop=True)]
+    for posicao, df in enumerate(dataframes[1:], start=2):
+        colunas = [col for col in df.columns if col != 'matricula']
+        fonte = indexar_por_matricula(df, colunas, f"DataFrame {posicao}")
+        alinhadas.append(fonte.reindex(matriculas).reset_index(drop=True))
     
-    return base_consolidada
+    repetidas = pd.Index([col for df in alinhadas for col in df.columns]).duplicated()
+    if repetidas.any():
+        colunas = pd.Index([col for df in alinhadas for col in df.columns])[repetidas]
+        raise ValueError(f"Colunas presentes em mais de um DataFrame: {', '.join(map(str, colunas))}")
+    
+    return pd.concat(alinhadas, axis=1)
 
-def validar_e_corrigir_dados(df: pd.DataFrame) -> pd.DataFrame:
+def avaliar_base(df: pd.DataFrame, plano: PlanoRegras = None) -> pd.DataFrame:
     """
-    Aplica as validações e correções necessárias na base de dados consolidada.
+    Converte as datas e avalia as regras de regras_beneficios.yaml sobre todas as linhas.
     
     Args:
         df (pd.DataFrame): O DataFrame consolidado.
-        
+        plano (PlanoRegras): Regras já compiladas; por padrão, as de regras_beneficios.yaml.
+
     Returns:
-        pd.DataFrame: O DataFrame validado e corrigido.
+        pd.DataFrame: Todas as linhas, inclusive as excluídas (com o MOTIVO EXCLUSÃO).
     """
-    print("Iniciando a fase de validação e correção de dados...")
+    plano = plano if plano is not None else carregar_regras()
     
-    # Fase 1: Exclusão de colaboradores inelegíveis
-    # A base deve ter apenas colaboradores elegíveis ao benefício
-    df_filtrado = df[df['elegivel_beneficio'] == 'Sim'].copy()
-
-    # Exclui os colaboradores que estão em licença maternidade, afastados em geral, etc.
-    df_filtrado = df_filtrado[df_filtrado['DESC. SITUACAO_principal'] != 'Licença Maternidade']
+    # Fase 1: Tratamento de datas
+    # Converte colunas de data para o tipo datetime
+    df = df.assign(**{
+        'Admissão': pd.to_datetime(df['Admissão'], format='%m/%d/%Y', errors='coerce'),
+        'DATA DEMISSÃO': pd.to_datetime(df['DATA DEMISSÃO'], format='%m/%d/%Y', errors='coerce'),
+    })
     
-    print(f"✔ {len(df) - len(df_filtrado)} colaboradores inelegíveis excluídos (Diretores, Estagiários, Aprendizes, Afastados).")
+    # Fase 2: Avaliação das regras (exclusões, ajustes de dias e rateio) em uma passada
+    return avaliar_regras(df, plano)
+
+def selecionar_elegiveis(df_avaliado: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mantém só os colaboradores elegíveis, sem as colunas auxiliares das regras.
     
-    # Fase 2: Tratamento de datas e desligamentos
-    # Converte colunas de data para o tipo datetime
-    df_filtrado['Admissão'] = pd.to_datetime(df_filtrado['Admissão'], format='%m/%d/%Y', errors='coerce')
-    df_filtrado['DATA DEMISSÃO'] = pd.to_datetime(df_filtrado['DATA DEMISSÃO'], format='%m/%d/%Y', errors='coerce')
+    Args:
+        df_avaliado (pd.DataFrame): O resultado de avaliar_base().
+
+    Returns:
+        pd.DataFrame: A base de cálculo dos benefícios.
+    """
+    motivos = df_avaliado['MOTIVO EXCLUSÃO']
+    print(f"✔ {int((motivos != '').sum())} colaboradores excluídos do benefício:")
+    for motivo, quantidade in motivos[motivos != ''].value_counts().items():
+        print(f"  - {motivo}: {quantidade}")
     
-    # Aplica a regra de desligamento (comunicado até o dia 15 exclui do pagamento)
-    # Apenas para colaboradores com DATA DEMISSÃO válida e COMUNICADO DE DESLIGAMENTO 'OK'
-    def deve_receber_beneficio(row):
-        if pd.notna(row['DATA DEMISSÃO']) and row['COMUNICADO DE DESLIGAMENTO'] == 'OK':
-            if row['DATA DEMISSÃO'].day <= 15:
-                return False
-        return True
-
-    df_filtrado['deve_receber_beneficio'] = df_filtrado.apply(deve_receber_beneficio, axis=1)
-    df_filtrado = df_filtrado[df_filtrado['deve_receber_beneficio'] == True]
+    # A base deve ter apenas colaboradores elegíveis ao benefício
+    return df_avaliado[df_avaliado['elegivel_beneficio'] == 'Sim'].drop(
+        columns=['MOTIVO EXCLUSÃO', 'aprendiz', 'estagio'], errors='ignore'
+    )
+
+def validar_e_corrigir_dados(df: pd.DataFrame, plano: PlanoRegras = None) -> pd.DataFrame:
+    """
+    Aplica as validações e correções necessárias na base de dados consolidada.
     
-    print("✔ Regras de desligamento aplicadas.")
+    As regras de exclusão, de dias a receber e o rateio ficam em
+    `regras_beneficios.yaml` e são avaliadas todas de uma vez pelo motor de
+    regras (motor_regras.py), sem funções Python linha a linha. As regras de
+    dias aplicadas a cada colaborador ficam registradas na coluna
+    `REGRAS APLICADAS`.
     
-    # Fase 3: Ajuste de dias úteis com base nas condições de férias/admissão
-    df_filtrado['DIAS A RECEBER'] = df_filtrado['dias_uteis']
+    Args:
+        df (pd.DataFrame): O DataFrame consolidado.
+        plano (PlanoRegras): Regras já compiladas; por padrão, as de regras_beneficios.yaml.
+        
+    Returns:
+        pd.DataFrame: O DataFrame validado e corrigido.
+    """
+    print("Iniciando a fase de validação e correção de dados...")
+    df_filtrado = selecionar_elegiveis(avaliar_base(df, plano))
+    print("✔ Cálculo de dias úteis ajustado para admissões, desligamentos e férias.")
+    return df_filtrado
+
+def gravar_base(dados_finais: pd.DataFrame, output_path: str = CAMINHO_BASE):
+    """Grava a base consolidada em CSV (separador ';'), criando o diretório de saída se preciso."""
+    output_directory = os.path.dirname(output_path)
     
-    # Ajusta para admissões no meio do mês
-    df_filtrado.loc[df_filtrado['Admissão'].notna(), 'DIAS A RECEBER'] = df_filtrado.apply(
-        lambda row: row['dias_uteis'] - row['Admissão'].day + 1 if row['Admissão'].day > 1 else row['dias_uteis'], axis=1
-    )
+    # Verifica se o diretório de saída existe, senão o cria
+    if output_directory and not os.path.exists(output_directory):
+        os.makedirs(output_directory)
     
-    # Ajusta para desligamentos depois do dia 15
-    df_filtrado.loc[(df_filtrado['DATA DEMISSÃO'].notna()) & (df_filtrado['DATA DEMISSÃO'].dt.day > 15), 'DIAS A RECEBER'] = df_filtrado.apply(
-        lambda row: row['DATA DEMISSÃO'].day if row['DATA DEMISSÃO'].day > 15 else row['DIAS A RECEBER'], axis=1
-    )
+    # Salva o DataFrame em um arquivo CSV
+    dados_finais.to_csv(output_path, index=False, sep=';')
+
+def extrair_estado(sindicato_nome):
+    """Estado do sindicato a partir do nome (None se não reconhecido)."""
+    if "SÃO PAULO" in str(sindicato_nome).upper():
+        return "São Paulo"
+    elif "RIO GRANDE DO SUL" in str(sindicato_nome).upper():
+        return "Rio Grande do Sul"
+    elif "PARANÁ" in str(sindicato_nome).upper():
+        return "Paraná"
+    elif "RIO DE JANEIRO" in str(sindicato_nome).upper():
+        return "Rio de Janeiro"
+    return None
+
+def ler_fontes(directory_path: str = DIRETORIO_DADOS, formato: str = 'xlsx') -> dict:
+    """
+    Lê os arquivos de entrada.
     
-    # Lógica de férias: se a quantidade for menor que 30, subtrai do total de dias a receber. Se for 30 ou mais, o valor é zero.
-    df_filtrado.loc[(df_filtrado['DIAS DE FÉRIAS'].notna()) & (df_filtrado['DIAS DE FÉRIAS'] < 30), 'DIAS A RECEBER'] = df_filtrado.apply(
-        lambda row: row['DIAS A RECEBER'] - row['DIAS DE FÉRIAS'], axis=1
-    )
-    df_filtrado.loc[(df_filtrado['DIAS DE FÉRIAS'].notna()) & (df_filtrado['DIAS DE FÉRIAS'] >= 30), 'DIAS A RECEBER'] = 0
+    Args:
+        directory_path (str): O diretório com os arquivos de entrada.
+        formato (str): 'xlsx' lê as planilhas originais (leitura_xlsx.py, em paralelo e
+            com cache); 'csv' lê os arquivos exportados de `ARQUIVOS_ENTRADA`.
+
+    Returns:
+        dict: Nome da fonte -> DataFrame, como lido do arquivo.
+    """
+    if formato == 'xlsx':
+        return ler_fontes_xlsx(directory_path)
+    return {
+        'ativos': pd.read_csv(os.path.join(directory_path, '1.ativos.csv'), sep=';'),
+        'ferias': pd.read_csv(os.path.join(directory_path, '2.ferias.csv'), sep=';'),
+        'desligados': pd.read_csv(os.path.join(directory_path, '3.desligados.csv'), sep=';'),
+        'admissao': pd.read_csv(os.path.join(directory_path, '4.admissao_abril.csv'), sep=';'),
+        'sindicato_valor': pd.read_csv(os.path.join(directory_path, '5.base_sindicato_x_valor.csv'), sep=','),
+        'dias_uteis': pd.read_csv(os.path.join(directory_path, '6.dias_uteis.csv'), sep=';', header=1),
+        'afastamentos': pd.read_csv(os.path.join(directory_path, 'afastamentos.csv'), sep=';'),
+        'aprendiz': pd.read_csv(os.path.join(directory_path, 'aprendiz.csv'), sep=';'),
+        'estagio': pd.read_csv(os.path.join(directory_path, 'estagio.csv'), sep=';'),
+    }
+
+def padronizar_fontes(fontes: dict) -> dict:
+    """
+    Padroniza nomes de coluna e o tipo da matrícula das fontes (altera os DataFrames recebidos).
     
-    print("✔ Cálculo de dias úteis ajustado para admissões, desligamentos e férias.")
+    Args:
+        fontes (dict): As fontes lidas por ler_fontes().
 
-    return df_filtrado
+    Returns:
+        dict: As mesmas fontes, padronizadas.
+    """
+    for nome in FONTES_POR_MATRICULA:
+        df = fontes[nome]
+        df.columns = [col.strip() for col in df.columns]
+        # Renomeia as colunas de matrícula para 'matricula'
+        df.rename(columns={"MATRICULA": "matricula", "Sindicato": "sindicato"}, inplace=True)
+        # Padroniza tipo da coluna matricula para string para facilitar a junção
+        df["matricula"] = df["matricula"].astype(str).str.strip()
+
+    # Renomeia e padroniza colunas dos arquivos de sindicato/dias úteis
+    sindicato_valor, dias_uteis = fontes['sindicato_valor'], fontes['dias_uteis']
+    sindicato_valor.rename(columns={sindicato_valor.columns[0]: "estado", sindicato_valor.columns[1]: "valor_sindicato"}, inplace=True)
+    dias_uteis.rename(columns={dias_uteis.columns[0]: "sindicato_dias", dias_uteis.columns[1]: "dias_uteis"}, inplace=True)
+    return fontes
 
-def coletar_e_unificar_dados():
+def consolidar_fontes(fontes: dict, etapas: list = None) -> pd.DataFrame:
     """
-    Orquestra a coleta de todos os arquivos CSV e a unificação dos dados.
+    Monta a base consolidada (uma linha por matrícula) a partir das fontes padronizadas.
+    
+    Cada fonte é indexada por matrícula uma única vez e a base é montada em uma
+    passada, com as fontes alinhadas pelo índice (pd.concat), em vez de um
+    merge (e uma cópia da base inteira) por fonte. Os valores por sindicato são
+    buscados com `map`, sem juntar tabelas.
+    
+    Args:
+        fontes (dict): As fontes de padronizar_fontes().
+        etapas (list): Se informada, recebe o tempo e a memória de cada etapa (medicao.py).
+
+    Returns:
+        pd.DataFrame: A base consolidada, antes da validação.
+    """
+    # Fase 1: Indexação de cada fonte por matrícula
+    with medir_etapa('indexacao', etapas):
+        ativos = fontes['ativos']
+        indexadas = [
+            indexar_por_matricula(ativos, [col for col in ativos.columns if col != 'matricula'], 'ativos')
+                .rename(columns={'DESC. SITUACAO': 'DESC. SITUACAO_principal'}),
+            indexar_por_matricula(fontes['ferias'], ["DIAS DE FÉRIAS"], 'ferias'),
+            indexar_por_matricula(fontes['desligados'], ["DATA DEMISSÃO", "COMUNICADO DE DESLIGAMENTO"], 'desligados'),
+            indexar_por_matricula(fontes['admissao'], ["Admissão", "cargo_admissao"], 'admissao'),
+        ]
+        afastamentos = indexar_por_matricula(fontes['afastamentos'], ["DESC. SITUACAO"], 'afastamentos') \
+            .rename(columns={'DESC. SITUACAO': 'DESC. SITUACAO_afastamento'})
+
+    # Fase 2: Junção em uma passada
+    with medir_etapa('juncao', etapas):
+        # Todas as matrículas de ativos, férias, desligados e admissões (como no outer join),
+        # ordenadas uma única vez
+        matriculas = indexadas[0].index.append([fonte.index for fonte in indexadas[1:]]).unique().sort_values()
+        # Afastamentos só acrescentam informação às matrículas já presentes (como no left join)
+        base = pd.concat(
+            [pd.Series(matriculas, index=matriculas, name='matricula')]
+            + [fonte.reindex(matriculas) for fonte in indexadas + [afastamentos]],
+            axis=1,
+        )
+        base.index = pd.RangeIndex(len(base))
+
+        # Flags de aprendizes e estagiários (a elegibilidade é decidida pelas regras na validação)
+        base['aprendiz'] = base['matricula'].isin(fontes['aprendiz']['matricula'])
+        base['estagio'] = base['matricula'].isin(fontes['estagio']['matricula'])
+
+    # Fase 3: Integração do valor do sindicato e dos dias úteis
+    with medir_etapa('sindicato', etapas):
+        # O estado é extraído uma vez por sindicato distinto
+        estados = {nome: extrair_estado(nome) for nome in base['sindicato'].dropna().unique()}
+        base['estado_sindicato'] = base['sindicato'].map(estados)
+        valor_por_estado = fontes['sindicato_valor'].drop_duplicates('estado').set_index('estado')['valor_sindicato']
+        base['valor_sindicato'] = base['estado_sindicato'].map(valor_por_estado)
+        dias_por_sindicato = fontes['dias_uteis'].drop_duplicates('sindicato_dias').set_index('sindicato_dias')['dias_uteis']
+        base['dias_uteis'] = base['sindicato'].map(dias_por_sindicato)
+
+    return base
+
+def verificar_entradas(directory_path: str = DIRETORIO_DADOS, formato: str = 'xlsx') -> bool:
     """
-    directory_path = 'dados'
+    Confere se o diretório e todos os arquivos de entrada existem, exibindo o erro se não.
     
-    files_to_process = [
-        '1.ativos.csv', 
-        '2.ferias.csv', 
-        '3.desligados.csv', 
-        '4.admissao_abril.csv', 
-        '5.base_sindicato_x_valor.csv', 
-        '6.dias_uteis.csv',
-        'afastamentos.csv',
-        'aprendiz.csv',
-        'estagio.csv'
-    ]
+    Args:
+        directory_path (str): O diretório com os arquivos de entrada.
+        formato (str): 'xlsx' (planilhas originais) ou 'csv' (arquivos exportados).
 
+    Returns:
+        bool: True se a coleta pode começar.
+    """
     # Verifica se o diretório de dados existe
     if not os.path.exists(directory_path):
         print(f"Erro: O diretório '{directory_path}' não foi encontrado.")
-        return
+        return False
     
     # Verifica se todos os arquivos necessários estão no diretório
-    for filename in files_to_process:
-        file_path = os.path.join(directory_path, filename)
-        if not os.path.exists(file_path):
-            print(f"Erro: Arquivo '{filename}' não encontrado em '{directory_path}'.")
-            return
-    
-    print(f"Iniciando a leitura dos arquivos no diretório '{directory_path}'...")
+    if formato == 'xlsx':
+        faltando = arquivos_faltando(directory_path)
+    else:
+        faltando = [f for f in ARQUIVOS_ENTRADA if not os.path.exists(os.path.join(directory_path, f))]
+    for filename in faltando:
+        print(f"Erro: Arquivo '{filename}' não encontrado em '{directory_path}'.")
+        return False
+    return True
+
+def coletar_e_unificar_dados(medir_memoria: bool = True, formato: str = 'xlsx'):
+    """
+    Orquestra a coleta de todos os arquivos de entrada e a unificação dos dados.
     
-    # Fase 1: Leitura dos arquivos
-    ativos = pd.read_csv(os.path.join(directory_path, '1.ativos.csv'), sep=';')
-    ferias = pd.read_csv(os.path.join(directory_path, '2.ferias.csv'), sep=';')
-    desligados = pd.read_csv(os.path.join(directory_path, '3.desligados.csv'), sep=';')
-    admissao = pd.read_csv(os.path.join(directory_path, '4.admissao_abril.csv'), sep=';')
-    sindicato_valor = pd.read_csv(os.path.join(directory_path, '5.base_sindicato_x_valor.csv'), sep=',')
-    dias_uteis = pd.read_csv(os.path.join(directory_path, '6.dias_uteis.csv'), sep=';', header=1)
-    afastamentos = pd.read_csv(os.path.join(directory_path, 'afastamentos.csv'), sep=';')
-    aprendiz = pd.read_csv(os.path.join(directory_path, 'aprendiz.csv'), sep=';')
-    estagio = pd.read_csv(os.path.join(directory_path, 'estagio.csv'), sep=';')
+    Ao fim, exibe o tempo e o pico de memória de cada etapa.
     
-    print("✔ Todos os arquivos lidos com sucesso.")
-
-    # Fase 2: Padronização dos nomes de coluna e tipos de dados
-    ativos.columns = [col.strip() for col in ativos.columns]
-    ferias.columns = [col.strip() for col in ferias.columns]
-    desligados.columns = [col.strip() for col in desligados.columns]
-    admissao.columns = [col.strip() for col in admissao.columns]
-    afastamentos.columns = [col.strip() for col in afastamentos.columns]
-    aprendiz.columns = [col.strip() for col in aprendiz.columns]
-    estagio.columns = [col.strip() for col in estagio.columns]
-
-    # Renomeia as colunas de matrícula para 'matricula'
-    ativos.rename(columns={"MATRICULA": "matricula", "Sindicato": "sindicato"}, inplace=True)
-    ferias.rename(columns={"MATRICULA": "matricula"}, inplace=True)
-    desligados.rename(columns={"MATRICULA": "matricula"}, inplace=True)
-    admissao.rename(columns={"MATRICULA": "matricula"}, inplace=True)
-    afastamentos.rename(columns={"MATRICULA": "matricula"}, inplace=True)
-    aprendiz.rename(columns={"MATRICULA": "matricula"}, inplace=True)
-    estagio.rename(columns={"MATRICULA": "matricula"}, inplace=True)
-
-    # Padroniza tipo da coluna matricula para string para facilitar o merge
-    ativos["matricula"] = ativos["matricula"].astype(str).str.strip()
-    ferias["matricula"] = ferias["matricula"].astype(str).str.strip()
-    desligados["matricula"] = desligados["matricula"].astype(str).str.strip()
-    admissao["matricula"] = admissao["matricula"].astype(str).str.strip()
-    afastamentos["matricula"] = afastamentos["matricula"].astype(str).str.strip()
-    aprendiz["matricula"] = aprendiz["matricula"].astype(str).str.strip()
-    estagio["matricula"] = estagio["matricula"].astype(str).str.strip()
+    Args:
+        medir_memoria (bool): Mede também a memória de cada etapa (tracemalloc, deixa a execução um pouco mais lenta).
+        formato (str): 'xlsx' (planilhas originais) ou 'csv' (arquivos exportados).
+    """
+    directory_path = DIRETORIO_DADOS
+
+    if not verificar_entradas(directory_path, formato):
+        return
     
-    # Renomeia e padroniza colunas dos arquivos de sindicato/dias úteis
-    sindicato_valor.rename(columns={sindicato_valor.columns[0]: "estado", sindicato_valor.columns[1]: "valor_sindicato"}, inplace=True)
-    dias_uteis.rename(columns={dias_uteis.columns[0]: "sindicato_dias", dias_uteis.columns[1]: "dias_uteis"}, inplace=True)
+    etapas = []
+    with iniciar_medicao() if medir_memoria else nullcontext():
+        print(f"Iniciando a leitura dos arquivos no diretório '{directory_path}'...")
+        
+        # Fase 1: Leitura dos arquivos
+        with medir_etapa('leitura', etapas):
+            fontes = ler_fontes(directory_path, formato)
+        print("✔ Todos os arquivos lidos com sucesso.")
 
-    # Fase 3: Merge dos DataFrames principais (outer join para garantir todas as matrículas)
-    df_merged = pd.merge(ativos, ferias[["matricula", "DIAS DE FÉRIAS"]], on="matricula", how="outer")
-    df_merged = pd.merge(df_merged, desligados[["matricula", "DATA DEMISSÃO", "COMUNICADO DE DESLIGAMENTO"]], on="matricula", how="outer")
-    df_merged = pd.merge(df_merged, admissao[["matricula", "Admissão", "cargo_admissao"]], on="matricula", how="outer")
+        # Fase 2: Padronização dos nomes de coluna e tipos de dados
+        with medir_etapa('padronizacao', etapas):
+            padronizar_fontes(fontes)
 
-    # Fase 4: Integração de exclusões e marcação de elegibilidade
-    # Inicialmente, todos são considerados elegíveis
-    df_merged['elegivel_beneficio'] = 'Sim'
-    
-    # Adiciona a informação de afastamentos e atualiza a elegibilidade
-    df_merged = pd.merge(df_merged, afastamentos[["matricula", "DESC. SITUACAO"]], on="matricula", how="left", suffixes=('_principal', '_afastamento'))
-    df_merged.loc[df_merged['DESC. SITUACAO_afastamento'].notna(), 'elegivel_beneficio'] = 'Não'
-
-    # Cria uma flag para aprendizes e estagiários para evitar o KeyError
-    aprendiz['is_aprendiz'] = 'Não'
-    estagio['is_estagio'] = 'Não'
-
-    # Adiciona a informação de aprendizes e estagiários
-    df_merged = pd.merge(df_merged, aprendiz[["matricula", "is_aprendiz"]], on="matricula", how="left")
-    df_merged.loc[df_merged['is_aprendiz'] == 'Não', 'elegivel_beneficio'] = 'Não'
-
-    df_merged = pd.merge(df_merged, estagio[["matricula", "is_estagio"]], on="matricula", how="left")
-    df_merged.loc[df_merged['is_estagio'] == 'Não', 'elegivel_beneficio'] = 'Não'
-
-    # Remove colunas auxiliares
-    df_merged.drop(columns=['is_aprendiz', 'is_estagio'], inplace=True)
-
-    # Fase 5: Integração do valor do sindicato
-    # Extrai o estado do sindicato do colaborador
-    def extrair_estado(sindicato_nome):
-        if "SÃO PAULO" in str(sindicato_nome).upper():
-            return "São Paulo"
-        elif "RIO GRANDE DO SUL" in str(sindicato_nome).upper():
-            return "Rio Grande do Sul"
-        elif "PARANÁ" in str(sindicato_nome).upper():
-            return "Paraná"
-        elif "RIO DE JANEIRO" in str(sindicato_nome).upper():
-            return "Rio de Janeiro"
-        return None
-
-    df_merged["estado_sindicato"] = df_merged["sindicato"].apply(extrair_estado)
-    df_merged = pd.merge(df_merged, sindicato_valor, left_on="estado_sindicato", right_on="estado", how="left")
-    df_merged.drop(columns=["estado"], inplace=True)
-
-    # Fase 6: Integração dos dias úteis
-    df_merged = pd.merge(df_merged, dias_uteis[["sindicato_dias", "dias_uteis"]], left_on="sindicato", right_on="sindicato_dias", how="left")
-    df_merged.drop(columns=["sindicato_dias"], inplace=True)
-
-    print("✔ Dados unificados e enriquecidos com sucesso!")
-    dados_finais = df_merged
-    
-    # Fase 7: Invocação da nova função de validação e correção
-    dados_finais = validar_e_corrigir_dados(dados_finais)
+        # Fase 3: Consolidação das fontes em uma passada
+        dados_finais = consolidar_fontes(fontes, etapas)
+        del fontes
+        print("✔ Dados unificados e enriquecidos com sucesso!")
+        
+        # Fase 4: Validação e correção
+        with medir_etapa('validacao', etapas):
+            dados_finais = validar_e_corrigir_dados(dados_finais)
 
-    # Adicionando a nova etapa: salvar o arquivo CSV
-    output_directory = 'saida'
-    output_filename = 'base_consolidada.csv'
-    output_path = os.path.join(output_directory, output_filename)
-    
-    # Verifica se o diretório de saída existe, senão o cria
-    if not os.path.exists(output_directory):
-        os.makedirs(output_directory)
-    
-    # Salva o DataFrame em um arquivo CSV
-    dados_finais.to_csv(output_path, index=False, sep=';')
-    print(f"\n✔ Dados consolidados salvos com sucesso em: {output_path}")
+        # Adicionando a nova etapa: salvar o arquivo CSV
+        with medir_etapa('gravacao', etapas):
+            gravar_base(dados_finais, CAMINHO_BASE)
+        print(f"\n✔ Dados consolidados salvos com sucesso em: {CAMINHO_BASE}")
+
+    imprimir_etapas(etapas)
 
     # Exibe o resultado final para visualização
     print("\nDataFrame Consolidado (primeiras 5 linhas):")
@@ -274,5 +389,6 @@ def coletar_e_unificar_dados():
     return dados_finais
 
 # Executa o processo completo
+# Uso: python coleta_dados.py [--csv]
 if __name__ == "__main__":
-    dados_consolidados = coletar_e_unificar_dados()
\ No newline at end of file
+    dados_consolidados = coletar_e_unificar_dados(formato='csv' if '--csv' in sys.argv[1:] else 'xlsx')
@@ -0,0 +1,460 @@
+# coleta_incremental.py
+"""
+Coleta incremental, mês a mês, da base consolidada.
+
+A cada execução o estado do mês fica guardado em `DIRETORIO_ESTADO`:
+  - base.arrow: a base avaliada pelas regras, com todos os colaboradores
+    (inclusive os excluídos do benefício e o MOTIVO EXCLUSÃO);
+  - hashes.arrow: um hash do conteúdo de cada fonte por matrícula
+    (`FONTES_POR_MATRICULA`);
+  - estado.json: o hash de cada linha das tabelas por sindicato, o hash de
+    regras_beneficios.yaml, a versão do estado e o formato das colunas do CSV.
+
+A base.arrow guarda também a linha já formatada do CSV de cada colaborador
+elegível, então só as linhas recalculadas são formatadas de novo.
+
+No mês seguinte as novas entradas são comparadas com o estado pela matrícula.
+Só são consolidados e avaliados de novo os colaboradores incluídos, removidos
+ou com alguma fonte alterada, mais os do sindicato (ou estado) cujo valor ou
+dias úteis mudou; os demais vêm do estado. A execução grava a nova
+`base_consolidada.csv` (igual à da coleta completa) e o log de alterações em
+`CAMINHO_LOG`, com a situação anterior e a atual de cada colaborador afetado.
+
+Sem estado, com as regras alteradas ou com `--completo`, todos os
+colaboradores são recalculados (e o log traz só quem mudou).
+
+Uso: python coleta_incremental.py [--csv] [--completo]
+"""
+import hashlib
+import json
+import os
+import sys
+import uuid
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from coleta_dados import (
+    CAMINHO_BASE, DIRETORIO_DADOS, FONTES_POR_MATRICULA, avaliar_base, consolidar_fontes,
+    gravar_base, ler_fontes, padronizar_fontes, selecionar_elegiveis, verificar_entradas,
+)
+from medicao import iniciar_medicao, imprimir_etapas, medir_etapa
+from motor_regras import CAMINHO_REGRAS, carregar_regras
+
+DIRETORIO_ESTADO = 'estado'
+VERSAO_ESTADO = 1  # mude ao alterar a consolidação ou o formato do estado, para recalcular tudo
+CAMINHO_LOG = os.path.join('saida', 'log_alteracoes.csv')
+# Tabelas por sindicato: coluna-chave na tabela -> coluna da base com a mesma chave
+TABELAS_SINDICATO = {
+    'sindicato_valor': ('estado', 'estado_sindicato'),
+    'dias_uteis': ('sindicato_dias', 'sindicato'),
+}
+# Resultado das regras comparado no log de alterações
+CAMPOS_LOG = ['elegivel_beneficio', 'MOTIVO EXCLUSÃO', 'DIAS A RECEBER', 'REGRAS APLICADAS']
+COLUNA_LINHA = 'linha_csv'  # linha já formatada do CSV, guardada na base do estado
+
+
+def hashes_por_matricula(fontes: dict) -> pd.DataFrame:
+    """
+    Hash do conteúdo de cada fonte por colaborador.
+
+    Args:
+        fontes (dict): As fontes de coleta_dados.padronizar_fontes().
+
+    Returns:
+        pd.DataFrame: Colunas fonte, matricula e hash (uint64), uma linha por matrícula de cada fonte.
+    """
+    partes = []
+    for codigo, nome in enumerate(FONTES_POR_MATRICULA):
+        df = fontes[nome]
+        # A mesma linha que a consolidação usa: a primeira de cada matrícula
+        df = df[~df['matricula'].duplicated()]
+        partes.append(pd.DataFrame({
+            'fonte': pd.Categorical.from_codes(np.full(len(df), codigo), FONTES_POR_MATRICULA),
+            'matricula': df['matricula'].to_numpy(),
+            # O hash inclui a própria matrícula
+            'hash': pd.util.hash_pandas_object(df, index=False).to_numpy(),
+        }))
+    return pd.concat(partes, ignore_index=True)
+
+
+def hashes_por_chave(fontes: dict) -> dict:
+    """Hash (em texto) da linha de cada chave das tabelas por sindicato: {tabela: {chave: hash}}."""
+    resultado = {}
+    for tabela, (chave, _) in TABELAS_SINDICATO.items():
+        df = fontes[tabela].dropna(subset=[chave]).drop_duplicates(chave)
+        valores = pd.util.hash_pandas_object(df, index=False)
+        resultado[tabela] = {str(k): str(v) for k, v in zip(df[chave], valores)}
+    return resultado
+
+
+def hash_regras(caminho: str = CAMINHO_REGRAS) -> str:
+    """SHA-256 do arquivo de regras."""
+    with open(caminho, 'rb') as arquivo:
+        return hashlib.sha256(arquivo.read()).hexdigest()
+
+
+def _ler_arrow(caminho: str):
+    """DataFrame e metadados de um arquivo Arrow do estado."""
+    import pyarrow as pa
+
+    with pa.memory_map(caminho, 'r') as fonte:
+        tabela = pa.ipc.open_file(fonte).read_all()
+    return tabela.to_pandas(), tabela.schema.metadata or {}
+
+
+def _gravar_arrow(df: pd.DataFrame, caminho: str, execucao: str):
+    """Grava o DataFrame de forma atômica, marcado com o identificador da execução."""
+    import pyarrow as pa
+
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), b'execucao': execucao.encode()})
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with pa.OSFile(temporario, 'wb') as destino:
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(temporario, caminho)
+
+
+def carregar_estado(diretorio: str = DIRETORIO_ESTADO) -> dict:
+    """
+    Lê o estado da última execução.
+
+    Args:
+        diretorio (str): Onde o estado foi gravado.
+
+    Returns:
+        dict: Com 'base', 'hashes', 'tabelas', 'regras' e 'formato_csv', ou None se não há estado utilizável.
+    """
+    caminho_json = os.path.join(diretorio, 'estado.json')
+    if not os.path.exists(caminho_json):
+        return None
+    try:
+        with open(caminho_json, encoding='utf-8') as arquivo:
+            info = json.load(arquivo)
+        if info.get('versao') != VERSAO_ESTADO:
+            print(f"Aviso: estado em '{diretorio}' é de outra versão; recalculando todos os colaboradores.")
+            return None
+        base, meta_base = _ler_arrow(os.path.join(diretorio, 'base.arrow'))
+        hashes, meta_hashes = _ler_arrow(os.path.join(diretorio, 'hashes.arrow'))
+    except Exception as e:
+        print(f"Aviso: estado em '{diretorio}' ilegível ({e}); recalculando todos os colaboradores.")
+        return None
+
+    # Uma gravação interrompida deixa arquivos de execuções diferentes
+    execucao = info['execucao'].encode()
+    if meta_base.get(b'execucao') != execucao or meta_hashes.get(b'execucao') != execucao:
+        print(f"Aviso: estado em '{diretorio}' incompleto; recalculando todos os colaboradores.")
+        return None
+    return {'base': base, 'hashes': hashes, 'tabelas': info['tabelas'], 'regras': info['regras'],
+            'formato_csv': info['formato_csv']}
+
+
+def gravar_estado(base: pd.DataFrame, hashes: pd.DataFrame, tabelas: dict, regras: str, formato_csv: list,
+                  diretorio: str = DIRETORIO_ESTADO):
+    """Grava o estado do mês (a base avaliada com todos os colaboradores, as linhas do CSV e os hashes das entradas)."""
+    os.makedirs(diretorio, exist_ok=True)
+    execucao = uuid.uuid4().hex
+    _gravar_arrow(base, os.path.join(diretorio, 'base.arrow'), execucao)
+    _gravar_arrow(hashes, os.path.join(diretorio, 'hashes.arrow'), execucao)
+    temporario = os.path.join(diretorio, f"estado.json.{os.getpid()}.tmp")
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump({'versao': VERSAO_ESTADO, 'execucao': execucao, 'regras': regras, 'tabelas': tabelas,
+                   'formato_csv': formato_csv}, arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, os.path.join(diretorio, 'estado.json'))
+
+
+def fontes_alteradas(hashes_anteriores: pd.DataFrame, hashes: pd.DataFrame) -> list:
+    """
+    Matrículas incluídas, removidas ou alteradas em cada fonte.
+
+    Como o hash inclui a matrícula, uma linha cujo hash não aparece do outro
+    lado é de uma matrícula incluída, removida ou alterada naquela fonte: basta
+    um `isin` sobre os hashes, sem alinhar as fontes por matrícula.
+
+    Args:
+        hashes_anteriores (pd.DataFrame): Os hashes guardados no estado.
+        hashes (pd.DataFrame): Os hashes das entradas atuais (hashes_por_matricula()).
+
+    Returns:
+        list: Uma Series por fonte com alteração, matrícula -> nome da fonte.
+    """
+    partes = []
+    for nome in FONTES_POR_MATRICULA:
+        antes = hashes_anteriores[hashes_anteriores['fonte'] == nome]
+        agora = hashes[hashes['fonte'] == nome]
+        # O isin do pandas usa tabela hash (o do NumPy ordena os dois lados)
+        matriculas = np.concatenate([
+            agora['matricula'].to_numpy()[~agora['hash'].isin(antes['hash']).to_numpy()],
+            antes['matricula'].to_numpy()[~antes['hash'].isin(agora['hash']).to_numpy()],
+        ])
+        if len(matriculas):
+            partes.append(pd.Series(nome, index=pd.Index(pd.unique(matriculas), name='matricula'), dtype=object))
+    return partes
+
+
+def chaves_alteradas(tabelas_anteriores: dict, tabelas: dict) -> dict:
+    """Chaves incluídas, removidas ou alteradas em cada tabela por sindicato: {tabela: [chave, ...]}."""
+    alteradas = {}
+    for tabela in TABELAS_SINDICATO:
+        anteriores, atuais = tabelas_anteriores.get(tabela, {}), tabelas[tabela]
+        alteradas[tabela] = sorted(k for k in set(anteriores) | set(atuais) if anteriores.get(k) != atuais.get(k))
+    return alteradas
+
+
+def origem_das_alteracoes(estado: dict, hashes: pd.DataFrame, tabelas: dict) -> pd.Series:
+    """
+    O que mudou para cada colaborador afetado desde a última execução.
+
+    Args:
+        estado (dict): O estado de carregar_estado().
+        hashes (pd.DataFrame): Os hashes das entradas atuais.
+        tabelas (dict): Os hashes das tabelas por sindicato atuais.
+
+    Returns:
+        pd.Series: Matrícula -> fontes e tabelas alteradas, separadas por vírgula, ordenada por matrícula.
+    """
+    partes = fontes_alteradas(estado['hashes'], hashes)
+    base = estado['base']
+    for tabela, chaves in chaves_alteradas(estado['tabelas'], tabelas).items():
+        if chaves:
+            coluna = TABELAS_SINDICATO[tabela][1]
+            matriculas = base.loc[base[coluna].isin(chaves), 'matricula']
+            partes.append(pd.Series(tabela, index=pd.Index(matriculas, name='matricula'), dtype=object))
+    if not partes:
+        return pd.Series(dtype=object, index=pd.Index([], dtype=object, name='matricula'))
+    origem = pd.concat(partes)
+    if origem.index.has_duplicates:
+        origem = origem.groupby(level=0).agg(','.join)
+    return origem.sort_index()
+
+
+def recalcular(fontes: dict, matriculas=None, plano=None) -> pd.DataFrame:
+    """
+    Consolida e avalia as regras só para as matrículas informadas (todas, se None).
+
+    Args:
+        fontes (dict): As fontes padronizadas.
+        matriculas: As matrículas a recalcular.
+        plano (PlanoRegras): Regras já compiladas.
+
+    Returns:
+        pd.DataFrame: As linhas recalculadas, no formato de coleta_dados.avaliar_base().
+    """
+    if matriculas is not None:
+        fontes = {
+            nome: df[df['matricula'].isin(matriculas)] if nome in FONTES_POR_MATRICULA else df
+            for nome, df in fontes.items()
+        }
+    return avaliar_base(consolidar_fontes(fontes), plano)
+
+
+def combinar(base_anterior: pd.DataFrame, recalculadas: pd.DataFrame, afetadas) -> pd.DataFrame:
+    """
+    Troca as linhas dos colaboradores afetados pelas recalculadas, mantendo a ordem por matrícula.
+
+    As recalculadas são encaixadas nas posições dadas por busca binária na base
+    já ordenada, sem ordenar tudo de novo.
+
+    Args:
+        base_anterior (pd.DataFrame): A base avaliada do estado.
+        recalculadas (pd.DataFrame): As linhas de recalcular().
+        afetadas: As matrículas recalculadas (inclusive as removidas, que saem da base).
+
+    Returns:
+        pd.DataFrame: A base avaliada completa, como a de uma coleta completa.
+    """
+    restante = base_anterior[~base_anterior['matricula'].isin(afetadas)]
+    if recalculadas.empty:
+        combinada = restante.reset_index(drop=True)
+    else:
+        posicoes = np.searchsorted(restante['matricula'].to_numpy(), recalculadas['matricula'].to_numpy())
+        posicoes = posicoes + np.arange(len(recalculadas))
+        novas = np.zeros(len(restante) + len(recalculadas), dtype=bool)
+        novas[posicoes] = True
+        ordem = np.empty(len(novas), dtype=np.intp)
+        ordem[posicoes] = np.arange(len(restante), len(novas))
+        ordem[~novas] = np.arange(len(restante))
+        combinada = pd.concat([restante, recalculadas], ignore_index=True).take(ordem)
+        combinada.index = pd.RangeIndex(len(combinada))
+
+    # Colunas inteiras viram float quando falta valor em alguma linha (reindex): se não falta
+    # mais nenhum, voltam ao tipo que a coleta completa daria
+    for coluna in recalculadas.columns:
+        tipo = recalculadas[coluna].dtype
+        if combinada[coluna].dtype != tipo and (pd.api.types.is_integer_dtype(tipo) or pd.api.types.is_bool_dtype(tipo)) \
+                and combinada[coluna].notna().all():
+            combinada[coluna] = combinada[coluna].astype(tipo)
+    return combinada
+
+
+def registrar_alteracoes(anteriores: pd.DataFrame, recalculadas: pd.DataFrame, origem: pd.Series) -> pd.DataFrame:
+    """
+    Log de alterações: situação anterior e atual de cada colaborador afetado.
+
+    Args:
+        anteriores (pd.DataFrame): As linhas do estado que foram recalculadas.
+        recalculadas (pd.DataFrame): As linhas de recalcular().
+        origem (pd.Series): Matrícula -> fontes alteradas (origem_das_alteracoes()).
+
+    Returns:
+        pd.DataFrame: Uma linha por colaborador incluído, removido ou com fonte ou resultado alterado.
+    """
+    antes = anteriores.set_index('matricula')[CAMPOS_LOG]
+    depois = recalculadas.set_index('matricula')[CAMPOS_LOG]
+    matriculas = antes.index.union(depois.index)
+    antes, depois = antes.reindex(matriculas), depois.reindex(matriculas)
+
+    alteracao = np.select(
+        [~matriculas.isin(anteriores['matricula']), ~matriculas.isin(recalculadas['matricula'])],
+        ['incluido', 'removido'],
+        'alterado',
+    )
+    fontes = origem.reindex(matriculas).fillna('').to_numpy()
+    mudou = ~((antes == depois) | (antes.isna() & depois.isna())).all(axis=1).to_numpy()
+
+    log = pd.DataFrame({'matricula': matriculas, 'alteracao': alteracao, 'fontes': fontes})
+    for campo in CAMPOS_LOG:
+        log[f"{campo} ANTERIOR"] = antes[campo].to_numpy()
+        log[f"{campo} ATUAL"] = depois[campo].to_numpy()
+    return log[(alteracao != 'alterado') | (fontes != '') | mudou].reset_index(drop=True)
+
+
+def formato_csv(df: pd.DataFrame) -> list:
+    """Colunas e tipos do CSV (e se as colunas de data não têm hora), que decidem como cada linha é formatada."""
+    formato = []
+    for coluna, tipo in df.dtypes.items():
+        somente_datas = None
+        if pd.api.types.is_datetime64_any_dtype(tipo):
+            datas = df[coluna].dropna()
+            somente_datas = bool((datas == datas.dt.normalize()).all())
+        formato.append([coluna, str(tipo), somente_datas])
+    return formato
+
+
+def gravar_base_por_linhas(dados_finais: pd.DataFrame, linhas: pd.Series, output_path: str = CAMINHO_BASE) -> pd.Series:
+    """
+    Grava a base consolidada como coleta_dados.gravar_base(), formatando só as linhas que faltam.
+
+    Args:
+        dados_finais (pd.DataFrame): A base consolidada.
+        linhas (pd.Series): A linha do CSV de cada colaborador (mesmo índice da base); NaN nas que faltam.
+        output_path (str): O arquivo de saída.
+
+    Returns:
+        pd.Series: As linhas de todos os colaboradores, ou None se a base foi gravada pelo pandas de uma vez.
+    """
+    faltando = linhas.isna().to_numpy()
+    if faltando.any():
+        texto = dados_finais[faltando].to_csv(index=False, header=False, sep=';', lineterminator='\n')
+        novas = texto.split('\n')[:-1]
+        if len(novas) != int(faltando.sum()):
+            # Algum valor tem quebra de linha: o CSV não dá para separar em linhas
+            gravar_base(dados_finais, output_path)
+            return None
+        linhas = linhas.astype(object)
+        linhas[faltando] = novas
+
+    output_directory = os.path.dirname(output_path)
+    if output_directory:
+        os.makedirs(output_directory, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8', newline='') as arquivo:
+        arquivo.write(dados_finais.iloc[:0].to_csv(index=False, sep=';'))
+        if len(linhas):
+            arquivo.write(os.linesep.join(linhas))
+            arquivo.write(os.linesep)
+    return linhas
+
+
+def coletar_incremental(directory_path: str = DIRETORIO_DADOS, formato: str = 'xlsx', completo: bool = False,
+                        diretorio_estado: str = DIRETORIO_ESTADO, medir_memoria: bool = True):
+    """
+    Gera a base consolidada recalculando só os colaboradores afetados desde a última execução.
+
+    Args:
+        directory_path (str): O diretório com os arquivos de entrada.
+        formato (str): 'xlsx' (planilhas originais) ou 'csv' (arquivos exportados).
+        completo (bool): Recalcula todos os colaboradores, mesmo com estado.
+        diretorio_estado (str): Onde fica o estado entre as execuções.
+        medir_memoria (bool): Mede também a memória de cada etapa (tracemalloc).
+
+    Returns:
+        pd.DataFrame: A base consolidada gravada em `CAMINHO_BASE`.
+    """
+    if not verificar_entradas(directory_path, formato):
+        return
+
+    etapas = []
+    with iniciar_medicao() if medir_memoria else nullcontext():
+        print(f"Iniciando a leitura dos arquivos no diretório '{directory_path}'...")
+        with medir_etapa('leitura', etapas):
+            fontes = ler_fontes(directory_path, formato)
+        with medir_etapa('padronizacao', etapas):
+            padronizar_fontes(fontes)
+
+        # Fase 1: Comparação das entradas com o estado da última execução
+        with medir_etapa('estado', etapas):
+            estado = carregar_estado(diretorio_estado)
+        with medir_etapa('comparacao', etapas):
+            hashes, tabelas, regras = hashes_por_matricula(fontes), hashes_por_chave(fontes), hash_regras()
+            origem = origem_das_alteracoes(estado, hashes, tabelas) if estado is not None else pd.Series(dtype=object)
+
+        if estado is None:
+            print(f"Sem estado anterior em '{diretorio_estado}': recalculando todos os colaboradores.")
+        elif estado['regras'] != regras:
+            print("Regras de benefícios alteradas desde a última execução: recalculando todos os colaboradores.")
+        elif completo:
+            print("Recalculando todos os colaboradores (--completo).")
+        incremental = estado is not None and estado['regras'] == regras and not completo
+
+        # Fase 2: Consolidação e regras só dos colaboradores afetados
+        with medir_etapa('recalculo', etapas):
+            plano = carregar_regras()
+            recalculadas = recalcular(fontes, origem.index if incremental else None, plano)
+            colunas_estado = [c for c in estado['base'].columns if c != COLUNA_LINHA] if estado is not None else []
+            if incremental and list(recalculadas.columns) != colunas_estado:
+                print("Colunas da base mudaram desde a última execução: recalculando todos os colaboradores.")
+                incremental = False
+                recalculadas = recalcular(fontes, None, plano)
+        del fontes
+
+        with medir_etapa('combinacao', etapas):
+            base_anterior = estado['base'] if estado is not None else recalculadas.iloc[:0]
+            if incremental:
+                anteriores = base_anterior[base_anterior['matricula'].isin(origem.index)]
+                avaliada = combinar(base_anterior, recalculadas, origem.index)
+            else:
+                anteriores, avaliada = base_anterior, recalculadas
+            log = registrar_alteracoes(anteriores, recalculadas, origem)
+        total = len(avaliada)
+        print(f"✔ {len(recalculadas) if incremental else total} de {total} colaboradores recalculados; "
+              f"{len(log)} alterações desde a última execução.")
+
+        with medir_etapa('validacao', etapas):
+            dados_finais = selecionar_elegiveis(avaliada)
+            linhas = dados_finais.pop(COLUNA_LINHA) if COLUNA_LINHA in dados_finais else None
+            formato = formato_csv(dados_finais)
+            # As linhas guardadas só valem com a mesma formatação das colunas; datas com hora são
+            # formatadas conforme a coluna inteira, então nesse caso tudo é formatado de novo
+            if linhas is None or estado['formato_csv'] != formato or any(datas is False for _, _, datas in formato):
+                linhas = pd.Series(np.nan, index=dados_finais.index, dtype=object)
+
+        with medir_etapa('gravacao', etapas):
+            linhas = gravar_base_por_linhas(dados_finais, linhas, CAMINHO_BASE)
+            gravar_base(log, CAMINHO_LOG)
+            avaliada[COLUNA_LINHA] = linhas.reindex(avaliada.index) if linhas is not None else None
+            try:
+                gravar_estado(avaliada, hashes, tabelas, regras, formato, diretorio_estado)
+            except Exception as e:
+                print(f"Aviso: não foi possível gravar o estado em '{diretorio_estado}': {e}")
+        print(f"\n✔ Dados consolidados salvos com sucesso em: {CAMINHO_BASE}")
+        print(f"✔ Log de alterações salvo em: {CAMINHO_LOG}")
+
+    imprimir_etapas(etapas)
+    return dados_finais
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    coletar_incremental(formato='csv' if '--csv' in argumentos else 'xlsx', completo='--completo' in argumentos)
@@ -0,0 +1,204 @@
+# leitura_xlsx.py
+"""
+Leitura direta das planilhas .xlsx de entrada (pasta `dados`), sem a
+exportação manual para .csv.
+
+  - As nove planilhas são convertidas em paralelo, em processos separados
+    (`ProcessPoolExecutor`): o openpyxl gasta CPU em Python puro, então threads
+    não ajudariam.
+  - Os cabeçalhos são normalizados (espaços e espaços não separáveis nas pontas
+    e repetidos), linhas totalmente vazias são descartadas e os ajustes de cada
+    planilha ficam em `PLANILHAS` (linha do cabeçalho, colunas renomeadas,
+    colunas de moeda), para as fontes saírem no mesmo formato dos .csv que a
+    coleta já lia.
+  - Cada planilha convertida é guardada como Arrow em `DIRETORIO_CACHE`, com o
+    hash do conteúdo do .xlsx (e dos ajustes) no nome do arquivo: planilhas
+    que não mudaram nunca são convertidas de novo.
+
+Uso: python leitura_xlsx.py [diretorio]
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+DIRETORIO_DADOS = 'dados'
+DIRETORIO_CACHE = os.path.join('cache', 'xlsx')
+VERSAO_CONVERSAO = 1  # mude ao alterar a conversão, para invalidar os caches antigos
+MAX_PROCESSOS = os.cpu_count() or 1
+
+# Planilha de cada fonte (as mesmas chaves de coleta_dados.ler_fontes) e os ajustes da conversão:
+#   linha_cabecalho: linha (1 = primeira) com os nomes das colunas;
+#   renomear: nomes de coluna que mudaram na exportação para .csv;
+#   moeda: colunas numéricas gravadas como texto 'R$ 0.00', como nos .csv.
+PLANILHAS = {
+    'ativos': {'arquivo': '1.ATIVOS.xlsx'},
+    'ferias': {'arquivo': '2.FÉRIAS.xlsx'},
+    'desligados': {'arquivo': '3.DESLIGADOS.xlsx'},
+    'admissao': {'arquivo': '4.ADMISSÃO ABRIL.xlsx', 'renomear': {'Cargo': 'cargo_admissao'}},
+    'sindicato_valor': {'arquivo': '5.Base sindicato x valor.xlsx', 'moeda': ['VALOR']},
+    'dias_uteis': {'arquivo': '6.Base dias uteis.xlsx', 'linha_cabecalho': 2},
+    'afastamentos': {'arquivo': 'AFASTAMENTOS.xlsx'},
+    'aprendiz': {'arquivo': 'APRENDIZ.xlsx'},
+    'estagio': {'arquivo': 'ESTÁGIO.xlsx'},
+}
+
+
+def normalizar_cabecalho(nome, posicao: int) -> str:
+    """Nome de coluna sem espaços (inclusive não separáveis) nas pontas ou repetidos; vazio vira 'Unnamed: N'."""
+    if nome is None or str(nome).strip() == '':
+        return f"Unnamed: {posicao}"
+    return ' '.join(str(nome).replace('\xa0', ' ').split())
+
+
+def ler_planilha(caminho: str, especificacao: dict) -> pd.DataFrame:
+    """
+    Converte a primeira aba de um .xlsx em DataFrame.
+
+    Args:
+        caminho (str): O arquivo .xlsx.
+        especificacao (dict): Os ajustes da planilha (ver `PLANILHAS`).
+
+    Returns:
+        pd.DataFrame: Uma linha por linha não vazia da planilha, com os tipos inferidos.
+    """
+    import openpyxl
+
+    pasta = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = pasta.worksheets[0].iter_rows(values_only=True)
+        for _ in range(especificacao.get('linha_cabecalho', 1) - 1):
+            next(linhas, None)
+        cabecalho = next(linhas, ())
+        # Planilhas com formatação aplicada a linhas vazias chegam a ter ~1 milhão de linhas
+        dados = [linha for linha in linhas if any(valor is not None for valor in linha)]
+    finally:
+        pasta.close()
+
+    colunas = [normalizar_cabecalho(nome, posicao) for posicao, nome in enumerate(cabecalho)]
+    df = pd.DataFrame.from_records(dados, columns=colunas).infer_objects()
+    df = df.rename(columns=especificacao.get('renomear', {}))
+    for coluna in especificacao.get('moeda', []):
+        df[coluna] = df[coluna].map(lambda valor: f"R$ {valor:.2f}" if isinstance(valor, (int, float)) else valor)
+    return df
+
+
+def _hash_arquivo(caminho: str, bloco: int = 1 << 20) -> str:
+    """SHA-256 do arquivo, lido em blocos de 1 MiB."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for parte in iter(lambda: arquivo.read(bloco), b''):
+            h.update(parte)
+    return h.hexdigest()
+
+
+def caminho_cache(nome: str, caminho: str, especificacao: dict, diretorio_cache: str = DIRETORIO_CACHE) -> str:
+    """Arquivo Arrow da conversão: muda quando o conteúdo do .xlsx ou os ajustes da planilha mudam."""
+    chave = hashlib.sha256()
+    chave.update(_hash_arquivo(caminho).encode())
+    chave.update(json.dumps([VERSAO_CONVERSAO, especificacao], sort_keys=True).encode())
+    return os.path.join(diretorio_cache, f"{nome}-{chave.hexdigest()[:20]}.arrow")
+
+
+def _ler_cache(caminho_arrow: str) -> pd.DataFrame:
+    import pyarrow as pa
+
+    with pa.memory_map(caminho_arrow, 'r') as fonte:
+        return pa.ipc.open_file(fonte).read_all().to_pandas()
+
+
+def _gravar_cache(df: pd.DataFrame, caminho_arrow: str):
+    """Grava a conversão de forma atômica e apaga as conversões antigas da mesma fonte."""
+    import pyarrow as pa
+
+    diretorio = os.path.dirname(caminho_arrow)
+    os.makedirs(diretorio, exist_ok=True)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    temporario = f"{caminho_arrow}.{os.getpid()}.tmp"
+    with pa.OSFile(temporario, 'wb') as destino:
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    os.replace(temporario, caminho_arrow)
+
+    prefixo = os.path.basename(caminho_arrow).rsplit('-', 1)[0] + '-'
+    for antigo in os.listdir(diretorio):
+        if antigo.startswith(prefixo) and antigo.endswith('.arrow') and antigo != os.path.basename(caminho_arrow):
+            os.remove(os.path.join(diretorio, antigo))
+
+
+def _iniciar_processo():
+    # Com fork, o processo herda o tracemalloc ligado pela medição da coleta (medicao.py),
+    # que deixa o openpyxl ~10x mais lento; a memória medida é a do processo principal
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _converter(nome: str, caminho: str, especificacao: dict, caminho_arrow):
+    """Converte uma planilha (roda em um processo do pool) e grava o cache. Retorna (nome, df, segundos)."""
+    inicio = time.perf_counter()
+    df = ler_planilha(caminho, especificacao)
+    if caminho_arrow:
+        try:
+            _gravar_cache(df, caminho_arrow)
+        except Exception as e:
+            print(f"Aviso: não foi possível gravar o cache '{caminho_arrow}': {e}")
+    return nome, df, time.perf_counter() - inicio
+
+
+def arquivos_faltando(diretorio: str = DIRETORIO_DADOS) -> list:
+    """As planilhas de `PLANILHAS` que não existem em `diretorio`."""
+    return [e['arquivo'] for e in PLANILHAS.values() if not os.path.exists(os.path.join(diretorio, e['arquivo']))]
+
+
+def ler_fontes_xlsx(diretorio: str = DIRETORIO_DADOS, max_processos: int = MAX_PROCESSOS,
+                    usar_cache: bool = True, diretorio_cache: str = DIRETORIO_CACHE) -> dict:
+    """
+    Lê as planilhas de entrada, reaproveitando as conversões guardadas.
+
+    Args:
+        diretorio (str): A pasta com os arquivos de `PLANILHAS`.
+        max_processos (int): Máximo de processos convertendo planilhas ao mesmo tempo.
+        usar_cache (bool): Usa e grava as conversões em `diretorio_cache`.
+        diretorio_cache (str): Onde ficam as conversões em Arrow.
+
+    Returns:
+        dict: Nome da fonte -> DataFrame, no formato de coleta_dados.ler_fontes().
+    """
+    inicio = time.perf_counter()
+    fontes, pendentes = {}, []
+    for nome, especificacao in PLANILHAS.items():
+        caminho = os.path.join(diretorio, especificacao['arquivo'])
+        caminho_arrow = caminho_cache(nome, caminho, especificacao, diretorio_cache) if usar_cache else None
+        if caminho_arrow and os.path.exists(caminho_arrow):
+            try:
+                fontes[nome] = _ler_cache(caminho_arrow)
+                continue
+            except Exception as e:
+                print(f"Aviso: cache '{caminho_arrow}' ilegível ({e}); convertendo a planilha de novo.")
+        pendentes.append((nome, caminho, especificacao, caminho_arrow))
+
+    # Uma planilha só (ou um processo só) não compensa subir o pool
+    if len(pendentes) == 1 or (pendentes and max_processos <= 1):
+        convertidas = [_converter(*pendente) for pendente in pendentes]
+    elif pendentes:
+        with ProcessPoolExecutor(max_workers=max(1, min(len(pendentes), max_processos)),
+                                 initializer=_iniciar_processo) as executor:
+            convertidas = list(executor.map(_converter, *zip(*pendentes)))
+    else:
+        convertidas = []
+    for nome, df, _ in convertidas:
+        fontes[nome] = df
+
+    print(f"✔ {len(PLANILHAS)} planilhas lidas em {time.perf_counter() - inicio:.2f}s "
+          f"({len(PLANILHAS) - len(pendentes)} do cache, {len(pendentes)} convertidas).")
+    return {nome: fontes[nome] for nome in PLANILHAS}
+
+
+if __name__ == "__main__":
+    for nome, df in ler_fontes_xlsx(sys.argv[1] if len(sys.argv) > 1 else DIRETORIO_DADOS).items():
+        print(f"{nome:<16} {len(df):>6} linhas  {list(df.columns)}")
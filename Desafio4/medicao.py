@@ -0,0 +1,61 @@
+# medicao.py
+"""
+Tempo e pico de memória por etapa do processamento.
+
+A memória vem do `tracemalloc`, que também contabiliza os arrays do NumPy e
+do pandas. O pico de uma etapa é quanto a memória alocada subiu acima do que
+já estava alocado no início dela (as cópias temporárias que a etapa criou).
+Fora do `iniciar_medicao()` as etapas registram só o tempo.
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+@contextmanager
+def iniciar_medicao():
+    """Liga o tracemalloc durante o bloco (se ainda não estiver ligado)."""
+    ligou = not tracemalloc.is_tracing()
+    if ligou:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if ligou:
+            tracemalloc.stop()
+
+
+@contextmanager
+def medir_etapa(nome: str, etapas: list):
+    """
+    Mede uma etapa e acrescenta em `etapas` um dicionário com etapa, segundos,
+    pico_mb (acima do início da etapa) e memoria_mb (alocada ao fim dela).
+    Com `etapas=None` não mede nada.
+    """
+    if etapas is None:
+        yield
+        return
+    medindo = tracemalloc.is_tracing()
+    if medindo:
+        tracemalloc.reset_peak()
+        memoria_inicial = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapa = {'etapa': nome, 'segundos': time.perf_counter() - inicio, 'pico_mb': None, 'memoria_mb': None}
+        if medindo:
+            atual, pico = tracemalloc.get_traced_memory()
+            etapa['pico_mb'] = (pico - memoria_inicial) / 2**20
+            etapa['memoria_mb'] = atual / 2**20
+        etapas.append(etapa)
+
+
+def imprimir_etapas(etapas: list):
+    """Tabela com o tempo e a memória de cada etapa medida."""
+    print(f"\n{'etapa':<16} {'tempo (s)':>10} {'pico (MB)':>10} {'ao fim (MB)':>12}")
+    for etapa in etapas:
+        pico = f"{etapa['pico_mb']:.1f}" if etapa['pico_mb'] is not None else "-"
+        memoria = f"{etapa['memoria_mb']:.1f}" if etapa['memoria_mb'] is not None else "-"
+        print(f"{etapa['etapa']:<16} {etapa['segundos']:>10.3f} {pico:>10} {memoria:>12}")
+    print(f"{'total':<16} {sum(e['segundos'] for e in etapas):>10.3f}")
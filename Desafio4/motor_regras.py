@@ -0,0 +1,358 @@
+# motor_regras.py
+"""
+Motor de regras de elegibilidade e de dias a receber do VR/VA.
+
+As regras ficam em `regras_beneficios.yaml` (exclusões, ajustes de dias,
+rateio empresa/profissional e ajustes por sindicato), então mudar a regra de
+um sindicato não exige mexer no código.
+
+`compilar_regras` valida o arquivo e transforma cada expressão em uma função
+sobre arrays NumPy uma única vez: só são aceitos nomes declarados em `campos`,
+constantes e os operadores listados no próprio YAML (nada de `eval`).
+`avaliar_regras` roda o plano inteiro sobre a base consolidada em uma passada:
+cada campo vira um array uma vez, cada regra é uma máscara booleana e o
+resultado volta em uma única cópia do DataFrame, com as colunas:
+  - DIAS A RECEBER e REGRAS APLICADAS (ajustes de dias aplicados a cada um);
+  - MOTIVO EXCLUSÃO (primeira exclusão verdadeira, '' se elegível);
+  - elegivel_beneficio ('Sim'/'Não');
+  - PERCENTUAL EMPRESA e PERCENTUAL PROFISSIONAL (rateio do benefício).
+"""
+import ast
+import functools
+import operator
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import yaml
+
+CAMINHO_REGRAS = 'regras_beneficios.yaml'
+COLUNA_SINDICATO = 'sindicato'
+CAMPO_DIAS = 'dias_a_receber'  # DIAS A RECEBER corrente, disponível nas expressões
+
+_CHAVES_CONFIG = {'campos', 'dias_iniciais', 'dias', 'exclusoes', 'rateio_empresa', 'sindicatos'}
+_CHAVES_SINDICATO = {'dias', 'exclusoes', 'rateio_empresa'}
+_CHAVES_REGRA = {'nome', 'quando', 'valor', 'ativa'}
+
+_COMPARACOES = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+    ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+_ARITMETICA = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_FUNCOES = {'preenchido': pd.notna, 'vazio': pd.isna}
+
+
+@dataclass
+class Regra:
+    """Uma regra compilada: a versão padrão e as variantes por sindicato."""
+    nome: str
+    quando: object = None  # função contexto -> máscara; None = não vale fora das variantes
+    valor: object = None  # só nas regras de dias
+    variantes: list = field(default_factory=list)  # [(prefixo do sindicato, quando, valor)]
+
+
+@dataclass
+class PlanoRegras:
+    """Regras compiladas de regras_beneficios.yaml, prontas para avaliar_regras()."""
+    campos: dict  # apelido -> (coluna, dia_do_mes)
+    dias_iniciais: object
+    dias: list
+    exclusoes: list
+    rateio_empresa: float
+    rateio_por_sindicato: dict
+
+    def sindicatos(self):
+        """Prefixos de sindicato com algum ajuste próprio."""
+        prefixos = set(self.rateio_por_sindicato)
+        for regra in self.dias + self.exclusoes:
+            prefixos.update(prefixo for prefixo, _, _ in regra.variantes)
+        return sorted(prefixos)
+
+
+# --- Compilação das expressões ---
+
+def _pertence(valores, opcoes):
+    return pd.Series(np.asarray(valores, dtype=object)).isin(opcoes).to_numpy()
+
+
+def _constante(no, texto):
+    if isinstance(no, ast.Constant) and isinstance(no.value, (int, float, str, bool)):
+        return no.value
+    if isinstance(no, ast.UnaryOp) and isinstance(no.op, ast.USub) and isinstance(no.operand, ast.Constant):
+        return -no.operand.value
+    raise ValueError(f"Listas só podem ter constantes: '{texto}'.")
+
+
+def _compilar(no, texto, nomes):
+    """Converte um nó da expressão em uma função contexto -> array (ou escalar)."""
+    if isinstance(no, ast.Constant) and isinstance(no.value, (int, float, str, bool)):
+        valor = no.value
+        return lambda ctx: valor
+
+    if isinstance(no, (ast.List, ast.Tuple)):
+        itens = [_constante(item, texto) for item in no.elts]
+        return lambda ctx: itens
+
+    if isinstance(no, ast.Name):
+        if no.id not in nomes:
+            raise ValueError(f"Campo desconhecido '{no.id}' em '{texto}' (declare-o em `campos`).")
+        nome = no.id
+        return lambda ctx: ctx[nome]
+
+    if isinstance(no, ast.BoolOp):
+        partes = [_compilar(valor, texto, nomes) for valor in no.values]
+        juntar = np.logical_and if isinstance(no.op, ast.And) else np.logical_or
+        return lambda ctx: functools.reduce(juntar, (parte(ctx) for parte in partes))
+
+    if isinstance(no, ast.UnaryOp) and isinstance(no.op, (ast.Not, ast.USub)):
+        operando = _compilar(no.operand, texto, nomes)
+        if isinstance(no.op, ast.Not):
+            return lambda ctx: np.logical_not(operando(ctx))
+        return lambda ctx: -operando(ctx)
+
+    if isinstance(no, ast.BinOp) and type(no.op) in _ARITMETICA:
+        operar = _ARITMETICA[type(no.op)]
+        esquerda, direita = _compilar(no.left, texto, nomes), _compilar(no.right, texto, nomes)
+        return lambda ctx: operar(esquerda(ctx), direita(ctx))
+
+    if isinstance(no, ast.Compare):
+        esquerda = _compilar(no.left, texto, nomes)
+        passos = []
+        for op, comparado in zip(no.ops, no.comparators):
+            if isinstance(op, ast.In):
+                operar = _pertence
+            elif isinstance(op, ast.NotIn):
+                operar = lambda a, b: ~_pertence(a, b)
+            elif type(op) in _COMPARACOES:
+                operar = _COMPARACOES[type(op)]
+            else:
+                raise ValueError(f"Comparação não permitida em '{texto}'.")
+            passos.append((operar, _compilar(comparado, texto, nomes)))
+
+        def comparar(ctx):
+            # a < b < c vale como (a < b) and (b < c)
+            atual, resultado = esquerda(ctx), True
+            for operar, comparado in passos:
+                proximo = comparado(ctx)
+                resultado = np.logical_and(resultado, operar(atual, proximo))
+                atual = proximo
+            return resultado
+        return comparar
+
+    if (isinstance(no, ast.Call) and isinstance(no.func, ast.Name) and no.func.id in _FUNCOES
+            and len(no.args) == 1 and not no.keywords):
+        funcao = _FUNCOES[no.func.id]
+        argumento = _compilar(no.args[0], texto, nomes)
+        return lambda ctx: funcao(argumento(ctx))
+
+    raise ValueError(f"Construção não permitida ({type(no).__name__}) em '{texto}'.")
+
+
+def compilar_expressao(texto, nomes):
+    """Compila uma expressão das regras em uma função contexto -> array (ou escalar)."""
+    try:
+        arvore = ast.parse(str(texto).strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Expressão inválida '{texto}': {e.msg}") from None
+    return _compilar(arvore.body, texto, nomes)
+
+
+# --- Compilação do arquivo de regras ---
+
+def _verificar_chaves(dados, permitidas, onde):
+    extras = set(dados) - permitidas
+    if extras:
+        raise ValueError(f"Chaves desconhecidas em {onde}: {', '.join(sorted(map(str, extras)))}.")
+
+
+def _percentual(valor, onde):
+    valor = float(valor)
+    if not 0 <= valor <= 1:
+        raise ValueError(f"rateio_empresa de {onde} deve estar entre 0 e 1 (recebido {valor}).")
+    return valor
+
+
+def _compilar_regras(lista, nomes, com_valor, onde):
+    regras = []
+    for definicao in lista or []:
+        _verificar_chaves(definicao, _CHAVES_REGRA, onde)
+        if 'nome' not in definicao or 'quando' not in definicao or (com_valor and 'valor' not in definicao):
+            exigidas = "nome, quando e valor" if com_valor else "nome e quando"
+            raise ValueError(f"Regra em {onde} precisa de {exigidas}: {definicao}.")
+        if not definicao.get('ativa', True):
+            continue
+        regras.append(Regra(
+            nome=str(definicao['nome']),
+            quando=compilar_expressao(definicao['quando'], nomes),
+            valor=compilar_expressao(definicao['valor'], nomes) if com_valor else None,
+        ))
+    return regras
+
+
+def _compilar_variantes(regras, lista, prefixo, nomes, com_valor, onde):
+    """Acrescenta às regras as variantes de um sindicato (troca, desliga ou cria regras pelo nome)."""
+    por_nome = {regra.nome: regra for regra in regras}
+    for definicao in lista or []:
+        _verificar_chaves(definicao, _CHAVES_REGRA, onde)
+        if 'nome' not in definicao:
+            raise ValueError(f"Regra em {onde} precisa de nome: {definicao}.")
+        nome = str(definicao['nome'])
+        regra = por_nome.get(nome)
+        if regra is None:
+            if 'quando' not in definicao or (com_valor and 'valor' not in definicao):
+                raise ValueError(f"Regra nova '{nome}' em {onde} precisa de quando{' e valor' if com_valor else ''}.")
+            regra = por_nome[nome] = Regra(nome=nome)
+            regras.append(regra)
+        if not definicao.get('ativa', True):
+            regra.variantes.append((prefixo, None, None))
+            continue
+        quando = compilar_expressao(definicao['quando'], nomes) if 'quando' in definicao else regra.quando
+        valor = compilar_expressao(definicao['valor'], nomes) if 'valor' in definicao else regra.valor
+        regra.variantes.append((prefixo, quando, valor))
+
+
+def compilar_regras(config: dict) -> PlanoRegras:
+    """
+    Valida a configuração das regras (o conteúdo do YAML) e compila as expressões.
+
+    Args:
+        config (dict): Configuração no formato de regras_beneficios.yaml.
+
+    Returns:
+        PlanoRegras: O plano pronto para avaliar_regras().
+    """
+    _verificar_chaves(config, _CHAVES_CONFIG, "regras")
+    campos = {}
+    for apelido, definicao in (config.get('campos') or {}).items():
+        if isinstance(definicao, str):
+            campos[apelido] = (definicao, False)
+        else:
+            _verificar_chaves(definicao, {'coluna', 'dia_do_mes'}, f"campos.{apelido}")
+            campos[apelido] = (definicao['coluna'], bool(definicao.get('dia_do_mes', False)))
+    nomes = set(campos) | {CAMPO_DIAS}
+
+    dias = _compilar_regras(config.get('dias'), nomes, True, "dias")
+    exclusoes = _compilar_regras(config.get('exclusoes'), nomes, False, "exclusoes")
+    rateio_por_sindicato = {}
+    for prefixo, ajustes in (config.get('sindicatos') or {}).items():
+        ajustes = ajustes or {}
+        _verificar_chaves(ajustes, _CHAVES_SINDICATO, f"sindicatos.{prefixo}")
+        _compilar_variantes(dias, ajustes.get('dias'), prefixo, nomes, True, f"sindicatos.{prefixo}.dias")
+        _compilar_variantes(exclusoes, ajustes.get('exclusoes'), prefixo, nomes, False, f"sindicatos.{prefixo}.exclusoes")
+        if 'rateio_empresa' in ajustes:
+            rateio_por_sindicato[prefixo] = _percentual(ajustes['rateio_empresa'], prefixo)
+
+    return PlanoRegras(
+        campos=campos,
+        dias_iniciais=compilar_expressao(config.get('dias_iniciais', 0), nomes),
+        dias=dias,
+        exclusoes=exclusoes,
+        rateio_empresa=_percentual(config.get('rateio_empresa', 1.0), "regras"),
+        rateio_por_sindicato=rateio_por_sindicato,
+    )
+
+
+def carregar_regras(caminho: str = CAMINHO_REGRAS) -> PlanoRegras:
+    """Lê e compila o arquivo de regras."""
+    with open(caminho, encoding='utf-8') as arquivo:
+        return compilar_regras(yaml.safe_load(arquivo) or {})
+
+
+# --- Avaliação ---
+
+def _valores(df, coluna, dia_do_mes):
+    """Array de um campo: float para números e dias do mês, bool para flags, object para textos."""
+    if coluna not in df.columns:
+        raise ValueError(f"A coluna '{coluna}' usada nas regras não existe na base.")
+    serie = df[coluna]
+    if dia_do_mes:
+        if not pd.api.types.is_datetime64_any_dtype(serie):
+            serie = pd.to_datetime(serie, errors='coerce')
+        return serie.dt.day.to_numpy(dtype=float)
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.to_numpy(dtype=float)
+    return serie.to_numpy(dtype=object)
+
+
+def _mascara(valor, linhas):
+    return np.broadcast_to(np.asarray(valor, dtype=bool), (linhas,))
+
+
+def _avaliar(regra, ctx, sindicatos, linhas):
+    """Máscara (e valor, nas regras de dias) da regra, com as variantes de cada sindicato."""
+    quando = _mascara(regra.quando(ctx) if regra.quando else False, linhas)
+    valor = regra.valor(ctx) if regra.valor else None
+    for prefixo, quando_sindicato, valor_sindicato in regra.variantes:
+        do_sindicato = sindicatos[prefixo]
+        quando = np.where(do_sindicato, _mascara(quando_sindicato(ctx) if quando_sindicato else False, linhas), quando)
+        if valor_sindicato is not None:
+            valor = valor_sindicato(ctx) if valor is None else np.where(do_sindicato, valor_sindicato(ctx), valor)
+    return quando, valor
+
+
+def _rastro_regras(regras: dict, index) -> pd.Series:
+    """
+    Coluna de rastro: em cada linha, os nomes das regras cuja máscara é verdadeira.
+
+    As máscaras viram um código binário por linha e cada código distinto é
+    traduzido para texto uma única vez (há no máximo 2^len(regras) combinações).
+    """
+    codigo = np.zeros(len(index), dtype=np.int64)
+    for bit, mascara in enumerate(regras.values()):
+        codigo |= np.asarray(mascara, dtype=np.int64) << bit
+    rotulos = {
+        c: ", ".join(nome for bit, nome in enumerate(regras) if (c >> bit) & 1)
+        for c in np.unique(codigo)
+    }
+    return pd.Series(codigo, index=index).map(rotulos)
+
+
+def avaliar_regras(df: pd.DataFrame, plano: PlanoRegras) -> pd.DataFrame:
+    """
+    Avalia todas as regras do plano sobre a base em uma passada.
+
+    Args:
+        df (pd.DataFrame): A base consolidada, com as colunas declaradas em `campos`
+            (as colunas de data já convertidas para datetime).
+        plano (PlanoRegras): As regras compiladas (carregar_regras()).
+
+    Returns:
+        pd.DataFrame: Uma cópia de `df` com DIAS A RECEBER, REGRAS APLICADAS,
+        MOTIVO EXCLUSÃO, elegivel_beneficio, PERCENTUAL EMPRESA e PERCENTUAL PROFISSIONAL.
+    """
+    linhas = len(df)
+    ctx = {apelido: _valores(df, coluna, dia) for apelido, (coluna, dia) in plano.campos.items()}
+    prefixos = plano.sindicatos()
+    sindicato = df[COLUNA_SINDICATO].astype(str) if prefixos else None
+    sindicatos = {prefixo: sindicato.str.startswith(prefixo).to_numpy() for prefixo in prefixos}
+
+    # Ajustes de dias, em ordem: cada regra vê o DIAS A RECEBER deixado pelas anteriores
+    dias = np.broadcast_to(np.asarray(plano.dias_iniciais(ctx), dtype=float), (linhas,)).copy()
+    aplicadas = {}
+    for regra in plano.dias:
+        ctx[CAMPO_DIAS] = dias
+        quando, valor = _avaliar(regra, ctx, sindicatos, linhas)
+        dias = np.where(quando, valor, dias).astype(float)
+        aplicadas[regra.nome] = quando
+    ctx[CAMPO_DIAS] = dias
+
+    # Exclusões: o motivo é a primeira regra verdadeira
+    exclusoes = {regra.nome: _avaliar(regra, ctx, sindicatos, linhas)[0] for regra in plano.exclusoes}
+    motivo = np.select(list(exclusoes.values()), list(exclusoes), default='') if exclusoes else np.full(linhas, '')
+
+    rateio = np.full(linhas, plano.rateio_empresa)
+    for prefixo, percentual in plano.rateio_por_sindicato.items():
+        rateio = np.where(sindicatos[prefixo], percentual, rateio)
+
+    return df.assign(**{
+        'DIAS A RECEBER': dias,
+        'REGRAS APLICADAS': _rastro_regras(aplicadas, df.index),
+        'MOTIVO EXCLUSÃO': motivo,
+        'elegivel_beneficio': np.where(motivo == '', 'Sim', 'Não'),
+        'PERCENTUAL EMPRESA': rateio,
+        # Arredondado para 1 - 0.8 dar 0.2 (e não 0.19999999999999996)
+        'PERCENTUAL PROFISSIONAL': np.round(1 - rateio, 10),
+    })